@@ -22,39 +22,64 @@ _runtime_version.ValidateProtobufRuntimeVersion(
 _sym_db = _symbol_database.Default()
 
 
+from google.protobuf import field_mask_pb2 as google_dot_protobuf_dot_field__mask__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13\x62ridge_master.proto\x12\rbridge_master\"&\n\x10\x42ridgeIdRequests\x12\x12\n\nbridge_ids\x18\x01 \x03(\t\"%\n\x10ObjectIdRequests\x12\x11\n\tobjectids\x18\x01 \x03(\x03\"\x1c\n\x0cNameRequests\x12\x0c\n\x04name\x18\x01 \x03(\t\" \n\x0eNumberRequests\x12\x0e\n\x06number\x18\x01 \x03(\t\"-\n\rSpatialFilter\x12\x0f\n\x07geojson\x18\x01 \x01(\t\x12\x0b\n\x03\x63rs\x18\x02 \x01(\t\">\n\x06Result\x12\x10\n\x08objectid\x18\x01 \x01(\x03\x12\x11\n\tglobal_id\x18\x02 \x01(\x03\x12\x0f\n\x07success\x18\x03 \x01(\x08\"\x1f\n\x10SpatialReference\x12\x0b\n\x03wkt\x18\x01 \x01(\t\"Y\n\x05Point\x12\t\n\x01x\x18\x01 \x01(\x01\x12\t\n\x01y\x18\x02 \x01(\x01\x12:\n\x11spatial_reference\x18\x03 \x01(\x0b\x32\x1f.bridge_master.SpatialReference\"\x97\x01\n\x0b\x45\x64itResults\x12*\n\x0b\x61\x64\x64_results\x18\x01 \x03(\x0b\x32\x15.bridge_master.Result\x12-\n\x0eupdate_results\x18\x02 \x03(\x0b\x32\x15.bridge_master.Result\x12-\n\x0e\x64\x65lete_results\x18\x03 \x03(\x0b\x32\x15.bridge_master.Result\"\xf9\x03\n\nAttributes\x12\x11\n\tbridge_id\x18\x01 \x01(\t\x12\x10\n\x08objectid\x18\x02 \x01(\x05\x12\x13\n\x0b\x62ridge_name\x18\x03 \x01(\t\x12\x14\n\x0c\x63ity_regency\x18\x04 \x01(\t\x12\x15\n\rbridge_length\x18\x05 \x01(\x01\x12\x14\n\x0c\x62ridge_width\x18\x06 \x01(\x01\x12\x12\n\nstart_date\x18\x07 \x01(\t\x12\x10\n\x08\x65nd_date\x18\x08 \x01(\t\x12\x11\n\tlongitude\x18\t \x01(\x01\x12\x10\n\x08latitude\x18\n \x01(\x01\x12\x12\n\nbridge_num\x18\x0b \x01(\t\x12\x15\n\rbridge_status\x18\x0c \x01(\t\x12\x12\n\nshore_dist\x18\r \x01(\x01\x12\x0b\n\x03\x61\x64t\x18\x0e \x01(\x01\x12\x0c\n\x04\x61\x61\x64t\x18\x0f \x01(\x01\x12\x10\n\x08\x61\x64t_year\x18\x10 \x01(\x01\x12\x11\n\troad_func\x18\x11 \x01(\t\x12\x16\n\x0erni_surf_width\x18\x12 \x01(\x01\x12\x10\n\x08rni_year\x18\x13 \x01(\x05\x12\x12\n\nbm_prov_id\x18\x14 \x01(\t\x12\x0e\n\x06linkid\x18\x15 \x01(\t\x12\x11\n\tcons_year\x18\x16 \x01(\x05\x12\x15\n\rlast_inv_date\x18\x17 \x01(\t\x12\x13\n\x0b\x62ridge_type\x18\x18 \x01(\t\x12\x17\n\x0f\x62ridge_str_type\x18\x19 \x01(\t\"_\n\x06\x42ridge\x12-\n\nattributes\x18\x01 \x01(\x0b\x32\x19.bridge_master.Attributes\x12&\n\x08geometry\x18\x02 \x01(\x0b\x32\x14.bridge_master.Point\"1\n\x07\x42ridges\x12&\n\x07\x62ridges\x18\x01 \x03(\x0b\x32\x15.bridge_master.Bridge2\xbd\x04\n\x0c\x42ridgeMaster\x12\x44\n\x07GetByID\x12\x1f.bridge_master.BridgeIdRequests\x1a\x16.bridge_master.Bridges\"\x00\x12\x42\n\tGetByName\x12\x1b.bridge_master.NameRequests\x1a\x16.bridge_master.Bridges\"\x00\x12L\n\x11GetByBridgeNumber\x12\x1d.bridge_master.NumberRequests\x1a\x16.bridge_master.Bridges\"\x00\x12L\n\x12GetBySpatialFilter\x12\x1c.bridge_master.SpatialFilter\x1a\x16.bridge_master.Bridges\"\x00\x12>\n\x06Insert\x12\x16.bridge_master.Bridges\x1a\x1a.bridge_master.EditResults\"\x00\x12>\n\x06Update\x12\x16.bridge_master.Bridges\x1a\x1a.bridge_master.EditResults\"\x00\x12G\n\x06\x44\x65lete\x12\x1f.bridge_master.ObjectIdRequests\x1a\x1a.bridge_master.EditResults\"\x00\x12>\n\x06Retire\x12\x16.bridge_master.Bridges\x1a\x1a.bridge_master.EditResults\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x13\x62ridge_master.proto\x12\rbridge_master\x1a google/protobuf/field_mask.proto\"\x8b\x01\n\x10\x42ridgeIdRequests\x12\x12\n\nbridge_ids\x18\x01 \x03(\t\x12\x11\n\tpage_size\x18\x02 \x01(\x05\x12\x0e\n\x06\x63ursor\x18\x03 \x01(\t\x12.\n\nfield_mask\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\x12\x10\n\x08\x63olumnar\x18\x05 \x01(\x08\"%\n\x10ObjectIdRequests\x12\x11\n\tobjectids\x18\x01 \x03(\x03\"\x81\x01\n\x0cNameRequests\x12\x0c\n\x04name\x18\x01 \x03(\t\x12\x11\n\tpage_size\x18\x02 \x01(\x05\x12\x0e\n\x06\x63ursor\x18\x03 \x01(\t\x12.\n\nfield_mask\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\x12\x10\n\x08\x63olumnar\x18\x05 \x01(\x08\"\x85\x01\n\x0eNumberRequests\x12\x0e\n\x06number\x18\x01 \x03(\t\x12\x11\n\tpage_size\x18\x02 \x01(\x05\x12\x0e\n\x06\x63ursor\x18\x03 \x01(\t\x12.\n\nfield_mask\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\x12\x10\n\x08\x63olumnar\x18\x05 \x01(\x08\"\x92\x01\n\rSpatialFilter\x12\x0f\n\x07geojson\x18\x01 \x01(\t\x12\x0b\n\x03\x63rs\x18\x02 \x01(\t\x12\x11\n\tpage_size\x18\x03 \x01(\x05\x12\x0e\n\x06\x63ursor\x18\x04 \x01(\t\x12.\n\nfield_mask\x18\x05 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\x12\x10\n\x08\x63olumnar\x18\x06 \x01(\x08\"\x88\x01\n\x0fNearestRequests\x12$\n\x06points\x18\x01 \x03(\x0b\x32\x14.bridge_master.Point\x12\t\n\x01k\x18\x02 \x01(\x05\x12\x14\n\x0cmax_distance\x18\x03 \x01(\x01\x12.\n\nfield_mask\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"C\n\x08Neighbor\x12%\n\x06\x62ridge\x18\x01 \x01(\x0b\x32\x15.bridge_master.Bridge\x12\x10\n\x08\x64istance\x18\x02 \x01(\x01\";\n\rNearestResult\x12*\n\tneighbors\x18\x01 \x03(\x0b\x32\x17.bridge_master.Neighbor\"?\n\x0eNearestResults\x12-\n\x07results\x18\x01 \x03(\x0b\x32\x1c.bridge_master.NearestResult\"\x80\x01\n\rExportRequest\x12+\n\x06\x66ormat\x18\x01 \x01(\x0e\x32\x1b.bridge_master.ExportFormat\x12\x12\n\nbatch_size\x18\x02 \x01(\x05\x12.\n\nfield_mask\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"\x1b\n\x0b\x45xportChunk\x12\x0c\n\x04\x64\x61ta\x18\x01 \x01(\x0c\".\n\x0cWatchRequest\x12\r\n\x05since\x18\x01 \x01(\x03\x12\x0f\n\x07\x66\x65\x65\x64_id\x18\x02 \x01(\t\"\xe5\x01\n\x0b\x43hangeEvent\x12\x0f\n\x07\x66\x65\x65\x64_id\x18\x01 \x01(\t\x12\x10\n\x08sequence\x18\x02 \x01(\x03\x12\'\n\x04type\x18\x03 \x01(\x0e\x32\x19.bridge_master.ChangeType\x12+\n\x06source\x18\x04 \x01(\x0e\x32\x1b.bridge_master.ChangeSource\x12\x10\n\x08objectid\x18\x05 \x01(\x03\x12\x11\n\tbridge_id\x18\x06 \x01(\t\x12%\n\x06\x62ridge\x18\x07 \x01(\x0b\x32\x15.bridge_master.Bridge\x12\x11\n\ttimestamp\x18\x08 \x01(\x03\"s\n\x06Result\x12\x10\n\x08objectid\x18\x01 \x01(\x03\x12\x11\n\tglobal_id\x18\x02 \x01(\x03\x12\x0f\n\x07success\x18\x03 \x01(\x08\x12\r\n\x05\x65rror\x18\x04 \x01(\t\x12\x11\n\tbridge_id\x18\x05 \x01(\t\x12\x11\n\tretryable\x18\x06 \x01(\x08\"\x1f\n\x10SpatialReference\x12\x0b\n\x03wkt\x18\x01 \x01(\t\"Y\n\x05Point\x12\t\n\x01x\x18\x01 \x01(\x01\x12\t\n\x01y\x18\x02 \x01(\x01\x12:\n\x11spatial_reference\x18\x03 \x01(\x0b\x32\x1f.bridge_master.SpatialReference\"\x97\x01\n\x0b\x45\x64itResults\x12*\n\x0b\x61\x64\x64_results\x18\x01 \x03(\x0b\x32\x15.bridge_master.Result\x12-\n\x0eupdate_results\x18\x02 \x03(\x0b\x32\x15.bridge_master.Result\x12-\n\x0e\x64\x65lete_results\x18\x03 \x03(\x0b\x32\x15.bridge_master.Result\"\xf9\x03\n\nAttributes\x12\x11\n\tbridge_id\x18\x01 \x01(\t\x12\x10\n\x08objectid\x18\x02 \x01(\x05\x12\x13\n\x0b\x62ridge_name\x18\x03 \x01(\t\x12\x14\n\x0c\x63ity_regency\x18\x04 \x01(\t\x12\x15\n\rbridge_length\x18\x05 \x01(\x01\x12\x14\n\x0c\x62ridge_width\x18\x06 \x01(\x01\x12\x12\n\nstart_date\x18\x07 \x01(\t\x12\x10\n\x08\x65nd_date\x18\x08 \x01(\t\x12\x11\n\tlongitude\x18\t \x01(\x01\x12\x10\n\x08latitude\x18\n \x01(\x01\x12\x12\n\nbridge_num\x18\x0b \x01(\t\x12\x15\n\rbridge_status\x18\x0c \x01(\t\x12\x12\n\nshore_dist\x18\r \x01(\x01\x12\x0b\n\x03\x61\x64t\x18\x0e \x01(\x01\x12\x0c\n\x04\x61\x61\x64t\x18\x0f \x01(\x01\x12\x10\n\x08\x61\x64t_year\x18\x10 \x01(\x01\x12\x11\n\troad_func\x18\x11 \x01(\t\x12\x16\n\x0erni_surf_width\x18\x12 \x01(\x01\x12\x10\n\x08rni_year\x18\x13 \x01(\x05\x12\x12\n\nbm_prov_id\x18\x14 \x01(\t\x12\x0e\n\x06linkid\x18\x15 \x01(\t\x12\x11\n\tcons_year\x18\x16 \x01(\x05\x12\x15\n\rlast_inv_date\x18\x17 \x01(\t\x12\x13\n\x0b\x62ridge_type\x18\x18 \x01(\t\x12\x17\n\x0f\x62ridge_str_type\x18\x19 \x01(\t\"\xce\x04\n\rBridgeColumns\x12\x11\n\tbridge_id\x18\x01 \x03(\t\x12\x10\n\x08objectid\x18\x02 \x03(\x05\x12\x13\n\x0b\x62ridge_name\x18\x03 \x03(\t\x12\x14\n\x0c\x63ity_regency\x18\x04 \x03(\t\x12\x15\n\rbridge_length\x18\x05 \x03(\x01\x12\x14\n\x0c\x62ridge_width\x18\x06 \x03(\x01\x12\x12\n\nstart_date\x18\x07 \x03(\t\x12\x10\n\x08\x65nd_date\x18\x08 \x03(\t\x12\x11\n\tlongitude\x18\t \x03(\x01\x12\x10\n\x08latitude\x18\n \x03(\x01\x12\x12\n\nbridge_num\x18\x0b \x03(\t\x12\x15\n\rbridge_status\x18\x0c \x03(\t\x12\x12\n\nshore_dist\x18\r \x03(\x01\x12\x0b\n\x03\x61\x64t\x18\x0e \x03(\x01\x12\x0c\n\x04\x61\x61\x64t\x18\x0f \x03(\x01\x12\x10\n\x08\x61\x64t_year\x18\x10 \x03(\x01\x12\x11\n\troad_func\x18\x11 \x03(\t\x12\x16\n\x0erni_surf_width\x18\x12 \x03(\x01\x12\x10\n\x08rni_year\x18\x13 \x03(\x05\x12\x12\n\nbm_prov_id\x18\x14 \x03(\t\x12\x0e\n\x06linkid\x18\x15 \x03(\t\x12\x11\n\tcons_year\x18\x16 \x03(\x05\x12\x15\n\rlast_inv_date\x18\x17 \x03(\t\x12\x13\n\x0b\x62ridge_type\x18\x18 \x03(\t\x12\x17\n\x0f\x62ridge_str_type\x18\x19 \x03(\t\x12\t\n\x01x\x18\x1a \x03(\x01\x12\t\n\x01y\x18\x1b \x03(\x01\x12:\n\x11spatial_reference\x18\x1c \x01(\x0b\x32\x1f.bridge_master.SpatialReference\"_\n\x06\x42ridge\x12-\n\nattributes\x18\x01 \x01(\x0b\x32\x19.bridge_master.Attributes\x12&\n\x08geometry\x18\x02 \x01(\x0b\x32\x14.bridge_master.Point\"u\n\x07\x42ridges\x12&\n\x07\x62ridges\x18\x01 \x03(\x0b\x32\x15.bridge_master.Bridge\x12\x13\n\x0bnext_cursor\x18\x02 \x01(\t\x12-\n\x07\x63olumns\x18\x03 \x01(\x0b\x32\x1c.bridge_master.BridgeColumns*-\n\x0c\x45xportFormat\x12\r\n\tARROW_IPC\x10\x00\x12\x0e\n\nGEOPARQUET\x10\x01*k\n\nChangeType\x12\x1b\n\x17\x43HANGE_TYPE_UNSPECIFIED\x10\x00\x12\x0c\n\x08INSERTED\x10\x01\x12\x0b\n\x07UPDATED\x10\x02\x12\x0b\n\x07\x44\x45LETED\x10\x03\x12\x0b\n\x07RETIRED\x10\x04\x12\x0b\n\x07REMOVED\x10\x05*+\n\x0c\x43hangeSource\x12\x0c\n\x08SERVICER\x10\x00\x12\r\n\tRECONCILE\x10\x01\x32\xdb\x08\n\x0c\x42ridgeMaster\x12\x44\n\x07GetByID\x12\x1f.bridge_master.BridgeIdRequests\x1a\x16.bridge_master.Bridges\"\x00\x12\x42\n\tGetByName\x12\x1b.bridge_master.NameRequests\x1a\x16.bridge_master.Bridges\"\x00\x12L\n\x11GetByBridgeNumber\x12\x1d.bridge_master.NumberRequests\x1a\x16.bridge_master.Bridges\"\x00\x12L\n\x12GetBySpatialFilter\x12\x1c.bridge_master.SpatialFilter\x1a\x16.bridge_master.Bridges\"\x00\x12>\n\x06Insert\x12\x16.bridge_master.Bridges\x1a\x1a.bridge_master.EditResults\"\x00\x12>\n\x06Update\x12\x16.bridge_master.Bridges\x1a\x1a.bridge_master.EditResults\"\x00\x12G\n\x06\x44\x65lete\x12\x1f.bridge_master.ObjectIdRequests\x1a\x1a.bridge_master.EditResults\"\x00\x12>\n\x06Retire\x12\x16.bridge_master.Bridges\x1a\x1a.bridge_master.EditResults\"\x00\x12I\n\nStreamByID\x12\x1f.bridge_master.BridgeIdRequests\x1a\x16.bridge_master.Bridges\"\x00\x30\x01\x12G\n\x0cStreamByName\x12\x1b.bridge_master.NameRequests\x1a\x16.bridge_master.Bridges\"\x00\x30\x01\x12Q\n\x14StreamByBridgeNumber\x12\x1d.bridge_master.NumberRequests\x1a\x16.bridge_master.Bridges\"\x00\x30\x01\x12Q\n\x15StreamBySpatialFilter\x12\x1c.bridge_master.SpatialFilter\x1a\x16.bridge_master.Bridges\"\x00\x30\x01\x12M\n\nGetNearest\x12\x1e.bridge_master.NearestRequests\x1a\x1d.bridge_master.NearestResults\"\x00\x12\x46\n\x06\x45xport\x12\x1c.bridge_master.ExportRequest\x1a\x1a.bridge_master.ExportChunk\"\x00\x30\x01\x12K\n\x0cWatchChanges\x12\x1b.bridge_master.WatchRequest\x1a\x1a.bridge_master.ChangeEvent\"\x00\x30\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'bridge_master_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_BRIDGEIDREQUESTS']._serialized_start=38
-  _globals['_BRIDGEIDREQUESTS']._serialized_end=76
-  _globals['_OBJECTIDREQUESTS']._serialized_start=78
-  _globals['_OBJECTIDREQUESTS']._serialized_end=115
-  _globals['_NAMEREQUESTS']._serialized_start=117
-  _globals['_NAMEREQUESTS']._serialized_end=145
-  _globals['_NUMBERREQUESTS']._serialized_start=147
-  _globals['_NUMBERREQUESTS']._serialized_end=179
-  _globals['_SPATIALFILTER']._serialized_start=181
-  _globals['_SPATIALFILTER']._serialized_end=226
-  _globals['_RESULT']._serialized_start=228
-  _globals['_RESULT']._serialized_end=290
-  _globals['_SPATIALREFERENCE']._serialized_start=292
-  _globals['_SPATIALREFERENCE']._serialized_end=323
-  _globals['_POINT']._serialized_start=325
-  _globals['_POINT']._serialized_end=414
-  _globals['_EDITRESULTS']._serialized_start=417
-  _globals['_EDITRESULTS']._serialized_end=568
-  _globals['_ATTRIBUTES']._serialized_start=571
-  _globals['_ATTRIBUTES']._serialized_end=1076
-  _globals['_BRIDGE']._serialized_start=1078
-  _globals['_BRIDGE']._serialized_end=1173
-  _globals['_BRIDGES']._serialized_start=1175
-  _globals['_BRIDGES']._serialized_end=1224
-  _globals['_BRIDGEMASTER']._serialized_start=1227
-  _globals['_BRIDGEMASTER']._serialized_end=1800
+  _globals['_EXPORTFORMAT']._serialized_start=3156
+  _globals['_EXPORTFORMAT']._serialized_end=3201
+  _globals['_CHANGETYPE']._serialized_start=3203
+  _globals['_CHANGETYPE']._serialized_end=3310
+  _globals['_CHANGESOURCE']._serialized_start=3312
+  _globals['_CHANGESOURCE']._serialized_end=3355
+  _globals['_BRIDGEIDREQUESTS']._serialized_start=73
+  _globals['_BRIDGEIDREQUESTS']._serialized_end=212
+  _globals['_OBJECTIDREQUESTS']._serialized_start=214
+  _globals['_OBJECTIDREQUESTS']._serialized_end=251
+  _globals['_NAMEREQUESTS']._serialized_start=254
+  _globals['_NAMEREQUESTS']._serialized_end=383
+  _globals['_NUMBERREQUESTS']._serialized_start=386
+  _globals['_NUMBERREQUESTS']._serialized_end=519
+  _globals['_SPATIALFILTER']._serialized_start=522
+  _globals['_SPATIALFILTER']._serialized_end=668
+  _globals['_NEARESTREQUESTS']._serialized_start=671
+  _globals['_NEARESTREQUESTS']._serialized_end=807
+  _globals['_NEIGHBOR']._serialized_start=809
+  _globals['_NEIGHBOR']._serialized_end=876
+  _globals['_NEARESTRESULT']._serialized_start=878
+  _globals['_NEARESTRESULT']._serialized_end=937
+  _globals['_NEARESTRESULTS']._serialized_start=939
+  _globals['_NEARESTRESULTS']._serialized_end=1002
+  _globals['_EXPORTREQUEST']._serialized_start=1005
+  _globals['_EXPORTREQUEST']._serialized_end=1133
+  _globals['_EXPORTCHUNK']._serialized_start=1135
+  _globals['_EXPORTCHUNK']._serialized_end=1162
+  _globals['_WATCHREQUEST']._serialized_start=1164
+  _globals['_WATCHREQUEST']._serialized_end=1210
+  _globals['_CHANGEEVENT']._serialized_start=1213
+  _globals['_CHANGEEVENT']._serialized_end=1442
+  _globals['_RESULT']._serialized_start=1444
+  _globals['_RESULT']._serialized_end=1559
+  _globals['_SPATIALREFERENCE']._serialized_start=1561
+  _globals['_SPATIALREFERENCE']._serialized_end=1592
+  _globals['_POINT']._serialized_start=1594
+  _globals['_POINT']._serialized_end=1683
+  _globals['_EDITRESULTS']._serialized_start=1686
+  _globals['_EDITRESULTS']._serialized_end=1837
+  _globals['_ATTRIBUTES']._serialized_start=1840
+  _globals['_ATTRIBUTES']._serialized_end=2345
+  _globals['_BRIDGECOLUMNS']._serialized_start=2348
+  _globals['_BRIDGECOLUMNS']._serialized_end=2938
+  _globals['_BRIDGE']._serialized_start=2940
+  _globals['_BRIDGE']._serialized_end=3035
+  _globals['_BRIDGES']._serialized_start=3037
+  _globals['_BRIDGES']._serialized_end=3154
+  _globals['_BRIDGEMASTER']._serialized_start=3358
+  _globals['_BRIDGEMASTER']._serialized_end=4473
 # @@protoc_insertion_point(module_scope)
@@ -1,15 +1,54 @@
+from google.protobuf import field_mask_pb2 as _field_mask_pb2
 from google.protobuf.internal import containers as _containers
+from google.protobuf.internal import enum_type_wrapper as _enum_type_wrapper
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
 from typing import ClassVar as _ClassVar, Iterable as _Iterable, Mapping as _Mapping, Optional as _Optional, Union as _Union
 
 DESCRIPTOR: _descriptor.FileDescriptor
 
+class ExportFormat(int, metaclass=_enum_type_wrapper.EnumTypeWrapper):
+    __slots__ = ()
+    ARROW_IPC: _ClassVar[ExportFormat]
+    GEOPARQUET: _ClassVar[ExportFormat]
+
+class ChangeType(int, metaclass=_enum_type_wrapper.EnumTypeWrapper):
+    __slots__ = ()
+    CHANGE_TYPE_UNSPECIFIED: _ClassVar[ChangeType]
+    INSERTED: _ClassVar[ChangeType]
+    UPDATED: _ClassVar[ChangeType]
+    DELETED: _ClassVar[ChangeType]
+    RETIRED: _ClassVar[ChangeType]
+    REMOVED: _ClassVar[ChangeType]
+
+class ChangeSource(int, metaclass=_enum_type_wrapper.EnumTypeWrapper):
+    __slots__ = ()
+    SERVICER: _ClassVar[ChangeSource]
+    RECONCILE: _ClassVar[ChangeSource]
+ARROW_IPC: ExportFormat
+GEOPARQUET: ExportFormat
+CHANGE_TYPE_UNSPECIFIED: ChangeType
+INSERTED: ChangeType
+UPDATED: ChangeType
+DELETED: ChangeType
+RETIRED: ChangeType
+REMOVED: ChangeType
+SERVICER: ChangeSource
+RECONCILE: ChangeSource
+
 class BridgeIdRequests(_message.Message):
-    __slots__ = ("bridge_ids",)
+    __slots__ = ("bridge_ids", "page_size", "cursor", "field_mask", "columnar")
     BRIDGE_IDS_FIELD_NUMBER: _ClassVar[int]
+    PAGE_SIZE_FIELD_NUMBER: _ClassVar[int]
+    CURSOR_FIELD_NUMBER: _ClassVar[int]
+    FIELD_MASK_FIELD_NUMBER: _ClassVar[int]
+    COLUMNAR_FIELD_NUMBER: _ClassVar[int]
     bridge_ids: _containers.RepeatedScalarFieldContainer[str]
-    def __init__(self, bridge_ids: _Optional[_Iterable[str]] = ...) -> None: ...
+    page_size: int
+    cursor: str
+    field_mask: _field_mask_pb2.FieldMask
+    columnar: bool
+    def __init__(self, bridge_ids: _Optional[_Iterable[str]] = ..., page_size: _Optional[int] = ..., cursor: _Optional[str] = ..., field_mask: _Optional[_Union[_field_mask_pb2.FieldMask, _Mapping]] = ..., columnar: bool = ...) -> None: ...
 
 class ObjectIdRequests(_message.Message):
     __slots__ = ("objectids",)
@@ -18,34 +57,140 @@ class ObjectIdRequests(_message.Message):
     def __init__(self, objectids: _Optional[_Iterable[int]] = ...) -> None: ...
 
 class NameRequests(_message.Message):
-    __slots__ = ("name",)
+    __slots__ = ("name", "page_size", "cursor", "field_mask", "columnar")
     NAME_FIELD_NUMBER: _ClassVar[int]
+    PAGE_SIZE_FIELD_NUMBER: _ClassVar[int]
+    CURSOR_FIELD_NUMBER: _ClassVar[int]
+    FIELD_MASK_FIELD_NUMBER: _ClassVar[int]
+    COLUMNAR_FIELD_NUMBER: _ClassVar[int]
     name: _containers.RepeatedScalarFieldContainer[str]
-    def __init__(self, name: _Optional[_Iterable[str]] = ...) -> None: ...
+    page_size: int
+    cursor: str
+    field_mask: _field_mask_pb2.FieldMask
+    columnar: bool
+    def __init__(self, name: _Optional[_Iterable[str]] = ..., page_size: _Optional[int] = ..., cursor: _Optional[str] = ..., field_mask: _Optional[_Union[_field_mask_pb2.FieldMask, _Mapping]] = ..., columnar: bool = ...) -> None: ...
 
 class NumberRequests(_message.Message):
-    __slots__ = ("number",)
+    __slots__ = ("number", "page_size", "cursor", "field_mask", "columnar")
     NUMBER_FIELD_NUMBER: _ClassVar[int]
+    PAGE_SIZE_FIELD_NUMBER: _ClassVar[int]
+    CURSOR_FIELD_NUMBER: _ClassVar[int]
+    FIELD_MASK_FIELD_NUMBER: _ClassVar[int]
+    COLUMNAR_FIELD_NUMBER: _ClassVar[int]
     number: _containers.RepeatedScalarFieldContainer[str]
-    def __init__(self, number: _Optional[_Iterable[str]] = ...) -> None: ...
+    page_size: int
+    cursor: str
+    field_mask: _field_mask_pb2.FieldMask
+    columnar: bool
+    def __init__(self, number: _Optional[_Iterable[str]] = ..., page_size: _Optional[int] = ..., cursor: _Optional[str] = ..., field_mask: _Optional[_Union[_field_mask_pb2.FieldMask, _Mapping]] = ..., columnar: bool = ...) -> None: ...
 
 class SpatialFilter(_message.Message):
-    __slots__ = ("geojson", "crs")
+    __slots__ = ("geojson", "crs", "page_size", "cursor", "field_mask", "columnar")
     GEOJSON_FIELD_NUMBER: _ClassVar[int]
     CRS_FIELD_NUMBER: _ClassVar[int]
+    PAGE_SIZE_FIELD_NUMBER: _ClassVar[int]
+    CURSOR_FIELD_NUMBER: _ClassVar[int]
+    FIELD_MASK_FIELD_NUMBER: _ClassVar[int]
+    COLUMNAR_FIELD_NUMBER: _ClassVar[int]
     geojson: str
     crs: str
-    def __init__(self, geojson: _Optional[str] = ..., crs: _Optional[str] = ...) -> None: ...
+    page_size: int
+    cursor: str
+    field_mask: _field_mask_pb2.FieldMask
+    columnar: bool
+    def __init__(self, geojson: _Optional[str] = ..., crs: _Optional[str] = ..., page_size: _Optional[int] = ..., cursor: _Optional[str] = ..., field_mask: _Optional[_Union[_field_mask_pb2.FieldMask, _Mapping]] = ..., columnar: bool = ...) -> None: ...
+
+class NearestRequests(_message.Message):
+    __slots__ = ("points", "k", "max_distance", "field_mask")
+    POINTS_FIELD_NUMBER: _ClassVar[int]
+    K_FIELD_NUMBER: _ClassVar[int]
+    MAX_DISTANCE_FIELD_NUMBER: _ClassVar[int]
+    FIELD_MASK_FIELD_NUMBER: _ClassVar[int]
+    points: _containers.RepeatedCompositeFieldContainer[Point]
+    k: int
+    max_distance: float
+    field_mask: _field_mask_pb2.FieldMask
+    def __init__(self, points: _Optional[_Iterable[_Union[Point, _Mapping]]] = ..., k: _Optional[int] = ..., max_distance: _Optional[float] = ..., field_mask: _Optional[_Union[_field_mask_pb2.FieldMask, _Mapping]] = ...) -> None: ...
+
+class Neighbor(_message.Message):
+    __slots__ = ("bridge", "distance")
+    BRIDGE_FIELD_NUMBER: _ClassVar[int]
+    DISTANCE_FIELD_NUMBER: _ClassVar[int]
+    bridge: Bridge
+    distance: float
+    def __init__(self, bridge: _Optional[_Union[Bridge, _Mapping]] = ..., distance: _Optional[float] = ...) -> None: ...
+
+class NearestResult(_message.Message):
+    __slots__ = ("neighbors",)
+    NEIGHBORS_FIELD_NUMBER: _ClassVar[int]
+    neighbors: _containers.RepeatedCompositeFieldContainer[Neighbor]
+    def __init__(self, neighbors: _Optional[_Iterable[_Union[Neighbor, _Mapping]]] = ...) -> None: ...
+
+class NearestResults(_message.Message):
+    __slots__ = ("results",)
+    RESULTS_FIELD_NUMBER: _ClassVar[int]
+    results: _containers.RepeatedCompositeFieldContainer[NearestResult]
+    def __init__(self, results: _Optional[_Iterable[_Union[NearestResult, _Mapping]]] = ...) -> None: ...
+
+class ExportRequest(_message.Message):
+    __slots__ = ("format", "batch_size", "field_mask")
+    FORMAT_FIELD_NUMBER: _ClassVar[int]
+    BATCH_SIZE_FIELD_NUMBER: _ClassVar[int]
+    FIELD_MASK_FIELD_NUMBER: _ClassVar[int]
+    format: ExportFormat
+    batch_size: int
+    field_mask: _field_mask_pb2.FieldMask
+    def __init__(self, format: _Optional[_Union[ExportFormat, str]] = ..., batch_size: _Optional[int] = ..., field_mask: _Optional[_Union[_field_mask_pb2.FieldMask, _Mapping]] = ...) -> None: ...
+
+class ExportChunk(_message.Message):
+    __slots__ = ("data",)
+    DATA_FIELD_NUMBER: _ClassVar[int]
+    data: bytes
+    def __init__(self, data: _Optional[bytes] = ...) -> None: ...
+
+class WatchRequest(_message.Message):
+    __slots__ = ("since", "feed_id")
+    SINCE_FIELD_NUMBER: _ClassVar[int]
+    FEED_ID_FIELD_NUMBER: _ClassVar[int]
+    since: int
+    feed_id: str
+    def __init__(self, since: _Optional[int] = ..., feed_id: _Optional[str] = ...) -> None: ...
+
+class ChangeEvent(_message.Message):
+    __slots__ = ("feed_id", "sequence", "type", "source", "objectid", "bridge_id", "bridge", "timestamp")
+    FEED_ID_FIELD_NUMBER: _ClassVar[int]
+    SEQUENCE_FIELD_NUMBER: _ClassVar[int]
+    TYPE_FIELD_NUMBER: _ClassVar[int]
+    SOURCE_FIELD_NUMBER: _ClassVar[int]
+    OBJECTID_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_ID_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_FIELD_NUMBER: _ClassVar[int]
+    TIMESTAMP_FIELD_NUMBER: _ClassVar[int]
+    feed_id: str
+    sequence: int
+    type: ChangeType
+    source: ChangeSource
+    objectid: int
+    bridge_id: str
+    bridge: Bridge
+    timestamp: int
+    def __init__(self, feed_id: _Optional[str] = ..., sequence: _Optional[int] = ..., type: _Optional[_Union[ChangeType, str]] = ..., source: _Optional[_Union[ChangeSource, str]] = ..., objectid: _Optional[int] = ..., bridge_id: _Optional[str] = ..., bridge: _Optional[_Union[Bridge, _Mapping]] = ..., timestamp: _Optional[int] = ...) -> None: ...
 
 class Result(_message.Message):
-    __slots__ = ("objectid", "global_id", "success")
+    __slots__ = ("objectid", "global_id", "success", "error", "bridge_id", "retryable")
     OBJECTID_FIELD_NUMBER: _ClassVar[int]
     GLOBAL_ID_FIELD_NUMBER: _ClassVar[int]
     SUCCESS_FIELD_NUMBER: _ClassVar[int]
+    ERROR_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_ID_FIELD_NUMBER: _ClassVar[int]
+    RETRYABLE_FIELD_NUMBER: _ClassVar[int]
     objectid: int
     global_id: int
     success: bool
-    def __init__(self, objectid: _Optional[int] = ..., global_id: _Optional[int] = ..., success: bool = ...) -> None: ...
+    error: str
+    bridge_id: str
+    retryable: bool
+    def __init__(self, objectid: _Optional[int] = ..., global_id: _Optional[int] = ..., success: bool = ..., error: _Optional[str] = ..., bridge_id: _Optional[str] = ..., retryable: bool = ...) -> None: ...
 
 class SpatialReference(_message.Message):
     __slots__ = ("wkt",)
@@ -127,6 +272,66 @@ class Attributes(_message.Message):
     bridge_str_type: str
     def __init__(self, bridge_id: _Optional[str] = ..., objectid: _Optional[int] = ..., bridge_name: _Optional[str] = ..., city_regency: _Optional[str] = ..., bridge_length: _Optional[float] = ..., bridge_width: _Optional[float] = ..., start_date: _Optional[str] = ..., end_date: _Optional[str] = ..., longitude: _Optional[float] = ..., latitude: _Optional[float] = ..., bridge_num: _Optional[str] = ..., bridge_status: _Optional[str] = ..., shore_dist: _Optional[float] = ..., adt: _Optional[float] = ..., aadt: _Optional[float] = ..., adt_year: _Optional[float] = ..., road_func: _Optional[str] = ..., rni_surf_width: _Optional[float] = ..., rni_year: _Optional[int] = ..., bm_prov_id: _Optional[str] = ..., linkid: _Optional[str] = ..., cons_year: _Optional[int] = ..., last_inv_date: _Optional[str] = ..., bridge_type: _Optional[str] = ..., bridge_str_type: _Optional[str] = ...) -> None: ...
 
+class BridgeColumns(_message.Message):
+    __slots__ = ("bridge_id", "objectid", "bridge_name", "city_regency", "bridge_length", "bridge_width", "start_date", "end_date", "longitude", "latitude", "bridge_num", "bridge_status", "shore_dist", "adt", "aadt", "adt_year", "road_func", "rni_surf_width", "rni_year", "bm_prov_id", "linkid", "cons_year", "last_inv_date", "bridge_type", "bridge_str_type", "x", "y", "spatial_reference")
+    BRIDGE_ID_FIELD_NUMBER: _ClassVar[int]
+    OBJECTID_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_NAME_FIELD_NUMBER: _ClassVar[int]
+    CITY_REGENCY_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_LENGTH_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_WIDTH_FIELD_NUMBER: _ClassVar[int]
+    START_DATE_FIELD_NUMBER: _ClassVar[int]
+    END_DATE_FIELD_NUMBER: _ClassVar[int]
+    LONGITUDE_FIELD_NUMBER: _ClassVar[int]
+    LATITUDE_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_NUM_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_STATUS_FIELD_NUMBER: _ClassVar[int]
+    SHORE_DIST_FIELD_NUMBER: _ClassVar[int]
+    ADT_FIELD_NUMBER: _ClassVar[int]
+    AADT_FIELD_NUMBER: _ClassVar[int]
+    ADT_YEAR_FIELD_NUMBER: _ClassVar[int]
+    ROAD_FUNC_FIELD_NUMBER: _ClassVar[int]
+    RNI_SURF_WIDTH_FIELD_NUMBER: _ClassVar[int]
+    RNI_YEAR_FIELD_NUMBER: _ClassVar[int]
+    BM_PROV_ID_FIELD_NUMBER: _ClassVar[int]
+    LINKID_FIELD_NUMBER: _ClassVar[int]
+    CONS_YEAR_FIELD_NUMBER: _ClassVar[int]
+    LAST_INV_DATE_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_TYPE_FIELD_NUMBER: _ClassVar[int]
+    BRIDGE_STR_TYPE_FIELD_NUMBER: _ClassVar[int]
+    X_FIELD_NUMBER: _ClassVar[int]
+    Y_FIELD_NUMBER: _ClassVar[int]
+    SPATIAL_REFERENCE_FIELD_NUMBER: _ClassVar[int]
+    bridge_id: _containers.RepeatedScalarFieldContainer[str]
+    objectid: _containers.RepeatedScalarFieldContainer[int]
+    bridge_name: _containers.RepeatedScalarFieldContainer[str]
+    city_regency: _containers.RepeatedScalarFieldContainer[str]
+    bridge_length: _containers.RepeatedScalarFieldContainer[float]
+    bridge_width: _containers.RepeatedScalarFieldContainer[float]
+    start_date: _containers.RepeatedScalarFieldContainer[str]
+    end_date: _containers.RepeatedScalarFieldContainer[str]
+    longitude: _containers.RepeatedScalarFieldContainer[float]
+    latitude: _containers.RepeatedScalarFieldContainer[float]
+    bridge_num: _containers.RepeatedScalarFieldContainer[str]
+    bridge_status: _containers.RepeatedScalarFieldContainer[str]
+    shore_dist: _containers.RepeatedScalarFieldContainer[float]
+    adt: _containers.RepeatedScalarFieldContainer[float]
+    aadt: _containers.RepeatedScalarFieldContainer[float]
+    adt_year: _containers.RepeatedScalarFieldContainer[float]
+    road_func: _containers.RepeatedScalarFieldContainer[str]
+    rni_surf_width: _containers.RepeatedScalarFieldContainer[float]
+    rni_year: _containers.RepeatedScalarFieldContainer[int]
+    bm_prov_id: _containers.RepeatedScalarFieldContainer[str]
+    linkid: _containers.RepeatedScalarFieldContainer[str]
+    cons_year: _containers.RepeatedScalarFieldContainer[int]
+    last_inv_date: _containers.RepeatedScalarFieldContainer[str]
+    bridge_type: _containers.RepeatedScalarFieldContainer[str]
+    bridge_str_type: _containers.RepeatedScalarFieldContainer[str]
+    x: _containers.RepeatedScalarFieldContainer[float]
+    y: _containers.RepeatedScalarFieldContainer[float]
+    spatial_reference: SpatialReference
+    def __init__(self, bridge_id: _Optional[_Iterable[str]] = ..., objectid: _Optional[_Iterable[int]] = ..., bridge_name: _Optional[_Iterable[str]] = ..., city_regency: _Optional[_Iterable[str]] = ..., bridge_length: _Optional[_Iterable[float]] = ..., bridge_width: _Optional[_Iterable[float]] = ..., start_date: _Optional[_Iterable[str]] = ..., end_date: _Optional[_Iterable[str]] = ..., longitude: _Optional[_Iterable[float]] = ..., latitude: _Optional[_Iterable[float]] = ..., bridge_num: _Optional[_Iterable[str]] = ..., bridge_status: _Optional[_Iterable[str]] = ..., shore_dist: _Optional[_Iterable[float]] = ..., adt: _Optional[_Iterable[float]] = ..., aadt: _Optional[_Iterable[float]] = ..., adt_year: _Optional[_Iterable[float]] = ..., road_func: _Optional[_Iterable[str]] = ..., rni_surf_width: _Optional[_Iterable[float]] = ..., rni_year: _Optional[_Iterable[int]] = ..., bm_prov_id: _Optional[_Iterable[str]] = ..., linkid: _Optional[_Iterable[str]] = ..., cons_year: _Optional[_Iterable[int]] = ..., last_inv_date: _Optional[_Iterable[str]] = ..., bridge_type: _Optional[_Iterable[str]] = ..., bridge_str_type: _Optional[_Iterable[str]] = ..., x: _Optional[_Iterable[float]] = ..., y: _Optional[_Iterable[float]] = ..., spatial_reference: _Optional[_Union[SpatialReference, _Mapping]] = ...) -> None: ...
+
 class Bridge(_message.Message):
     __slots__ = ("attributes", "geometry")
     ATTRIBUTES_FIELD_NUMBER: _ClassVar[int]
@@ -136,7 +341,11 @@ class Bridge(_message.Message):
     def __init__(self, attributes: _Optional[_Union[Attributes, _Mapping]] = ..., geometry: _Optional[_Union[Point, _Mapping]] = ...) -> None: ...
 
 class Bridges(_message.Message):
-    __slots__ = ("bridges",)
+    __slots__ = ("bridges", "next_cursor", "columns")
     BRIDGES_FIELD_NUMBER: _ClassVar[int]
+    NEXT_CURSOR_FIELD_NUMBER: _ClassVar[int]
+    COLUMNS_FIELD_NUMBER: _ClassVar[int]
     bridges: _containers.RepeatedCompositeFieldContainer[Bridge]
-    def __init__(self, bridges: _Optional[_Iterable[_Union[Bridge, _Mapping]]] = ...) -> None: ...
+    next_cursor: str
+    columns: BridgeColumns
+    def __init__(self, bridges: _Optional[_Iterable[_Union[Bridge, _Mapping]]] = ..., next_cursor: _Optional[str] = ..., columns: _Optional[_Union[BridgeColumns, _Mapping]] = ...) -> None: ...
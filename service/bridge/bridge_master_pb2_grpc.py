@@ -74,6 +74,41 @@ class BridgeMasterStub(object):
                 request_serializer=bridge__master__pb2.Bridges.SerializeToString,
                 response_deserializer=bridge__master__pb2.EditResults.FromString,
                 _registered_method=True)
+        self.StreamByID = channel.unary_stream(
+                '/bridge_master.BridgeMaster/StreamByID',
+                request_serializer=bridge__master__pb2.BridgeIdRequests.SerializeToString,
+                response_deserializer=bridge__master__pb2.Bridges.FromString,
+                _registered_method=True)
+        self.StreamByName = channel.unary_stream(
+                '/bridge_master.BridgeMaster/StreamByName',
+                request_serializer=bridge__master__pb2.NameRequests.SerializeToString,
+                response_deserializer=bridge__master__pb2.Bridges.FromString,
+                _registered_method=True)
+        self.StreamByBridgeNumber = channel.unary_stream(
+                '/bridge_master.BridgeMaster/StreamByBridgeNumber',
+                request_serializer=bridge__master__pb2.NumberRequests.SerializeToString,
+                response_deserializer=bridge__master__pb2.Bridges.FromString,
+                _registered_method=True)
+        self.StreamBySpatialFilter = channel.unary_stream(
+                '/bridge_master.BridgeMaster/StreamBySpatialFilter',
+                request_serializer=bridge__master__pb2.SpatialFilter.SerializeToString,
+                response_deserializer=bridge__master__pb2.Bridges.FromString,
+                _registered_method=True)
+        self.GetNearest = channel.unary_unary(
+                '/bridge_master.BridgeMaster/GetNearest',
+                request_serializer=bridge__master__pb2.NearestRequests.SerializeToString,
+                response_deserializer=bridge__master__pb2.NearestResults.FromString,
+                _registered_method=True)
+        self.Export = channel.unary_stream(
+                '/bridge_master.BridgeMaster/Export',
+                request_serializer=bridge__master__pb2.ExportRequest.SerializeToString,
+                response_deserializer=bridge__master__pb2.ExportChunk.FromString,
+                _registered_method=True)
+        self.WatchChanges = channel.unary_stream(
+                '/bridge_master.BridgeMaster/WatchChanges',
+                request_serializer=bridge__master__pb2.WatchRequest.SerializeToString,
+                response_deserializer=bridge__master__pb2.ChangeEvent.FromString,
+                _registered_method=True)
 
 
 class BridgeMasterServicer(object):
@@ -127,6 +162,52 @@ class BridgeMasterServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamByID(self, request, context):
+        """Paginated variants of the query RPCs, every response is a page of bridges ordered by objectid
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamByName(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamByBridgeNumber(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamBySpatialFilter(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetNearest(self, request, context):
+        """k nearest bridges of every query point ordered by distance, served from the in-memory replica
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Export(self, request, context):
+        """Active bridge table as Arrow IPC stream or GeoParquet file with WKB geometry, streamed as chunks of bytes
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def WatchChanges(self, request, context):
+        """Change events of the bridge edits, including the edits outside of the service found by reconciliation
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_BridgeMasterServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -170,6 +251,41 @@ def add_BridgeMasterServicer_to_server(servicer, server):
                     request_deserializer=bridge__master__pb2.Bridges.FromString,
                     response_serializer=bridge__master__pb2.EditResults.SerializeToString,
             ),
+            'StreamByID': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamByID,
+                    request_deserializer=bridge__master__pb2.BridgeIdRequests.FromString,
+                    response_serializer=bridge__master__pb2.Bridges.SerializeToString,
+            ),
+            'StreamByName': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamByName,
+                    request_deserializer=bridge__master__pb2.NameRequests.FromString,
+                    response_serializer=bridge__master__pb2.Bridges.SerializeToString,
+            ),
+            'StreamByBridgeNumber': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamByBridgeNumber,
+                    request_deserializer=bridge__master__pb2.NumberRequests.FromString,
+                    response_serializer=bridge__master__pb2.Bridges.SerializeToString,
+            ),
+            'StreamBySpatialFilter': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamBySpatialFilter,
+                    request_deserializer=bridge__master__pb2.SpatialFilter.FromString,
+                    response_serializer=bridge__master__pb2.Bridges.SerializeToString,
+            ),
+            'GetNearest': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetNearest,
+                    request_deserializer=bridge__master__pb2.NearestRequests.FromString,
+                    response_serializer=bridge__master__pb2.NearestResults.SerializeToString,
+            ),
+            'Export': grpc.unary_stream_rpc_method_handler(
+                    servicer.Export,
+                    request_deserializer=bridge__master__pb2.ExportRequest.FromString,
+                    response_serializer=bridge__master__pb2.ExportChunk.SerializeToString,
+            ),
+            'WatchChanges': grpc.unary_stream_rpc_method_handler(
+                    servicer.WatchChanges,
+                    request_deserializer=bridge__master__pb2.WatchRequest.FromString,
+                    response_serializer=bridge__master__pb2.ChangeEvent.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'bridge_master.BridgeMaster', rpc_method_handlers)
@@ -396,3 +512,192 @@ class BridgeMaster(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StreamByID(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/bridge_master.BridgeMaster/StreamByID',
+            bridge__master__pb2.BridgeIdRequests.SerializeToString,
+            bridge__master__pb2.Bridges.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamByName(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/bridge_master.BridgeMaster/StreamByName',
+            bridge__master__pb2.NameRequests.SerializeToString,
+            bridge__master__pb2.Bridges.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamByBridgeNumber(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/bridge_master.BridgeMaster/StreamByBridgeNumber',
+            bridge__master__pb2.NumberRequests.SerializeToString,
+            bridge__master__pb2.Bridges.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def StreamBySpatialFilter(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/bridge_master.BridgeMaster/StreamBySpatialFilter',
+            bridge__master__pb2.SpatialFilter.SerializeToString,
+            bridge__master__pb2.Bridges.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetNearest(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/bridge_master.BridgeMaster/GetNearest',
+            bridge__master__pb2.NearestRequests.SerializeToString,
+            bridge__master__pb2.NearestResults.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def Export(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/bridge_master.BridgeMaster/Export',
+            bridge__master__pb2.ExportRequest.SerializeToString,
+            bridge__master__pb2.ExportChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def WatchChanges(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/bridge_master.BridgeMaster/WatchChanges',
+            bridge__master__pb2.WatchRequest.SerializeToString,
+            bridge__master__pb2.ChangeEvent.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -1,9 +1,14 @@
 from grpc_tools import protoc
+from importlib import resources
+
+# Include path of the well-known types, e.g. google/protobuf/field_mask.proto
+WELL_KNOWN_PROTOS = str(resources.files('grpc_tools') / '_proto')
 
 protoc.main(
     (
         "",
         "-I../bridge/proto",
+        "-I" + WELL_KNOWN_PROTOS,
         "--python_out=.",
         "--grpc_python_out=.",
         "--pyi_out=.",
@@ -1,34 +1,160 @@
 """
 GRPC Server for Bridge feature service.
 """
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # The common package of the services
+
 # Bridge master proto generated code
 import bridge_master_pb2, bridge_master_pb2_grpc
-from servicer.master_data.servicer import BridgeMaster
+from servicer.master_data.servicer import BridgeMaster, SERVICE_NAME
+from servicer.master_data.replica import BridgeReplica
+from servicer.master_data.idempotency import IdempotencyCache
+from servicer.master_data.changes import ChangeFeed
+from servicer.master_data.api.nat_bridge_api import backend, configure_call_executor
+from common.aio import AsyncServicer
+from common import metrics
+from common.deadline import LatencyBudget
+from common.admission import AdmissionControl, parse_limits
 
 import grpc
 from grpc_reflection.v1alpha import reflection
 
 from concurrent import futures
+import asyncio
 import logging
+import multiprocessing
+import signal
 
-import os
 from dotenv import load_dotenv
 
 load_dotenv('.env')
 PORT = os.getenv('BRIDGE_MASTER_GRPC_PORT')
-MAX_WORKERS = 10
+# Worker processes sharing the port through SO_REUSEPORT, every process runs its own server with MAX_WORKERS threads.
+# The replica, the idempotency keys and the WatchChanges events of the edits are per process
+PROCESSES = int(os.getenv('BRIDGE_PROCESSES', 1))
+MAX_WORKERS = int(os.getenv('BRIDGE_MAX_WORKERS', 10))  # Worker threads of the thread pool server
+
+# Server mode, 'thread' for the thread pool server or 'aio' for the asyncio server
+SERVER_MODE = os.getenv('BRIDGE_SERVER_MODE', 'thread')
+BACKEND_WORKERS = int(os.getenv('BRIDGE_BACKEND_WORKERS', 32))  # Executor size for the backend calls in aio mode
+# The layer queries of the RPC with deadline run in an executor sized to the workers, MAX_WORKERS in thread mode and
+# BACKEND_WORKERS in aio mode, so every running RPC has a thread for its query. The executor has the call headroom
+# on top for the queries left running past their deadline until the portal timeout.
+# The RPC without deadline make their queries inline on the worker thread
+# In-flight RPC limit, the RPC over the limit are rejected with RESOURCE_EXHAUSTED instead of queued.
+# Defaults to MAX_WORKERS in thread mode and unlimited in aio mode
+MAX_CONCURRENT_RPCS = os.getenv('BRIDGE_MAX_CONCURRENT_RPCS')
+
+# Admission control, the workers are shared by every RPC so the expensive methods are limited and the cheap reads
+# are admitted first. A waiting call holds a worker, so the running calls are limited to the workers minus the waiting
+ADMISSION_ENABLED = os.getenv('BRIDGE_ADMISSION', 'true').lower() == 'true'
+ADMISSION_MAX_WAITING = os.getenv('BRIDGE_ADMISSION_MAX_WAITING')  # Calls waiting for a slot, a quarter of the workers if not set
+ADMISSION_MAX_WAIT = float(os.getenv('BRIDGE_ADMISSION_MAX_WAIT', 5))  # Seconds in the queue before a call is rejected
+METHOD_LIMITS = os.getenv('BRIDGE_METHOD_LIMITS', 'GetBySpatialFilter=4:4,StreamByID=2:2,StreamByName=2:2,'
+                          'StreamByBridgeNumber=2:2,StreamBySpatialFilter=2:2,Export=1:1')  # 'Method=max_concurrent:max_queue'
+PRIORITY_METHODS = os.getenv('BRIDGE_PRIORITY_METHODS', 'GetByID,GetByName,GetByBridgeNumber,GetNearest').split(',')  # Admitted first
+
+# In-memory replica of National Bridge layer for the read end points
+REPLICA_ENABLED = os.getenv('BRIDGE_REPLICA', 'false').lower() == 'true'
+REPLICA_REFRESH_INTERVAL = float(os.getenv('BRIDGE_REPLICA_REFRESH_INTERVAL', 60))
+REPLICA_REFRESH_DELAY = float(os.getenv('BRIDGE_REPLICA_REFRESH_DELAY', 0.5))  # Seconds to coalesce the edits into a single refresh
+# Seconds between the reloads of a layer without editor tracking, 10 times the refresh interval if not set
+REPLICA_RELOAD_INTERVAL = os.getenv('BRIDGE_REPLICA_RELOAD_INTERVAL')
+NEAREST_MAX_K = int(os.getenv('BRIDGE_NEAREST_MAX_K', 100))  # Maximum k of a GetNearest request
+
+# Bulk export
+EXPORT_BATCH_SIZE = int(os.getenv('BRIDGE_EXPORT_BATCH_SIZE', 10000))  # Default rows of every record batch or row group
+EXPORT_CHUNK_SIZE = int(os.getenv('BRIDGE_EXPORT_CHUNK_SIZE', 1024 * 1024))  # Maximum bytes of every export message
+
+# Stored responses of the edit RPCs sent with idempotency-key metadata
+IDEMPOTENCY_TTL = float(os.getenv('BRIDGE_IDEMPOTENCY_TTL', 600))  # Seconds to keep a response
+IDEMPOTENCY_MAX_KEYS = int(os.getenv('BRIDGE_IDEMPOTENCY_MAX_KEYS', 10000))  # Maximum stored responses
+
+# WatchChanges change feed
+WATCH_HISTORY = int(os.getenv('BRIDGE_WATCH_HISTORY', 10000))  # Events kept for resuming a stream
+WATCH_MAX_STREAMS = int(os.getenv('BRIDGE_WATCH_MAX_STREAMS', 4))  # Open streams, every stream holds a worker thread
+# Publish the edits made outside of the servicer, found by the periodic refresh of a replica. Without the read replica
+# a replica is loaded only for the reconciliation
+WATCH_RECONCILE = os.getenv('BRIDGE_WATCH_RECONCILE', 'true').lower() == 'true'
+
+# Calls with a remaining deadline below the ratio of the expected latency are rejected early, 0 disables it
+DEADLINE_REJECT_RATIO = float(os.getenv('BRIDGE_DEADLINE_REJECT_RATIO', 0.5))
+
+# Prometheus metrics end point, disabled if the port is not set. Worker process i serves on the port + i
+METRICS_PORT = os.getenv('BRIDGE_METRICS_PORT')
+METRICS_ADDR = os.getenv('BRIDGE_METRICS_ADDR', '0.0.0.0')
+
+# Request logging, only a sample of the successful requests is logged and the request is truncated
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv('BRIDGE_REQUEST_LOG_SAMPLE_RATE', 0.01))
+REQUEST_LOG_MAX_CHARS = int(os.getenv('BRIDGE_REQUEST_LOG_MAX_CHARS', 500))
+
+SERVER_OPTIONS = [
+    ('grpc.so_reuseport', 1),
+]
+
+SERVICE_NAMES = (
+    bridge_master_pb2.DESCRIPTOR.services_by_name["BridgeMaster"].full_name,
+    reflection.SERVICE_NAME,
+)
 
 logger = logging.getLogger(__name__)
 
-def serve():
+def create_admission(workers: int)->AdmissionControl | None:
+    """
+    Admission control sized for the worker threads running the servicer.
+    """
+    if not ADMISSION_ENABLED:
+        return None
+
+    if ADMISSION_MAX_WAITING is None:
+        max_waiting = workers // 4
+    else:
+        max_waiting = int(ADMISSION_MAX_WAITING)
+
+    return AdmissionControl(max(workers - max_waiting, 1), max_waiting=max_waiting, limits=parse_limits(METHOD_LIMITS),
+                            priority_methods=PRIORITY_METHODS, max_wait=ADMISSION_MAX_WAIT)
+
+def create_replica()->BridgeReplica:
+    reload_interval = None if REPLICA_RELOAD_INTERVAL is None else float(REPLICA_RELOAD_INTERVAL)
+
+    return BridgeReplica(refresh_interval=REPLICA_REFRESH_INTERVAL, refresh_delay=REPLICA_REFRESH_DELAY,
+                         reload_interval=reload_interval, logger=logger)
+
+def create_servicer(workers: int, worker_index: int = 0)->BridgeMaster:
+    backend.connect_async()  # Warm up the portal session without blocking the server startup
+    configure_call_executor(workers)
+
+    if METRICS_PORT is not None:
+        metrics_port = int(METRICS_PORT) + worker_index
+        metrics.track_backend(SERVICE_NAME, backend)
+        metrics.start_metrics_server(metrics_port, addr=METRICS_ADDR)
+        logger.info(f"Metrics available on {METRICS_ADDR}:{metrics_port}/metrics")
+
+    request_log = metrics.RequestLog(sample_rate=REQUEST_LOG_SAMPLE_RATE, max_chars=REQUEST_LOG_MAX_CHARS, logger=logger)
+
+    latency_budget = LatencyBudget(ratio=DEADLINE_REJECT_RATIO) if DEADLINE_REJECT_RATIO > 0 else None
+    change_feed = ChangeFeed(history=WATCH_HISTORY)
+
+    replica = create_replica().start() if REPLICA_ENABLED else None
+    reconciler = None
+
+    # The replica refresh reconciles the change feed with the layer, the read replica if it is enabled
+    if WATCH_RECONCILE and (replica is not None):
+        replica.add_listener(change_feed.reconcile)
+    elif WATCH_RECONCILE:
+        reconciler = create_replica().add_listener(change_feed.reconcile).start()
+
+    return BridgeMaster(logger=logger, replica=replica, request_log=request_log, nearest_max_k=NEAREST_MAX_K,
+                        export_batch_size=EXPORT_BATCH_SIZE, export_chunk_size=EXPORT_CHUNK_SIZE,
+                        idempotency_cache=IdempotencyCache(ttl=IDEMPOTENCY_TTL, max_entries=IDEMPOTENCY_MAX_KEYS),
+                        change_feed=change_feed, max_watch_streams=WATCH_MAX_STREAMS, latency_budget=latency_budget,
+                        admission=create_admission(workers), reconciler=reconciler)
+
+def serve(worker_index: int = 0):
     port = PORT
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=MAX_WORKERS))
-    bridge_master_pb2_grpc.add_BridgeMasterServicer_to_server(BridgeMaster(logger=logger), server)
-    
-    SERVICE_NAMES = (
-        bridge_master_pb2.DESCRIPTOR.services_by_name["BridgeMaster"].full_name,
-        reflection.SERVICE_NAME,
-    )
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=MAX_WORKERS), options=SERVER_OPTIONS,
+                         maximum_concurrent_rpcs=int(MAX_CONCURRENT_RPCS or MAX_WORKERS))
+    bridge_master_pb2_grpc.add_BridgeMasterServicer_to_server(create_servicer(MAX_WORKERS, worker_index), server)
     reflection.enable_server_reflection(SERVICE_NAMES, server)
 
     server.add_insecure_port("[::]:" + port)
@@ -37,6 +163,59 @@ def serve():
     logger.info("Server started, listening on " + port)
     server.wait_for_termination()
 
+async def serve_aio(worker_index: int = 0):
+    port = PORT
+
+    if MAX_CONCURRENT_RPCS is None:
+        server = grpc.aio.server(options=SERVER_OPTIONS)
+    else:
+        server = grpc.aio.server(options=SERVER_OPTIONS, maximum_concurrent_rpcs=int(MAX_CONCURRENT_RPCS))
+
+    servicer = AsyncServicer(create_servicer(BACKEND_WORKERS, worker_index),
+                             bridge_master_pb2.DESCRIPTOR.services_by_name["BridgeMaster"],
+                             futures.ThreadPoolExecutor(max_workers=BACKEND_WORKERS, thread_name_prefix='bridge-backend'))
+    bridge_master_pb2_grpc.add_BridgeMasterServicer_to_server(servicer, server)
+    reflection.enable_server_reflection(SERVICE_NAMES, server)
+
+    server.add_insecure_port("[::]:" + port)
+    await server.start()
+
+    logger.info("Server (aio) started, listening on " + port)
+    await server.wait_for_termination()
+
+def run(worker_index: int = 0):
+    if SERVER_MODE == 'aio':
+        asyncio.run(serve_aio(worker_index))
+    else:
+        serve(worker_index)
+
+def serve_processes(processes: int):
+    """
+    Fork the worker processes, which serve the same port through SO_REUSEPORT so the CPU-bound work is spread
+    over the cores. Nothing is connected before the fork, every worker sets up its own portal session and
+    caches in create_servicer.
+    """
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=run, args=(index,), name=f'bridge-worker-{index}') for index in range(processes)]
+
+    for worker in workers:
+        worker.start()
+
+    def stop(signum, frame):
+        for worker in workers:
+            worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    logger.info(f"Started {processes} worker processes")
+
+    for worker in workers:
+        worker.join()
+        logger.info(f"{worker.name} exited with code {worker.exitcode}")
+
 if __name__ == "__main__":
-    logging.basicConfig(level=0)
-    serve()
+    if PROCESSES > 1:
+        logging.basicConfig(level=0, format='%(processName)s:%(levelname)s:%(name)s:%(message)s')
+        serve_processes(PROCESSES)
+    else:
+        logging.basicConfig(level=0)
+        run()
@@ -0,0 +1,180 @@
+"""
+Geometry helpers for the National Bridge spatial queries.
+"""
+from arcgis.geometry import Geometry
+from arcgis.geometry.filters import envelope_intersects, intersects
+from shapely.geometry import shape, box
+from shapely.geometry.polygon import orient
+from shapely.ops import unary_union
+from shapely import contains_xy, make_valid, prepare
+from shapely.errors import ShapelyError
+from common.geometry import to_crs, reproject
+import numpy as np
+import json
+
+
+def parse_geojson(geometry: str):
+    """
+    Parse GeoJSON string into Shapely geometry. Raise ValueError for invalid JSON or GeoJSON geometry.
+    """
+    geometry = json.loads(geometry)
+
+    try:
+        return shape(geometry)
+    except (AttributeError, KeyError, TypeError, ShapelyError) as e:
+        raise ValueError(f"Invalid GeoJSON geometry: {e!r}.") from e
+
+def parse_polygon(geometry: str):
+    """
+    Parse GeoJSON Polygon or MultiPolygon string into Shapely geometry. Invalid polygon, e.g. self-intersecting
+    boundary, is repaired. Raise ValueError for other geometry types.
+    """
+    polygon = parse_geojson(geometry)
+
+    if polygon.geom_type not in ('Polygon', 'MultiPolygon'):
+        raise ValueError(f"Spatial filter only accepts Polygon or MultiPolygon geometry, got {polygon.geom_type}.")
+
+    if not polygon.is_valid:
+        repaired = make_valid(polygon)
+
+        if repaired.geom_type == 'GeometryCollection':
+            repaired = unary_union([geom for geom in repaired.geoms if geom.geom_type in ('Polygon', 'MultiPolygon')])
+
+        polygon = repaired
+
+    return polygon
+
+def to_esri_polygon(polygon, spatial_reference: dict | None = None)->dict:
+    """
+    Convert Shapely Polygon or MultiPolygon into ESRI JSON polygon. Exterior rings are clockwise and holes are
+    counter-clockwise, as required by ArcGIS.
+    """
+    parts = list(polygon.geoms) if polygon.geom_type == 'MultiPolygon' else [polygon]
+    rings = list()
+
+    for part in parts:
+        part = orient(part, sign=-1.0)
+        rings.append([list(coord[:2]) for coord in part.exterior.coords])
+        rings.extend([list(coord[:2]) for coord in interior.coords] for interior in part.interiors)
+
+    esri_polygon = {'rings': rings}
+
+    if spatial_reference is not None:
+        esri_polygon['spatialReference'] = spatial_reference
+
+    return esri_polygon
+
+
+class PolygonFilter(object):
+    """
+    Spatial filter for the bridges contained by a GeoJSON Polygon or MultiPolygon. The layer is queried with a cheap
+    superset of the polygon, either its envelope or the convex hulls of its parts, then the candidates are refined
+    locally with a vectorized containment test against the full polygon including its holes.
+    """
+    def __init__(self, geojson: str, crs: str, prefilter: str = 'envelope', max_hull_vertices: int = 200):
+        if prefilter not in ('envelope', 'hull'):
+            raise ValueError(f"Unknown spatial prefilter {prefilter}.")
+
+        self.polygon = parse_polygon(geojson)
+        self.crs = to_crs(crs)
+        self.spatial_reference = {'wkt': crs} if crs else None
+        self.prefilter = prefilter
+        self.max_hull_vertices = max_hull_vertices
+        self._projected = dict()  # Polygon reprojected to the feature CRS
+
+    def geometry_filter(self)->dict:
+        """
+        ArcGIS geometry filter of the polygon superset.
+        """
+        if self.prefilter == 'hull':
+            return intersects(Geometry(to_esri_polygon(self.hull(), self.spatial_reference)), sr=self.spatial_reference)
+
+        xmin, ymin, xmax, ymax = self.polygon.bounds
+        envelope = {'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax}
+
+        if self.spatial_reference is not None:
+            envelope['spatialReference'] = self.spatial_reference
+
+        return envelope_intersects(Geometry(envelope), sr=self.spatial_reference)
+
+    def hull(self):
+        """
+        Union of the convex hull of every polygon part. Fall back to the convex hull of the whole polygon, then to
+        the simplified convex hull if the hull has more than max_hull_vertices vertices.
+        """
+        parts = list(self.polygon.geoms) if self.polygon.geom_type == 'MultiPolygon' else [self.polygon]
+        hull = unary_union([_polygon_hull(part) for part in parts])
+
+        if _vertex_count(hull) > self.max_hull_vertices:
+            hull = _polygon_hull(self.polygon)
+
+        if _vertex_count(hull) > self.max_hull_vertices:
+            hull = _reduce_hull(hull, self.max_hull_vertices)
+
+        return hull
+
+    def refine(self, features: list, spatial_reference=None)->list:
+        """
+        Return the features with point geometry contained by the polygon. spatial_reference is the CRS of the
+        feature geometries, the input CRS is assumed if it is unknown.
+        """
+        located = [(feature, feature.geometry) for feature in features if feature.geometry]
+        located = [(feature, geom) for feature, geom in located if (geom.get('x') is not None) and (geom.get('y') is not None)]
+
+        if len(located) == 0:
+            return list()
+
+        xs = np.array([geom['x'] for _, geom in located], dtype=float)
+        ys = np.array([geom['y'] for _, geom in located], dtype=float)
+        mask = contains_xy(self._polygon_in(spatial_reference), xs, ys)
+
+        return [feature for (feature, _), matched in zip(located, mask.tolist()) if matched]
+
+    def _polygon_in(self, spatial_reference):
+        key = json.dumps(spatial_reference, sort_keys=True, default=str)
+
+        if key not in self._projected:
+            polygon = reproject(self.polygon, self.crs, to_crs(spatial_reference))
+            prepare(polygon)
+            self._projected[key] = polygon
+
+        return self._projected[key]
+
+
+def _polygon_hull(polygon):
+    """
+    Convex hull of the polygon, the bounding box is used for a degenerate polygon.
+    """
+    hull = polygon.convex_hull
+
+    if hull.geom_type != 'Polygon':
+        return box(*polygon.bounds)
+
+    return hull
+
+def _reduce_hull(hull, max_vertices: int):
+    """
+    Reduce the vertices of a convex hull while still covering it. The hull is simplified with an increasing tolerance
+    until it has at most max_vertices vertices, then buffered outward by the tolerance.
+    """
+    xmin, ymin, xmax, ymax = hull.bounds
+    tolerance = max(xmax - xmin, ymax - ymin) * 1e-4
+
+    while tolerance > 0:
+        simplified = hull.simplify(tolerance, preserve_topology=False)
+
+        if (simplified.geom_type != 'Polygon') or simplified.is_empty:
+            break
+
+        if len(simplified.exterior.coords) <= max_vertices:
+            # Every hull vertex is within the tolerance of the simplified hull
+            return simplified.buffer(tolerance, join_style='mitre', mitre_limit=10.0)
+
+        tolerance *= 2
+
+    return box(*hull.bounds)
+
+def _vertex_count(polygon)->int:
+    parts = list(polygon.geoms) if polygon.geom_type == 'MultiPolygon' else [polygon]
+
+    return sum(len(part.exterior.coords) + sum(len(interior.coords) for interior in part.interiors) for part in parts)
@@ -1,8 +1,14 @@
-from arcgis.gis import GIS
 from arcgis.features import FeatureSet
-from arcgis.geometry.filters import contains
-from arcgis.geometry import Geometry
+from common.singleflight import SingleFlight
+from common.session import PortalSession
+from common.backend import PortalBackend, SQLiteBackend
+from .query_builder import in_clauses
+from .write_batcher import WriteBatcher
+from .geometry import PolygonFilter
+from common import deadline
+from concurrent.futures import ThreadPoolExecutor
 import json
+import math
 import os
 from dotenv import load_dotenv
 
@@ -12,40 +18,158 @@ load_dotenv('.env')
 PORTAL_URL=os.getenv('PORTAL_URL')
 PORTAL_USERNAME=os.getenv('PORTAL_USERNAME')
 PORTAL_PWD=os.getenv('PORTAL_PWD')
+BACKEND=os.getenv('BRIDGE_BACKEND', 'portal')  # 'portal' or 'sqlite'
+SQLITE_PATH=os.getenv('BRIDGE_SQLITE_PATH', 'national_bridge.sqlite')  # Local National Bridge layer for 'sqlite' backend
+EDIT_DATE_COL=os.getenv('BRIDGE_EDIT_DATE_COL')  # Override for the layer editor tracking field
+EDIT_BATCH_SIZE=int(os.getenv('BRIDGE_EDIT_BATCH_SIZE', 250))  # Maximum records for every edit_features request
+EDIT_MAX_WORKERS=int(os.getenv('BRIDGE_EDIT_MAX_WORKERS', 4))  # Maximum concurrent edit_features request
+QUERY_CHUNK_SIZE=int(os.getenv('BRIDGE_QUERY_CHUNK_SIZE', 500))  # Maximum values in a single IN clause
+QUERY_CHUNK_LENGTH=int(os.getenv('BRIDGE_QUERY_CHUNK_LENGTH', 4000))  # Maximum characters of a single IN clause
+QUERY_MAX_WORKERS=int(os.getenv('BRIDGE_QUERY_MAX_WORKERS', 4))  # Maximum concurrent IN clause chunk query
+QUERY_PAGE_SIZE=int(os.getenv('BRIDGE_QUERY_PAGE_SIZE', 1000))  # Default page size of the paginated query
+QUERY_MAX_PAGE_SIZE=int(os.getenv('BRIDGE_QUERY_MAX_PAGE_SIZE', 2000))  # Maximum page size, should not exceed the layer maxRecordCount
+SPATIAL_PREFILTER=os.getenv('BRIDGE_SPATIAL_PREFILTER', 'envelope')  # Polygon superset sent to the layer, 'envelope' or 'hull'
+SPATIAL_HULL_MAX_VERTICES=int(os.getenv('BRIDGE_SPATIAL_HULL_MAX_VERTICES', 200))  # Maximum vertices of the 'hull' prefilter
+INSERT_BATCH_WINDOW=float(os.getenv('BRIDGE_INSERT_BATCH_WINDOW', 0))  # Seconds to merge concurrent inserts, 0 disables it
+INSERT_BATCH_MAX_SIZE=int(os.getenv('BRIDGE_INSERT_BATCH_MAX_SIZE', EDIT_BATCH_SIZE))  # Maximum records of a merged insert
+# Seconds before a portal request is given up. A query left running past its RPC deadline holds a call executor thread
+# until it finishes, so this is the longest an abandoned query keeps its thread
+PORTAL_TIMEOUT=float(os.getenv('BRIDGE_PORTAL_TIMEOUT', 60))
+CALL_HEADROOM=float(os.getenv('BRIDGE_CALL_HEADROOM', 1))  # Extra call executor threads per RPC for the queries left running past their deadline
 
 FEATURE_SERVICE_NAME='Service_National_Bridge'
 
-# Login
-portal = GIS(PORTAL_URL, PORTAL_USERNAME, PORTAL_PWD)
+# edit_features results key for every edit type
+_EDIT_RESULT_KEYS = {
+    'adds': 'addResults',
+    'updates': 'updateResults',
+    'deletes': 'deleteResults'
+}
 
-# Search feature layer
-service_query = 'title: "{}" AND type: "Feature Service"'.format(FEATURE_SERVICE_NAME)
-search_result = portal.content.search(query=service_query, max_items=5)
-nbridge_lyr = search_result[0].layers[0]
+FEATURE_TABLE_NAME='NATIONAL_BRIDGE'  # Table name for 'sqlite' backend
+
+def create_backend():
+    """
+    Create the National Bridge layer backend selected by BRIDGE_BACKEND environment variable.
+    """
+    if BACKEND == 'sqlite':
+        return SQLiteBackend(SQLITE_PATH, FEATURE_TABLE_NAME, index_columns=['BRIDGE_ID', 'BRIDGE_NAME', 'BRIDGE_NUM'],
+                             interrupt=deadline.expired)
+    
+    # Portal session, login and feature layer search is done on the first query
+    service_query = 'title: "{}" AND type: "Feature Service"'.format(FEATURE_SERVICE_NAME)
+
+    return PortalBackend(PortalSession(PORTAL_URL, PORTAL_USERNAME, PORTAL_PWD, service_query, timeout=PORTAL_TIMEOUT))
+
+backend = create_backend()
+
+# Executor for dispatching edit batches
+edit_executor = ThreadPoolExecutor(max_workers=EDIT_MAX_WORKERS, thread_name_prefix='bridge-edit')
+
+# Executor for dispatching IN clause chunk queries
+query_executor = ThreadPoolExecutor(max_workers=QUERY_MAX_WORKERS, thread_name_prefix='bridge-query')
+
+# Executor for the layer queries of the RPC with deadline, the RPC thread only waits for them until its deadline.
+# Sized by the server with configure_call_executor, the queries are made inline until then
+call_executor = None
+
+def configure_call_executor(max_workers: int):
+    """
+    Size the executor of the deadline bounded layer queries. An RPC waits for a single query at a time, so the server
+    passes the number of RPC it runs at the same time. The RPC past its deadline leaves its query running for up to
+    PORTAL_TIMEOUT, the executor has CALL_HEADROOM extra threads per RPC so the abandoned queries do not hold every
+    thread from the live RPC.
+    """
+    global call_executor
+    call_executor = ThreadPoolExecutor(max_workers=max_workers + math.ceil(max_workers * CALL_HEADROOM),
+                                       thread_name_prefix='bridge-call')
+
+# Identical concurrent queries share a single layer query, every caller waits until its own deadline
+query_flight = SingleFlight(wait=deadline.wait_event, retry_on=(deadline.DeadlineExceeded, deadline.Cancelled))
+
+# Concurrent inserts are merged into a single edit, every record is added on its own so a failed record
+# does not roll back the records of other requests
+if INSERT_BATCH_WINDOW > 0:
+    insert_batcher = WriteBatcher(lambda features: _batched_edit('adds', features, rollback_on_failure=False)['addResults'],
+                                  window=INSERT_BATCH_WINDOW, max_size=INSERT_BATCH_MAX_SIZE)
+else:
+    insert_batcher = None
 
 def insert(features: list)->dict:
     """
-    Add features to the National Bridge layer.
+    Add features to the National Bridge layer. If insert batching is enabled, the features are sent together
+    with the features of concurrent insert requests.
     """
-    results = nbridge_lyr.edit_features(adds=features)
+    if insert_batcher is not None:
+        return {'addResults': insert_batcher.submit(features)}
 
-    return results
+    return _batched_edit('adds', features)
 
 def delete(oids: list)->dict:
     """
     Delete features from National Bridge layer.
     """
-    results = nbridge_lyr.edit_features(deletes=oids)
-
-    return results
+    return _batched_edit('deletes', oids)
 
 def update(features: list)->dict:
     """
     Update features from National Bridge layer.
     """
-    results = nbridge_lyr.edit_features(updates=features)
+    return _batched_edit('updates', features)
+
+def retire(oids: list, end_date, objectid_col='OBJECTID', end_date_col='END_DATE')->dict:
+    """
+    Set the end date of the requested OBJECTID in National Bridge layer. Only OBJECTID and END_DATE are sent, and every
+    record is applied independently so a failed record does not roll back the others.
+    """
+    records = [{'attributes': {objectid_col: oid, end_date_col: end_date}} for oid in oids]
+
+    return _batched_edit('updates', records, rollback_on_failure=False)
+
+def _batched_edit(edit_type: str, records: list, batch_size: int | None = None, rollback_on_failure: bool = True)->dict:
+    """
+    Split the edit records into batches and send the batches concurrently to National Bridge layer.
+    The results of every batches are merged in the request order.
+    """
+    result_key = _EDIT_RESULT_KEYS[edit_type]
+
+    if batch_size is None:
+        batch_size = EDIT_BATCH_SIZE
+
+    batches = [records[i:i+batch_size] for i in range(0, len(records), batch_size)]
+    results = list()
+
+    # Edits are not bounded by the RPC deadline, an edit given up halfway would leave the layer partially edited
+    for batch_results in edit_executor.map(lambda batch: _edit_batch(edit_type, batch, rollback_on_failure), batches):
+        results.extend(batch_results)
 
-    return results
+    return {result_key: results}
+
+def _edit_batch(edit_type: str, batch: list, rollback_on_failure: bool = True)->list:
+    """
+    Send a single edit batch. If the request fails, every record in the batch is reported as failed and retryable.
+    """
+    result_key = _EDIT_RESULT_KEYS[edit_type]
+
+    try:
+        results = backend.edit_features(rollback_on_failure=rollback_on_failure, **{edit_type: batch})
+        return results[result_key]
+    except Exception as e:
+        return [_failed_edit_result(edit_type, record, str(e), retryable=True) for record in batch]
+
+def _failed_edit_result(edit_type: str, record, description: str, retryable: bool = False)->dict:
+    """
+    Create a failed edit result with the same structure as edit_features results. A retryable result is an edit
+    which was not made because the request failed, e.g. the portal is down.
+    """
+    if edit_type == 'deletes':
+        oid = record
+    elif edit_type == 'updates':
+        oid = {k.lower(): v for k, v in record['attributes'].items()}.get('objectid')
+    else:
+        oid = None
+
+    return {'objectId': oid, 'success': False, 'error': {'code': -1, 'description': description}, 'retryable': retryable}
 
 def get_active_oids(bridge_id: list, **kwargs)->int:
     """
@@ -56,71 +180,258 @@ def get_active_oids(bridge_id: list, **kwargs)->int:
 
     return df['OBJECTID'][0]
 
-def bridge_id_query(bridge_id: list, columns:None | list = None, bridge_id_col='BRIDGE_ID'):
+def bridge_id_query(bridge_id: list, columns:None | list = None, bridge_id_col='BRIDGE_ID', **kwargs):
     """
     Query National Bridge layer with added active date query
     """
-    str_list = str(bridge_id).strip('[]')  # Strip string list
-    query = f"{bridge_id_col} IN ({str_list})"
-    query_results = _raw_query_with_active_date(query, columns)
+    return in_query(bridge_id_col, bridge_id, columns, **kwargs)
+
+def bridge_objectid_query(bridge_id: list, bridge_id_col='BRIDGE_ID', objectid_col='OBJECTID')->dict:
+    """
+    Resolve the active OBJECTID of requested bridge ID. Return a dictionary of bridge ID and list of its OBJECTID,
+    a bridge ID could have multiple active records.
+    """
+    query_results = in_query(bridge_id_col, bridge_id, columns=[objectid_col, bridge_id_col], return_geometry=False)
+    oid_map = dict()
 
-    return query_results
+    for feature in query_results.features:
+        attr = feature.attributes
+        oid_map.setdefault(attr[bridge_id_col], list()).append(attr[objectid_col])
 
-def bridge_name_query(bridge_name: list, columns: None | list = None, bridge_name_col='BRIDGE_NAME'):
+    return oid_map
+
+def bridge_name_query(bridge_name: list, columns: None | list = None, bridge_name_col='BRIDGE_NAME', **kwargs):
     """
     Query National Bridge layer using bridge name with added active date query
     """
-    str_list = str(bridge_name).strip('[]')
-    query = f"{bridge_name_col} IN ({str_list})"
-    query_results = _raw_query_with_active_date(query, columns)
-
-    return query_results
+    return in_query(bridge_name_col, bridge_name, columns, **kwargs)
 
-def bridge_number_query(bridge_number: list, columns: None | list = None, bridge_num_col='BRIDGE_NUM'):
+def bridge_number_query(bridge_number: list, columns: None | list = None, bridge_num_col='BRIDGE_NUM', **kwargs):
     """
     Query National Bridge layer using bridge number with added active date query
     """
-    str_list = str(bridge_number).strip('[]')
-    query = f"{bridge_num_col} IN ({str_list})"
-    query_results = _raw_query_with_active_date(query, columns)
+    return in_query(bridge_num_col, bridge_number, columns, **kwargs)
 
-    return query_results
+def objectid_query(oids: list, columns: None | list = None, objectid_col='OBJECTID'):
+    """
+    Query National Bridge layer using OBJECTID with added active date query.
+    """
+    return in_query(objectid_col, [int(oid) for oid in oids], columns)
 
-def bridge_spatial_query(geometry: str, crs: str, columns: None | list = None):
+def in_query(column: str, values: list, columns: None | list = None, **kwargs)->FeatureSet:
     """
-    Query National Bridge layer using bridge number with added active date query.
-    Return bridge which is contained by the input/filter geometry. Only accepts Polygon geometry.
+    Query National Bridge layer for records which column value is in the requested values, with added active date query.
+    Large value list is split into chunks which are queried concurrently, the results are merged and deduplicated on OBJECTID.
     """
-    # Serialize the input GeoJSON string
-    input_geom_dict = json.loads(geometry)
-    input_geom_dict['rings'] = input_geom_dict.pop('coordinates')
-    input_geom_dict['spatialReference'] = {"wkt": crs}
+    clauses = in_clauses(column, values, max_values=QUERY_CHUNK_SIZE, max_length=QUERY_CHUNK_LENGTH)
 
-    # Create ArcGIS geometry object
-    input_geom = Geometry(input_geom_dict)
-    filter = contains(input_geom, sr={"wkt": crs})
+    if len(clauses) <= 1:
+        chunk_results = [_raw_query_with_active_date(clause, columns=columns, **kwargs) for clause in clauses]
+    else:
+        chunk_results = deadline.map(query_executor, lambda clause: _raw_query_with_active_date(clause, columns=columns, **kwargs), clauses)
+
+    return _merge_feature_sets(chunk_results)
+
+def paged_in_query(column: str, values: list, columns: None | list = None, page_size: int | None = None,
+                   after: int = 0, **kwargs):
+    """
+    Paginated in_query. Iterate through pages of (list of Feature, has more page) ordered by OBJECTID, starting 
+    after the requested OBJECTID.
+    """
+    clauses = in_clauses(column, values, max_values=QUERY_CHUNK_SIZE, max_length=QUERY_CHUNK_LENGTH)
+
+    return _paged_query(clauses, None, columns, page_size, after, **kwargs)
+
+def paged_spatial_query(geometry: str, crs: str, columns: None | list = None, page_size: int | None = None, 
+                        after: int = 0, **kwargs):
+    """
+    Paginated bridge_spatial_query. Iterate through pages of (list of Feature, has more page) ordered by OBJECTID,
+    starting after the requested OBJECTID.
+    """
+    polygon_filter = _polygon_filter(geometry, crs)
+    kwargs['return_geometry'] = True  # The geometry is needed for the local refinement
+
+    return _paged_query(["1=1"], polygon_filter.geometry_filter(), columns, page_size, after, refine=polygon_filter.refine, **kwargs)
+
+def active_records(columns: None | list = None):
+    """
+    Query all active records from National Bridge layer.
+    """
+    return _raw_query_with_active_date("1=1", columns=columns)
+
+def paged_active_records(columns: None | list = None, page_size: int | None = None, after: int = 0, **kwargs):
+    """
+    Paginated active_records. Iterate through pages of (list of Feature, has more page) ordered by OBJECTID,
+    starting after the requested OBJECTID.
+    """
+    return _paged_query(["1=1"], None, columns, page_size, after, **kwargs)
+
+def active_edit_stamps(objectid_col='OBJECTID')->dict:
+    """
+    Return all active OBJECTID mapped to its last edit date. The edit date is None if the layer does not have editor tracking.
+    """
+    edit_col = edit_date_field()
+
+    if edit_col is None:
+        columns = [objectid_col]
+    else:
+        columns = [objectid_col, edit_col]
+    
+    query_results = _raw_query_with_active_date("1=1", columns=columns, return_geometry=False)
+
+    return {feature.attributes[objectid_col]: feature.attributes.get(edit_col) for feature in query_results.features}
+
+def edit_date_field()->str | None:
+    """
+    Return the editor tracking edit date field name of National Bridge layer.
+    """
+    if EDIT_DATE_COL is not None:
+        return EDIT_DATE_COL
+    
+    edit_fields_info = backend.properties.get('editFieldsInfo')
+
+    if edit_fields_info is None:
+        return None
+    
+    return edit_fields_info.get('editDateField')
+
+def layer_spatial_reference()->dict | None:
+    """
+    Return the spatial reference of National Bridge layer, which is also the spatial reference of the query results.
+    """
+    properties = backend.properties
+    extent = properties.get('extent') or dict()
+
+    return properties.get('spatialReference') or extent.get('spatialReference') or properties.get('sourceSpatialReference')
+
+def bridge_spatial_query(geometry: str, crs: str, columns: None | list = None, **kwargs):
+    """
+    Query National Bridge layer using spatial filter with added active date query.
+    Return bridge which is contained by the input/filter geometry. Only accepts Polygon or MultiPolygon geometry.
+    The layer is queried with the polygon envelope or hull, then the exact containment is tested locally.
+    """
+    polygon_filter = _polygon_filter(geometry, crs)
+    kwargs['return_geometry'] = True  # The geometry is needed for the local refinement
 
     # Query
-    query_results = _raw_query_with_active_date("1=1", geometry_filter=filter, columns=columns)
+    query_results = _raw_query_with_active_date("1=1", geometry_filter=polygon_filter.geometry_filter(), columns=columns, **kwargs)
+
+    return _feature_set_like(query_results, polygon_filter.refine(query_results.features, query_results.spatial_reference))
+
+def normalize_page_size(page_size: int | None)->int:
+    """
+    Return the default page size for empty page size, and limit the page size to the maximum page size.
+    """
+    if (page_size is None) or (page_size <= 0):
+        return QUERY_PAGE_SIZE
+
+    return min(page_size, QUERY_MAX_PAGE_SIZE)
 
-    return query_results
+def _polygon_filter(geometry: str, crs: str)->PolygonFilter:
+    return PolygonFilter(geometry, crs, prefilter=SPATIAL_PREFILTER, max_hull_vertices=SPATIAL_HULL_MAX_VERTICES)
+
+def _paged_query(clauses: list, geometry_filter=None, columns: None | list = None, page_size: int | None = None,
+                 after: int = 0, objectid_col='OBJECTID', refine=None, **kwargs):
+    """
+    Keyset pagination on OBJECTID. Every page queries the clauses for the next page_size records after the last
+    OBJECTID, so only a single page is held in memory and the pages are stable while the layer is edited.
+    If refine is given, it filters the features of every page, so a page could have less than page_size features.
+    """
+    page_size = normalize_page_size(page_size)
+
+    if (columns is not None) and (objectid_col not in columns):
+        columns = [objectid_col] + list(columns)
+
+    page_kwargs = dict(order_by_fields=f"{objectid_col} ASC", result_record_count=page_size, return_all_records=False, **kwargs)
+
+    def query_page(clause, after):
+        query = "({0}) AND {1} > {2}".format(clause, objectid_col, int(after))
+        return _raw_query_with_active_date(query, geometry_filter=geometry_filter, columns=columns, **page_kwargs)
+
+    while True:
+        if len(clauses) <= 1:
+            chunk_results = [query_page(clause, after) for clause in clauses]
+        else:
+            chunk_results = deadline.map(query_executor, lambda clause: query_page(clause, after), clauses)
+
+        merged = _merge_feature_sets(chunk_results)
+        features = sorted(merged.features, key=lambda feature: feature.attributes[objectid_col])
+        has_more = (len(features) > page_size) or any(len(result.features) >= page_size for result in chunk_results)
+        features = features[:page_size]
+
+        if len(features) == 0:
+            return
+
+        last_oid = features[-1].attributes[objectid_col]
+
+        if refine is not None:
+            features = refine(features, merged.spatial_reference)
+
+        if len(features) != 0:
+            yield features, has_more
+
+        if not has_more:
+            return
+
+        after = last_oid
 
 def _raw_query_with_active_date(query: str, geometry_filter=None, columns: None | list = None, 
-                                start_date_col='START_DATE', end_date_col='END_DATE'):
+                                start_date_col='START_DATE', end_date_col='END_DATE', **kwargs):
     """
-    Execute raw query on National Bridge layer with added active date query
+    Execute raw query on National Bridge layer with added active date query.
+    Identical concurrent queries are coalesced into a single layer query, which is bounded by the RPC deadline.
     """
     active_query = "({0} is NULL or {0} < CURRENT_TIMESTAMP) AND ({1} is NULL or {1} > CURRENT_TIMESTAMP)".format(start_date_col, end_date_col)
 
     query = query + " AND " + active_query
 
     if columns is None:
-        query_results = nbridge_lyr.query(where=query, geometry_filter=geometry_filter, out_fields="*")
+        out_fields = "*"
     else:
-        query_results = nbridge_lyr.query(where=query, geometry_filter=geometry_filter, out_fields=columns)
+        out_fields = columns
+
+    key = json.dumps([query, geometry_filter, out_fields, kwargs], sort_keys=True, default=str)
+    query_results = query_flight.do(key, deadline.call, call_executor, backend.query, where=query, geometry_filter=geometry_filter,
+                                    out_fields=out_fields, **kwargs)
     
     if type(query_results) == dict:
         return FeatureSet.from_dict(query_results)
     else:
-        return query_results    
+        return query_results
+
+def _merge_feature_sets(feature_sets: list, objectid_col='OBJECTID')->FeatureSet:
+    """
+    Merge multiple FeatureSet queried from National Bridge layer into a single FeatureSet. Features are deduplicated on OBJECTID.
+    """
+    if len(feature_sets) == 0:
+        return FeatureSet([])
+    
+    if len(feature_sets) == 1:
+        return feature_sets[0]
+    
+    features = list()
+    oids = set()
+
+    for feature_set in feature_sets:
+        for feature in feature_set.features:
+            oid = feature.attributes.get(objectid_col)
 
+            if oid is not None:
+                if oid in oids:
+                    continue
+
+                oids.add(oid)
+
+            features.append(feature)
+
+    return _feature_set_like(feature_sets[0], features)
+
+def _feature_set_like(feature_set: FeatureSet, features: list)->FeatureSet:
+    """
+    Create FeatureSet of the features with the same schema as the FeatureSet.
+    """
+    return FeatureSet(features, 
+                      fields=feature_set.fields, 
+                      geometry_type=feature_set.geometry_type, 
+                      spatial_reference=feature_set.spatial_reference,
+                      object_id_field_name=feature_set.object_id_field_name)
@@ -0,0 +1,45 @@
+"""
+SQL where clause builder for National Bridge layer queries.
+"""
+from numbers import Number
+
+
+def sql_literal(value)->str:
+    """
+    Convert Python value into SQL literal. String quotes are escaped by doubling the quote.
+    """
+    if value is None:
+        return 'NULL'
+
+    if isinstance(value, Number) and not isinstance(value, bool):
+        return str(value)
+
+    return "'{0}'".format(str(value).replace("'", "''"))
+
+def in_clauses(column: str, values: list, max_values: int = 500, max_length: int = 4000)->list:
+    """
+    Compile 'column IN (...)' clauses from list of values. The values are deduplicated and sorted, then split into
+    chunks which have at most max_values values and max_length characters in the value list.
+    """
+    clauses = list()
+    chunk = list()
+    chunk_length = 0
+
+    for value in sorted(set(values)):
+        literal = sql_literal(value)
+
+        if (len(chunk) != 0) and ((len(chunk) >= max_values) or (chunk_length + len(literal) + 2 > max_length)):
+            clauses.append(_in_clause(column, chunk))
+            chunk = list()
+            chunk_length = 0
+
+        chunk.append(literal)
+        chunk_length += len(literal) + 2
+
+    if len(chunk) != 0:
+        clauses.append(_in_clause(column, chunk))
+
+    return clauses
+
+def _in_clause(column: str, literals: list)->str:
+    return "{0} IN ({1})".format(column, ', '.join(literals))
@@ -0,0 +1,85 @@
+"""
+Write coalescing of concurrent edit requests.
+"""
+import threading
+
+
+class _Batch(object):
+    """
+    Open batch shared by every caller arriving within the batch window.
+    """
+    def __init__(self):
+        self.records = list()
+        self.full = threading.Event()  # Set when the batch reached the size cap
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class WriteBatcher(object):
+    """
+    Merge the records of concurrent submit calls into a single fn(records) call. The first caller opens a batch
+    and waits for the batch window, or until the batch reached max_size records, then sends the batch on behalf
+    of every caller. fn should return a result for every record in the same order, and every caller receives
+    the slice of results for its own records.
+    """
+    def __init__(self, fn, window: float = 0.02, max_size: int = 250):
+        self.fn = fn
+        self.window = window  # Seconds to wait for more records after the batch is opened
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._batch = None
+
+    def submit(self, records: list)->list:
+        """
+        Add the records to the open batch and wait for the batch results. Return the results of the records.
+        """
+        records = list(records)
+
+        if len(records) == 0:
+            return list()
+
+        with self._lock:
+            batch = self._batch
+            leader = batch is None
+
+            if leader:
+                batch = _Batch()
+                self._batch = batch
+
+            start = len(batch.records)
+            batch.records.extend(records)
+
+            # Close the batch, the next caller opens a new one
+            if len(batch.records) >= self.max_size:
+                self._batch = None
+                batch.full.set()
+
+        if leader:
+            self._send(batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+
+        return batch.results[start:start + len(records)]
+
+    def _send(self, batch: _Batch):
+        batch.full.wait(self.window)
+
+        with self._lock:
+            if self._batch is batch:
+                self._batch = None
+
+        try:
+            results = self.fn(batch.records)
+
+            if len(results) != len(batch.records):
+                raise RuntimeError(f"Expected {len(batch.records)} results from the batch, got {len(results)}.")
+
+            batch.results = results
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
@@ -0,0 +1,126 @@
+"""
+Change feed of the National Bridge edits for the WatchChanges RPC.
+"""
+import bridge_master_pb2
+from collections import deque
+import itertools
+import threading
+import time
+import uuid
+
+
+class FeedGap(Exception):
+    """
+    The requested events are no longer available, the subscriber should resynchronize its records.
+    """
+
+
+class ChangeFeed(object):
+    """
+    Sequenced log of the bridge change events. The events are kept in a bounded history, so a subscriber could resume
+    after its last received sequence while the sequence is still in the history. The feed ID changes every time the
+    server is restarted, as the sequence starts again from 1.
+    """
+    def __init__(self, history: int = 10000):
+        self.feed_id = uuid.uuid4().hex
+        self._events = deque(maxlen=history)
+        self._sequence = 0  # Sequence of the last published event
+        self._condition = threading.Condition()
+
+    @property
+    def sequence(self)->int:
+        return self._sequence
+
+    def publish(self, events: list):
+        """
+        Assign the sequence to the ChangeEvent messages and notify the subscribers.
+        """
+        if len(events) == 0:
+            return
+
+        timestamp = int(time.time() * 1000)
+
+        with self._condition:
+            for event in events:
+                self._sequence += 1
+                event.feed_id = self.feed_id
+                event.sequence = self._sequence
+                event.timestamp = timestamp
+                self._events.append(event)
+
+            self._condition.notify_all()
+
+    def publish_edits(self, change_type, bridges: list, results: list):
+        """
+        Publish the successful edits through the servicer. bridges are the edited Bridge, or None if only the
+        OBJECTID is known, paired with the edit Result.
+        """
+        events = list()
+
+        for bridge, result in zip(bridges, results):
+            if not result.success:
+                continue
+
+            event = bridge_master_pb2.ChangeEvent(type=change_type, source=bridge_master_pb2.SERVICER, objectid=result.objectid)
+
+            if bridge is None:
+                event.bridge_id = result.bridge_id
+            else:
+                event.bridge_id = bridge.attributes.bridge_id
+                event.bridge.CopyFrom(bridge)
+                event.bridge.attributes.objectid = result.objectid or bridge.attributes.objectid
+
+            events.append(event)
+
+        self.publish(events)
+
+    def reconcile(self, inserted: list, updated: list, removed: list):
+        """
+        Publish the changes found by comparing the layer with the replica, including the edits made outside of the
+        servicer. Listener of BridgeReplica.
+        """
+        events = list()
+        changes = [(bridge_master_pb2.INSERTED, inserted), (bridge_master_pb2.UPDATED, updated), (bridge_master_pb2.REMOVED, removed)]
+
+        for change_type, bridges in changes:
+            for bridge in bridges:
+                event = bridge_master_pb2.ChangeEvent(type=change_type, source=bridge_master_pb2.RECONCILE,
+                                                      objectid=bridge.attributes.objectid, bridge_id=bridge.attributes.bridge_id)
+
+                if change_type != bridge_master_pb2.REMOVED:
+                    event.bridge.CopyFrom(bridge)
+
+                events.append(event)
+
+        self.publish(events)
+
+    def subscribe(self, since: int = 0, feed_id: str = '', is_active=None, poll_interval: float = 1.0):
+        """
+        Iterate through the events after the since sequence, then wait for new events while is_active() is True.
+        Only new events are returned if since is 0. Raise FeedGap if the events are no longer in the history, or
+        the since sequence is from another feed.
+        """
+        if is_active is None:
+            is_active = lambda: True
+
+        with self._condition:
+            if (feed_id and (feed_id != self.feed_id)) or (since > self._sequence):
+                raise FeedGap(f"Events after sequence {since} of feed {feed_id or self.feed_id} are not available, "
+                              f"the current feed is {self.feed_id}.")
+
+            after = self._sequence if since == 0 else since
+
+        while is_active():
+            with self._condition:
+                self._condition.wait_for(lambda: self._sequence > after, timeout=poll_interval)
+
+                oldest = self._sequence - len(self._events) + 1
+
+                if after + 1 < oldest:
+                    raise FeedGap(f"Events after sequence {after} are no longer available, the oldest event is {oldest}.")
+
+                pending = list(itertools.islice(self._events, after + 1 - oldest, None))
+
+            for event in pending:
+                yield event
+                after = event.sequence
@@ -0,0 +1,232 @@
+"""
+Columnar conversion of National Bridge query results into protocol buffer Bridges message, or BridgeColumns message
+for the columnar requests.
+"""
+import bridge_master_pb2
+from google.protobuf.descriptor import FieldDescriptor
+from pandas import DataFrame
+from pandas.api.types import is_datetime64_any_dtype
+import numpy as np
+
+
+_CASTERS = {
+    FieldDescriptor.CPPTYPE_STRING: str,
+    FieldDescriptor.CPPTYPE_INT32: int,
+    FieldDescriptor.CPPTYPE_INT64: int,
+    FieldDescriptor.CPPTYPE_UINT32: int,
+    FieldDescriptor.CPPTYPE_UINT64: int,
+    FieldDescriptor.CPPTYPE_DOUBLE: float,
+    FieldDescriptor.CPPTYPE_FLOAT: float,
+    FieldDescriptor.CPPTYPE_BOOL: bool
+}
+
+
+class FieldPlan(object):
+    """
+    Conversion plan compiled once from a message descriptor. Every field is paired with its Python type caster.
+    """
+    def __init__(self, descriptor):
+        self.fields = [(field.name, _CASTERS[field.cpp_type]) for field in descriptor.fields]
+
+    def resolve(self, source_columns, fields: list | None = None)->list:
+        """
+        Match the plan against the source column names (case insensitive). Return list of (field name, source column, caster).
+        If fields is given, only the requested fields are included.
+        """
+        lower_columns = {str(col).lower(): col for col in source_columns}
+
+        return [(name, lower_columns[name], caster) for name, caster in self.fields 
+                if (name in lower_columns) and ((fields is None) or (name in fields))]
+
+
+ATTRIBUTES_PLAN = FieldPlan(bridge_master_pb2.Attributes.DESCRIPTOR)
+
+# Value of a missing attribute in BridgeColumns, the same as the unset Attributes field
+_COLUMN_DEFAULTS = {name: caster() for name, caster in ATTRIBUTES_PLAN.fields}
+
+
+def to_bridges(results, fields: list | None = None, geometry: bool = True, columnar: bool = False)->bridge_master_pb2.Bridges:
+    """
+    Convert FeatureSet or spatial DataFrame into Bridges message. Only the requested attribute fields are
+    converted if fields is given, and the geometry is skipped if geometry is False. If columnar is True,
+    the bridges are returned as BridgeColumns in Bridges.columns.
+    """
+    if isinstance(results, DataFrame):
+        return dataframe_to_bridges(results, fields=fields, geometry=geometry, columnar=columnar)
+    else:
+        return features_to_bridges(results.features, fields=fields, geometry=geometry, columnar=columnar)
+
+def features_to_bridges(features: list, fields: list | None = None, geometry: bool = True,
+                        columnar: bool = False)->bridge_master_pb2.Bridges:
+    """
+    Convert list of Feature into Bridges message. All features are assumed to have the same attribute columns.
+    """
+    if len(features) == 0:
+        return bridge_master_pb2.Bridges()
+
+    plan = ATTRIBUTES_PLAN.resolve(features[0].attributes.keys(), fields)
+    attributes = [feature.attributes for feature in features]
+    columns = [_cast_column([attr.get(col) for attr in attributes], caster) for _, col, caster in plan]
+
+    if geometry:
+        geometries = [_point(feature.geometry) for feature in features]
+    else:
+        geometries = [None] * len(features)
+
+    if columnar:
+        return bridge_master_pb2.Bridges(columns=_build_columns([name for name, _, _ in plan], columns, geometries if geometry else None))
+
+    return _build_bridges([name for name, _, _ in plan], columns, geometries)
+
+def dataframe_to_bridges(df: DataFrame, geometry_col='SHAPE', fields: list | None = None, geometry: bool = True,
+                         columnar: bool = False)->bridge_master_pb2.Bridges:
+    """
+    Convert spatial DataFrame into Bridges message. Date columns are converted to epoch milliseconds,
+    the same as the FeatureSet attributes.
+    """
+    if len(df) == 0:
+        return bridge_master_pb2.Bridges()
+
+    plan = ATTRIBUTES_PLAN.resolve(df.columns, fields)
+    columns = [_cast_column(_series_values(df[col]), caster) for _, col, caster in plan]
+
+    if geometry and (geometry_col in df.columns):
+        geometries = [_point(geom) for geom in df[geometry_col].tolist()]
+    else:
+        geometries = [None] * len(df)
+
+    if columnar:
+        return bridge_master_pb2.Bridges(columns=_build_columns([name for name, _, _ in plan], columns, geometries if geometry else None))
+
+    return _build_bridges([name for name, _, _ in plan], columns, geometries)
+
+def bridges_to_columns(bridges: list, fields: list | None = None, geometry: bool = True)->bridge_master_pb2.BridgeColumns:
+    """
+    Convert list of Bridge message into BridgeColumns message, e.g. the bridges from the replica.
+    """
+    names = [name for name, _ in ATTRIBUTES_PLAN.fields if (fields is None) or (name in fields)]
+    attributes = [bridge.attributes for bridge in bridges]
+    bridge_columns = bridge_master_pb2.BridgeColumns()
+
+    for name in names:
+        getattr(bridge_columns, name).extend([getattr(attr, name) for attr in attributes])
+
+    if geometry:
+        located = [bridge.HasField('geometry') for bridge in bridges]
+        bridge_columns.x.extend([bridge.geometry.x if has_geometry else np.nan for bridge, has_geometry in zip(bridges, located)])
+        bridge_columns.y.extend([bridge.geometry.y if has_geometry else np.nan for bridge, has_geometry in zip(bridges, located)])
+
+        for bridge, has_geometry in zip(bridges, located):
+            if has_geometry and bridge.geometry.spatial_reference.wkt:
+                bridge_columns.spatial_reference.wkt = bridge.geometry.spatial_reference.wkt
+                break
+
+    return bridge_columns
+
+def null_attributes(features: list)->list:
+    """
+    Return the null Attributes fields of every Feature as frozenset of field names, including the fields which are
+    not in the layer. The unset Attributes field could not tell the null from the default value, e.g. for the export.
+    """
+    if len(features) == 0:
+        return list()
+
+    plan = ATTRIBUTES_PLAN.resolve(features[0].attributes.keys())
+    missing = frozenset(_COLUMN_DEFAULTS) - {name for name, _, _ in plan}
+    shared = dict()  # Equal sets are shared between the features
+    nulls = list()
+
+    for feature in features:
+        attr = feature.attributes
+        names = missing.union([name for name, col, _ in plan if attr.get(col) is None])
+        nulls.append(shared.setdefault(names, names))
+
+    return nulls
+
+def feature_to_bridge(feature)->bridge_master_pb2.Bridge:
+    """
+    Convert a single Feature into Bridge message.
+    """
+    return features_to_bridges([feature]).bridges[0]
+
+def _series_values(series)->list:
+    """
+    Return the Series values as list, missing values are returned as None.
+    """
+    mask = series.isna().to_numpy()
+
+    if is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype='datetime64[ms]').astype(np.int64).tolist()
+    else:
+        values = series.tolist()
+
+    if mask.any():
+        return [None if missing else val for val, missing in zip(values, mask.tolist())]
+
+    return values
+
+def _cast_column(values: list, caster)->list:
+    return [None if val is None else caster(val) for val in values]
+
+def _point(geom)->dict | None:
+    """
+    Convert ArcGIS point geometry into Point message fields.
+    """
+    if geom is None:
+        return None
+
+    x = geom.get('x')
+    y = geom.get('y')
+
+    if (x is None) or (y is None):
+        return None
+
+    point = {'x': x, 'y': y}
+    spatial_reference = geom.get('spatialReference')
+
+    if (spatial_reference is not None) and (spatial_reference.get('wkt') is not None):
+        point['spatial_reference'] = {'wkt': spatial_reference['wkt']}
+
+    return point
+
+def _build_bridges(names: list, columns: list, geometries: list)->bridge_master_pb2.Bridges:
+    """
+    Build Bridges message from the converted columns.
+    """
+    Bridge = bridge_master_pb2.Bridge
+
+    if len(names) == 0:
+        rows = [()] * len(geometries)
+    else:
+        rows = zip(*columns)
+
+    bridges = [
+        Bridge(attributes={name: val for name, val in zip(names, row) if val is not None}, geometry=geometry)
+        for row, geometry in zip(rows, geometries)
+    ]
+
+    return bridge_master_pb2.Bridges(bridges=bridges)
+
+def _build_columns(names: list, columns: list, geometries: list | None)->bridge_master_pb2.BridgeColumns:
+    """
+    Build BridgeColumns message from the converted columns. Missing values are replaced with the field default,
+    and missing coordinates with NaN. The geometry columns are skipped if geometries is None.
+    """
+    bridge_columns = bridge_master_pb2.BridgeColumns()
+
+    for name, values in zip(names, columns):
+        default = _COLUMN_DEFAULTS[name]
+        getattr(bridge_columns, name).extend([default if val is None else val for val in values])
+
+    if geometries is None:
+        return bridge_columns
+
+    bridge_columns.x.extend([np.nan if geom is None else geom['x'] for geom in geometries])
+    bridge_columns.y.extend([np.nan if geom is None else geom['y'] for geom in geometries])
+
+    for geom in geometries:
+        if (geom is not None) and ('spatial_reference' in geom):
+            bridge_columns.spatial_reference.wkt = geom['spatial_reference']['wkt']
+            break
+
+    return bridge_columns
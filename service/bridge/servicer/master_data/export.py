@@ -0,0 +1,182 @@
+"""
+Columnar export of the National Bridge records as Arrow IPC stream or GeoParquet file.
+"""
+import bridge_master_pb2
+from google.protobuf.descriptor import FieldDescriptor
+from common.geometry import to_crs
+from .converter import ATTRIBUTES_PLAN
+from shapely import points, to_wkb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import numpy as np
+import json
+
+
+_ARROW_TYPES = {
+    FieldDescriptor.CPPTYPE_STRING: pa.string(),
+    FieldDescriptor.CPPTYPE_INT32: pa.int32(),
+    FieldDescriptor.CPPTYPE_INT64: pa.int64(),
+    FieldDescriptor.CPPTYPE_UINT32: pa.uint32(),
+    FieldDescriptor.CPPTYPE_UINT64: pa.uint64(),
+    FieldDescriptor.CPPTYPE_DOUBLE: pa.float64(),
+    FieldDescriptor.CPPTYPE_FLOAT: pa.float32(),
+    FieldDescriptor.CPPTYPE_BOOL: pa.bool_()
+}
+
+ATTRIBUTE_TYPES = [(field.name, _ARROW_TYPES[field.cpp_type]) for field in bridge_master_pb2.Attributes.DESCRIPTOR.fields]
+
+GEOMETRY_COL = 'geometry'
+
+FORMATS = {
+    bridge_master_pb2.ARROW_IPC: 'arrow',
+    bridge_master_pb2.GEOPARQUET: 'parquet'
+}
+
+
+def export_schema(fields: list | None = None, geometry: bool = True, spatial_reference=None)->pa.Schema:
+    """
+    Arrow schema of the exported Attributes fields, in the Attributes message order. The geometry column is
+    WKB encoded with GeoParquet and GeoArrow metadata.
+    """
+    schema_fields = [pa.field(name, arrow_type) for name, arrow_type in ATTRIBUTE_TYPES if (fields is None) or (name in fields)]
+
+    if not geometry:
+        return pa.schema(schema_fields)
+
+    crs = to_crs(spatial_reference)
+    projjson = None if crs is None else crs.to_json_dict()
+
+    extension_metadata = {} if projjson is None else {'crs': projjson}
+    schema_fields.append(pa.field(GEOMETRY_COL, pa.binary(), metadata={
+        'ARROW:extension:name': 'geoarrow.wkb',
+        'ARROW:extension:metadata': json.dumps(extension_metadata)
+    }))
+
+    geo = {
+        'version': '1.0.0',
+        'primary_column': GEOMETRY_COL,
+        'columns': {GEOMETRY_COL: {'encoding': 'WKB', 'geometry_types': ['Point'], 'crs': projjson}}
+    }
+
+    return pa.schema(schema_fields, metadata={'geo': json.dumps(geo)})
+
+def features_to_batch(features: list, schema: pa.Schema)->pa.RecordBatch:
+    """
+    Convert list of Feature into record batch. The values are cast the same as the Attributes message fields,
+    fields which are not in the layer are null.
+    """
+    plan = {name: (col, caster) for name, col, caster in ATTRIBUTES_PLAN.resolve(features[0].attributes.keys() if features else [])}
+    attributes = [feature.attributes for feature in features]
+    arrays = list()
+
+    for field in schema:
+        if field.name == GEOMETRY_COL:
+            geometries = [feature.geometry or {} for feature in features]
+            arrays.append(_wkb_array([geom.get('x') for geom in geometries], [geom.get('y') for geom in geometries]))
+        elif field.name in plan:
+            col, caster = plan[field.name]
+            arrays.append(pa.array([None if attr.get(col) is None else caster(attr.get(col)) for attr in attributes], type=field.type))
+        else:
+            arrays.append(pa.nulls(len(features), type=field.type))
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def bridges_to_batch(records: list, schema: pa.Schema)->pa.RecordBatch:
+    """
+    Convert list of (Bridge message, null field names) into record batch, e.g. the records from the replica.
+    The null fields are null the same as the layer records, instead of the Attributes default value.
+    """
+    bridges = [bridge for bridge, _ in records]
+    arrays = list()
+
+    for field in schema:
+        if field.name == GEOMETRY_COL:
+            located = [bridge.HasField('geometry') for bridge in bridges]
+            xs = [bridge.geometry.x if has_geometry else None for bridge, has_geometry in zip(bridges, located)]
+            ys = [bridge.geometry.y if has_geometry else None for bridge, has_geometry in zip(bridges, located)]
+            arrays.append(_wkb_array(xs, ys))
+        else:
+            arrays.append(pa.array([None if field.name in nulls else getattr(bridge.attributes, field.name) 
+                                    for bridge, nulls in records], type=field.type))
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def _wkb_array(xs: list, ys: list)->pa.Array:
+    """
+    WKB encoded points, null for missing coordinate.
+    """
+    xs = np.array([np.nan if x is None else x for x in xs], dtype=float)
+    ys = np.array([np.nan if y is None else y for y in ys], dtype=float)
+    located = ~(np.isnan(xs) | np.isnan(ys))
+
+    geometries = np.full(len(xs), None, dtype=object)
+    geometries[located] = points(xs[located], ys[located])
+
+    return pa.array(to_wkb(geometries), type=pa.binary())
+
+
+class _ChunkSink(object):
+    """
+    Writable file object which keeps the written bytes until they are drained.
+    """
+    def __init__(self):
+        self.buffers = list()
+        self.closed = False
+
+    def write(self, data)->int:
+        self.buffers.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self, chunk_size: int)->list:
+        """
+        Return the written bytes as list of chunks with at most chunk_size bytes.
+        """
+        data = b''.join(self.buffers)
+        self.buffers = list()
+
+        return [data[start:start + chunk_size] for start in range(0, len(data), chunk_size)]
+
+
+class ExportWriter(object):
+    """
+    Write record batches into Arrow IPC stream or GeoParquet file, and return the encoded bytes as they are
+    produced. Every batch is a record batch of the IPC stream or a row group of the Parquet file, so the
+    concatenated chunks are a complete stream or file after close.
+    """
+    def __init__(self, export_format: str, schema: pa.Schema, chunk_size: int = 1024 * 1024):
+        if export_format not in FORMATS.values():
+            raise ValueError(f"Unknown export format {export_format}.")
+
+        self.schema = schema
+        self.chunk_size = chunk_size  # Maximum bytes of a single chunk
+        self._sink = _ChunkSink()
+
+        if export_format == 'parquet':
+            self._writer = pq.ParquetWriter(self._sink, schema)
+        else:
+            self._writer = pa.ipc.new_stream(self._sink, schema)
+
+    def write(self, batch: pa.RecordBatch)->list:
+        """
+        Write the record batch. Return the encoded bytes chunks.
+        """
+        if isinstance(self._writer, pq.ParquetWriter):
+            self._writer.write_batch(batch, row_group_size=max(batch.num_rows, 1))
+        else:
+            self._writer.write_batch(batch)
+
+        return self._sink.drain(self.chunk_size)
+
+    def close(self)->list:
+        """
+        Finish the stream or file. Return the remaining encoded bytes chunks.
+        """
+        self._writer.close()
+
+        return self._sink.drain(self.chunk_size)
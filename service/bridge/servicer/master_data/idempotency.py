@@ -0,0 +1,180 @@
+"""
+Idempotency key deduplication of the edit RPCs.
+"""
+from collections import OrderedDict
+import functools
+import hashlib
+import threading
+import time
+import grpc
+from common import deadline
+
+
+METADATA_KEY = 'idempotency-key'  # gRPC metadata key of the client idempotency key
+
+
+class KeyConflict(Exception):
+    """
+    The idempotency key was already used for a different request.
+    """
+
+
+class _Entry(object):
+    """
+    Response of a single idempotency key, shared by the original call and its duplicates.
+    """
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint  # Hash of the original request
+        self.done = threading.Event()
+        self.response = None
+        self.expires = None  # Monotonic expiry time, None while the call is in-flight
+
+
+class IdempotencyCache(object):
+    """
+    Bounded cache of the edit responses keyed on the client idempotency key. A request with a known key receives
+    the stored response instead of being executed again, and a duplicate arriving while the original call is still
+    in-flight waits for it until its own deadline. Only successful responses are stored, if the original call fails the duplicate is
+    executed as a new call. A response rejected by the store predicate of the call, e.g. an edit which was not made
+    because the layer was down, is not stored either. Responses are evicted after ttl seconds, or the oldest first
+    above max_entries.
+    """
+    def __init__(self, ttl: float = 600, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # Completed entries are ordered by expiry time
+
+    def __len__(self):
+        return len(self._entries)
+
+    def do(self, key, fingerprint: str, fn, store=None):
+        """
+        Return the stored response of the key, or execute fn() and store its response unless store(response) is
+        False. Raise KeyConflict if the key was used for a request with a different fingerprint.
+        """
+        while True:
+            with self._lock:
+                self._evict(time.monotonic())
+                entry = self._entries.get(key)
+                leader = entry is None
+
+                if leader:
+                    entry = _Entry(fingerprint)
+                    self._entries[key] = entry
+
+            if entry.fingerprint != fingerprint:
+                raise KeyConflict(key)
+
+            if leader:
+                break
+
+            deadline.wait_event(entry.done)
+
+            if entry.response is not None:
+                return entry.response
+
+        try:
+            response = fn()
+        except BaseException:
+            self._discard(key, entry)
+            raise
+
+        if (store is not None) and (not store(response)):
+            self._discard(key, entry)
+            return response
+
+        with self._lock:
+            entry.response = response
+            entry.expires = time.monotonic() + self.ttl
+
+            if self._entries.get(key) is entry:
+                self._entries.move_to_end(key)
+
+        entry.done.set()
+
+        return response
+
+    def _discard(self, key, entry: _Entry):
+        """
+        Drop the in-flight entry without response, the waiting duplicates are executed as a new call.
+        """
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+
+        entry.done.set()
+
+    def _evict(self, now: float):
+        """
+        Drop the expired responses, then the oldest responses to make room for a new entry within max_entries.
+        In-flight calls are kept.
+        """
+        expired = list()
+
+        for key, entry in self._entries.items():
+            if entry.expires is None:
+                continue
+
+            if entry.expires > now:
+                break
+
+            expired.append(key)
+
+        for key in expired:
+            del self._entries[key]
+
+        if len(self._entries) < self.max_entries:
+            return
+
+        completed = [key for key, entry in self._entries.items() if entry.expires is not None]
+
+        for key in completed[:len(self._entries) - self.max_entries + 1]:
+            del self._entries[key]
+
+
+def request_key(context)->str | None:
+    """
+    Return the idempotency key from the request metadata, None if it is not sent.
+    """
+    for key, value in context.invocation_metadata() or ():
+        if (key == METADATA_KEY) and value:
+            return value
+
+    return None
+
+def applied(response)->bool:
+    """
+    Return False if an edit of the EditResults response was not made because the layer request failed, so the
+    retry with the same key should be executed again.
+    """
+    for results in (response.add_results, response.update_results, response.delete_results):
+        if any(result.retryable for result in results):
+            return False
+
+    return True
+
+def idempotent(fn):
+    """
+    Decorator for the edit RPCs. A request with idempotency key metadata is deduplicated through the servicer
+    idempotency_cache, keyed on the RPC name and the key. The key is rejected if it was used for a different request.
+    A response with a retryable edit result is not stored.
+    """
+    method = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(self, request, context):
+        key = request_key(context)
+
+        if (key is None) or (self.idempotency_cache is None):
+            return fn(self, request, context)
+
+        fingerprint = hashlib.sha256(request.SerializeToString(deterministic=True)).hexdigest()
+
+        try:
+            return self.idempotency_cache.do((method, key), fingerprint, lambda: fn(self, request, context),
+                                           store=applied)
+        except KeyConflict:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Idempotency key {key!r} was used for a different request.")
+
+    return wrapper
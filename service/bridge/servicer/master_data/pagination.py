@@ -0,0 +1,34 @@
+"""
+Keyset cursor for the paginated Stream RPCs.
+"""
+import base64
+import json
+
+
+def encode_cursor(after: int)->str:
+    """
+    Create an opaque cursor for the page starting after the OBJECTID.
+    """
+    return base64.urlsafe_b64encode(json.dumps({'after': int(after)}).encode()).decode()
+
+def decode_cursor(cursor: str)->int:
+    """
+    Return the OBJECTID encoded in the cursor, 0 for empty cursor. Raise ValueError for invalid cursor.
+    """
+    if len(cursor) == 0:
+        return 0
+
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))['after'])
+    except Exception:
+        raise ValueError(f"Invalid cursor {cursor!r}.")
+
+def paginate(bridges: list, page_size: int, after: int = 0):
+    """
+    Paginate list of Bridge message in memory. Iterate through pages of (list of Bridge, has more page) ordered
+    by objectid, starting after the requested objectid.
+    """
+    bridges = sorted((bridge for bridge in bridges if bridge.attributes.objectid > after), key=lambda bridge: bridge.attributes.objectid)
+
+    for start in range(0, len(bridges), page_size):
+        yield bridges[start:start + page_size], start + page_size < len(bridges)
@@ -0,0 +1,83 @@
+"""
+Field mask projection of the bridge query results.
+"""
+import bridge_master_pb2
+from . import converter
+
+_ATTRIBUTE_FIELDS = [field.name for field in bridge_master_pb2.Attributes.DESCRIPTOR.fields]
+
+
+class Projection(object):
+    """
+    Bridge fields requested by a FieldMask. The paths are relative to the Bridge message, e.g. 'attributes.bridge_id',
+    'attributes' for all attributes or 'geometry'. An empty mask requests every field, objectid is always returned.
+    If columnar is True, the bridges are returned as BridgeColumns.
+    """
+    def __init__(self, field_mask=None, columnar: bool = False):
+        paths = list(field_mask.paths) if field_mask is not None else list()
+
+        self.attributes = None  # Requested attribute fields, None for all attributes
+        self.geometry = len(paths) == 0
+        self.columnar = columnar
+
+        if len(paths) == 0:
+            return
+
+        attributes = {'objectid'}
+        all_attributes = False
+
+        for path in paths:
+            if path == 'geometry':
+                self.geometry = True
+            elif path == 'attributes':
+                all_attributes = True
+            elif path.startswith('attributes.') and (path[len('attributes.'):] in _ATTRIBUTE_FIELDS):
+                attributes.add(path[len('attributes.'):])
+            else:
+                raise ValueError(f"Invalid field mask path {path!r}.")
+
+        if not all_attributes:
+            self.attributes = [name for name in _ATTRIBUTE_FIELDS if name in attributes]
+
+    def is_full(self)->bool:
+        """
+        Return True if every field is requested.
+        """
+        return (self.attributes is None) and self.geometry
+
+    @property
+    def columns(self)->list | None:
+        """
+        Layer columns for the query out_fields, None for all columns.
+        """
+        if self.attributes is None:
+            return None
+
+        return [name.upper() for name in self.attributes]
+
+    def project(self, bridges: bridge_master_pb2.Bridges)->bridge_master_pb2.Bridges:
+        """
+        Copy only the requested fields of Bridges message, e.g. the bridges from the replica.
+        """
+        if self.columnar:
+            return bridge_master_pb2.Bridges(columns=converter.bridges_to_columns(bridges.bridges, self.attributes, self.geometry),
+                                             next_cursor=bridges.next_cursor)
+
+        if self.is_full():
+            return bridges
+
+        projected = bridge_master_pb2.Bridges(next_cursor=bridges.next_cursor)
+
+        for bridge in bridges.bridges:
+            target = projected.bridges.add()
+
+            if self.attributes is None:
+                target.attributes.CopyFrom(bridge.attributes)
+            else:
+                for name in self.attributes:
+                    setattr(target.attributes, name, getattr(bridge.attributes, name))
+
+            if self.geometry and bridge.HasField('geometry'):
+                target.geometry.CopyFrom(bridge.geometry)
+
+        return projected
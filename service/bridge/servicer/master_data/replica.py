@@ -0,0 +1,380 @@
+"""
+In-memory replica of the active National Bridge records.
+"""
+import bridge_master_pb2
+from .api import nat_bridge_api as bridge_api
+from . import converter
+from .spatial_index import BridgeSpatialIndex
+import logging
+import threading
+import time
+
+
+INDEX_COLUMNS = {
+    'bridge_id': 'BRIDGE_ID',
+    'bridge_name': 'BRIDGE_NAME',
+    'bridge_num': 'BRIDGE_NUM'
+}
+
+
+class _ReplicaState(object):
+    """
+    Immutable snapshot of the replica. A refresh builds a new state and swaps it, so readers never need a lock.
+    """
+    def __init__(self, bridges: dict, stamps: dict, indexes: dict, spatial_index: BridgeSpatialIndex | None = None,
+                 nulls: dict | None = None):
+        self.bridges = bridges  # OBJECTID -> Bridge
+        self.stamps = stamps  # OBJECTID -> last edit date
+        self.nulls = nulls if nulls is not None else dict()  # OBJECTID -> null attribute field names
+        self.indexes = indexes  # Index name -> {value: {OBJECTID}}
+        self.spatial_index = spatial_index  # STRtree over the bridge points
+
+
+class BridgeReplica(object):
+    """
+    Load the active National Bridge records once and keep them in memory with hash indexes on
+    BRIDGE_ID, BRIDGE_NAME and BRIDGE_NUM and a spatial index on the geometry. The replica is refreshed 
+    incrementally in a background thread, every refresh_interval seconds from the layer edit dates, and after
+    the servicer edits for the edited OBJECTID only. The edit requests within refresh_delay seconds are coalesced
+    into a single query. A layer without editor tracking has no edit date to find the records edited outside of
+    the servicer, so all of its records are reloaded every reload_interval seconds instead.
+    """
+    def __init__(self, refresh_interval: float = 60, max_staleness: float | None = None, refresh_delay: float = 0.5,
+                 reload_interval: float | None = None, logger=None):
+        if logger is None:
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = logger
+
+        self.refresh_interval = refresh_interval
+        self.refresh_delay = refresh_delay
+
+        if max_staleness is None:
+            self.max_staleness = refresh_interval * 3
+        else:
+            self.max_staleness = max_staleness
+
+        if reload_interval is None:
+            self.reload_interval = refresh_interval * 10
+        else:
+            self.reload_interval = reload_interval
+
+        self.last_refresh = None  # Monotonic time of the last successful refresh
+        self.last_reload = None  # Monotonic time of the last reload of the records without edit date
+        self.spatial_reference = None  # National Bridge layer spatial reference
+        self._state = _ReplicaState(dict(), dict(), {name: dict() for name in INDEX_COLUMNS})
+        self._refresh_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending = set()  # Edited OBJECTID waiting for the refresh
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._listeners = list()
+
+    def add_listener(self, listener):
+        """
+        Call listener(inserted, updated, removed) with list of Bridge after every refresh which found changes.
+        The initial load is not reported.
+        """
+        self._listeners.append(listener)
+
+        return self
+
+    def start(self):
+        """
+        Start the background refresh thread. The first refresh loads the whole active records.
+        """
+        if self._thread is not None:
+            return self
+
+        self._thread = threading.Thread(target=self._run, name='bridge-replica', daemon=True)
+        self._thread.start()
+
+        return self
+
+    def stop(self):
+        """
+        Stop the background refresh thread.
+        """
+        self._stopped.set()
+        self._wakeup.set()
+
+    def request_refresh(self, oids: list):
+        """
+        Wake the background thread to refresh the edited OBJECTID, e.g. after an edit.
+        """
+        if len(oids) == 0:
+            return
+
+        with self._pending_lock:
+            self._pending.update(oids)
+
+        self._wakeup.set()
+
+    def is_ready(self)->bool:
+        """
+        Return True if the replica has been loaded and is not older than the maximum staleness.
+        """
+        if self.last_refresh is None:
+            return False
+
+        return (time.monotonic() - self.last_refresh) <= self.max_staleness
+
+    def get_by(self, index: str, values: list)->bridge_master_pb2.Bridges:
+        """
+        Return active bridges which has the requested values on the index column.
+        """
+        state = self._state
+        lookup = state.indexes[index]
+        oids = set()
+
+        for value in values:
+            oids.update(lookup.get(value, ()))
+
+        return bridge_master_pb2.Bridges(bridges=[state.bridges[oid] for oid in sorted(oids)])
+
+    def get_all(self)->list:
+        """
+        Return list of (Bridge, null attribute field names) of all active bridges ordered by OBJECTID. The bridges
+        are not copied into a Bridges message, as it is used for the bulk export.
+        """
+        state = self._state
+
+        return [(state.bridges[oid], state.nulls[oid]) for oid in sorted(state.bridges)]
+
+    def get_by_spatial_filter(self, geojson: str, crs: str)->bridge_master_pb2.Bridges:
+        """
+        Return active bridges which is contained by the input GeoJSON polygon.
+        """
+        state = self._state
+        oids = state.spatial_index.contains(geojson, crs)
+
+        return bridge_master_pb2.Bridges(bridges=[state.bridges[oid] for oid in oids.tolist()])
+
+    def get_nearest(self, points: list, k: int = 1, max_distance: float = 0)->list:
+        """
+        Return (Bridges, distances in meters) of the k active bridges nearest to every Point message, ordered by distance.
+        """
+        state = self._state
+        results = list()
+
+        for point in points:
+            oids, distances = state.spatial_index.nearest(point.x, point.y, point.spatial_reference.wkt, k, max_distance)
+            bridges = bridge_master_pb2.Bridges(bridges=[state.bridges[oid] for oid in oids.tolist()])
+            results.append((bridges, distances.tolist()))
+
+        return results
+
+    def refresh(self):
+        """
+        Synchronize the replica with National Bridge layer. Only new or edited records are fetched,
+        records which are no longer active are dropped. The records without edit date are only fetched
+        once the reload_interval has passed.
+        """
+        with self._refresh_lock:
+            state = self._state
+            stamps = bridge_api.active_edit_stamps()
+            reload = (self.last_reload is None) or (time.monotonic() - self.last_reload >= self.reload_interval)
+
+            removed = state.stamps.keys() - stamps.keys()
+            changed = [oid for oid, stamp in stamps.items() 
+                       if (oid not in state.stamps) or (state.stamps[oid] != stamp) or (reload and (stamp is None))]
+
+            if len(state.stamps) == 0 or len(changed) > len(stamps) // 2:
+                query_results = bridge_api.active_records()
+            elif len(changed) != 0:
+                query_results = bridge_api.objectid_query(changed)
+            else:
+                query_results = None
+
+            if reload:
+                self.last_reload = time.monotonic()
+
+            self._apply(state, query_results, removed, stamps, changed)
+
+    def refresh_objectids(self, oids: list):
+        """
+        Synchronize the requested OBJECTID with National Bridge layer, e.g. the edited records. Requested records
+        which are no longer active are dropped. The changes are not reported to the listeners, as the servicer
+        has published its edits already.
+        """
+        with self._refresh_lock:
+            state = self._state
+            query_results = bridge_api.objectid_query(oids)
+            edit_col = bridge_api.edit_date_field()
+            stamps = dict(state.stamps)
+
+            for feature in query_results.features:
+                stamps[feature.attributes['OBJECTID']] = feature.attributes.get(edit_col)
+
+            found = {feature.attributes['OBJECTID'] for feature in query_results.features}
+            removed = (set(oids) - found) & state.stamps.keys()
+
+            for oid in removed:
+                stamps.pop(oid)
+
+            self._apply(state, query_results, removed, stamps, list(found), notify=False)
+
+    def _apply(self, state: _ReplicaState, query_results, removed: set, stamps: dict, changed: list, notify: bool = True):
+        """
+        Swap in a new state with the fetched records and without the removed records. The hash indexes are updated
+        for the changed records only, and the spatial index is rebuilt only if a geometry has changed. The changes
+        are reported to the listeners if notify is True.
+        """
+        features = list() if query_results is None else query_results.features
+
+        if (self.spatial_reference is None) and (query_results is not None):
+            self.spatial_reference = query_results.spatial_reference
+
+        bridges = dict(state.bridges)
+        nulls = dict(state.nulls)
+        previous = list()  # (OBJECTID, Bridge) replaced or removed
+        current = list()  # (OBJECTID, Bridge) added
+        geometry_changed = state.spatial_index is None
+
+        for oid in removed:
+            nulls.pop(oid, None)
+            bridge = bridges.pop(oid, None)
+
+            if bridge is not None:
+                previous.append((oid, bridge))
+                geometry_changed = geometry_changed or bridge.HasField('geometry')
+
+        for bridge, null_fields in zip(converter.features_to_bridges(features).bridges, converter.null_attributes(features)):
+            oid = bridge.attributes.objectid
+
+            # Only keep records which are still active
+            if oid not in stamps:
+                continue
+
+            if oid in bridges:
+                previous.append((oid, bridges[oid]))
+                geometry_changed = geometry_changed or (_geometry(bridges[oid]) != _geometry(bridge))
+            else:
+                geometry_changed = geometry_changed or bridge.HasField('geometry')
+
+            bridges[oid] = bridge
+            nulls[oid] = null_fields
+            current.append((oid, bridge))
+
+        if len(previous) + len(current) > len(bridges) // 2:
+            indexes = self._build_indexes(bridges)
+        else:
+            indexes = self._update_indexes(state.indexes, previous, current)
+
+        if geometry_changed:
+            spatial_index = BridgeSpatialIndex.from_bridges(bridges, self.spatial_reference)
+        else:
+            spatial_index = state.spatial_index
+
+        self._state = _ReplicaState(bridges, stamps, indexes, spatial_index, nulls)
+        initial_load = self.last_refresh is None
+        self.last_refresh = time.monotonic()
+
+        self.logger.info(f"Bridge replica refreshed, total: {len(bridges)}, changed: {len(changed)}, removed: {len(removed)}")
+
+        if notify and (not initial_load) and (len(self._listeners) != 0):
+            self._notify(state.bridges, bridges, changed, removed)
+
+    def _notify(self, previous: dict, bridges: dict, changed: list, removed: set):
+        """
+        Compare the previous and the refreshed records, and report the changes to the listeners. Changed records
+        without any changed value, e.g. layer without editor tracking, are not reported.
+        """
+        changed = [oid for oid in changed if oid in bridges]
+        inserted = [bridges[oid] for oid in changed if oid not in previous]
+        updated = [bridges[oid] for oid in changed if (oid in previous) and (previous[oid] != bridges[oid])]
+        removed = [previous[oid] for oid in removed if oid in previous]
+
+        if len(inserted) + len(updated) + len(removed) == 0:
+            return
+
+        for listener in self._listeners:
+            try:
+                listener(inserted, updated, removed)
+            except Exception:
+                self.logger.exception("Bridge replica listener failed.")
+
+    @staticmethod
+    def _build_indexes(bridges: dict)->dict:
+        indexes = {name: dict() for name in INDEX_COLUMNS}
+
+        for oid, bridge in bridges.items():
+            for name, lookup in indexes.items():
+                lookup.setdefault(getattr(bridge.attributes, name), set()).add(oid)
+
+        return indexes
+
+    @staticmethod
+    def _update_indexes(indexes: dict, previous: list, current: list)->dict:
+        """
+        Return the hash indexes without the previous and with the current (OBJECTID, Bridge). Only the OBJECTID sets
+        of the changed values are copied, the indexes of the previous state are left as they are.
+        """
+        updated = dict()
+
+        for name, lookup in indexes.items():
+            lookup = dict(lookup)
+            copied = set()
+
+            for oids, add in ((previous, False), (current, True)):
+                for oid, bridge in oids:
+                    value = getattr(bridge.attributes, name)
+
+                    if value not in copied:
+                        lookup[value] = set(lookup.get(value, ()))
+                        copied.add(value)
+
+                    if add:
+                        lookup[value].add(oid)
+                    else:
+                        lookup[value].discard(oid)
+
+            for value in copied:
+                if len(lookup[value]) == 0:
+                    del lookup[value]
+
+            updated[name] = lookup
+
+        return updated
+
+    def _take_pending(self)->list:
+        with self._pending_lock:
+            pending = list(self._pending)
+            self._pending.clear()
+
+        return pending
+
+    def _run(self):
+        next_refresh = 0  # Monotonic time of the next refresh from the edit dates
+
+        while not self._stopped.is_set():
+            try:
+                if time.monotonic() >= next_refresh:
+                    next_refresh = time.monotonic() + self.refresh_interval
+                    self.refresh()
+
+                # The edited OBJECTID are kept until the initial load has been made
+                pending = self._take_pending() if self.last_refresh is not None else list()
+
+                if len(pending) != 0:
+                    try:
+                        self.refresh_objectids(pending)
+                    except Exception:
+                        # Retried after the next edit or with the next refresh
+                        with self._pending_lock:
+                            self._pending.update(pending)
+
+                        raise
+            except Exception:
+                self.logger.exception("Bridge replica refresh failed.")
+
+            if self._wakeup.wait(max(next_refresh - time.monotonic(), 0)):
+                # Coalesce the edits made within the delay into a single refresh
+                self._stopped.wait(self.refresh_delay)
+
+            self._wakeup.clear()
+
+
+def _geometry(bridge: bridge_master_pb2.Bridge)->bridge_master_pb2.Point | None:
+    return bridge.geometry if bridge.HasField('geometry') else None
@@ -1,126 +1,196 @@
 import bridge_master_pb2, bridge_master_pb2_grpc
+import grpc
 import logging
+import threading
 import time
-from google.protobuf.json_format import MessageToDict, ParseDict
+from google.protobuf.json_format import MessageToDict
+from pyproj.exceptions import CRSError
 from .api import nat_bridge_api as bridge_api
-import copy
+from .api.geometry import parse_polygon
+from . import converter
+from .pagination import encode_cursor, decode_cursor, paginate
+from .projection import Projection
+from . import export
+from .idempotency import IdempotencyCache, idempotent
+from .changes import ChangeFeed, FeedGap
+from common import metrics
+from common import deadline
+from common.admission import admitted
+from common.geometry import to_crs
+
+
+# Full name of the service for the metrics label
+SERVICE_NAME = bridge_master_pb2.DESCRIPTOR.services_by_name['BridgeMaster'].full_name
 
+class BridgeMaster(bridge_master_pb2_grpc.BridgeMasterServicer):
+    def __init__(self, logger=None, replica=None, request_log=None, nearest_max_k=100, export_batch_size=10000,
+                 export_chunk_size=1024 * 1024, idempotency_cache=None, change_feed=None, max_watch_streams=4, latency_budget=None,
+                 admission=None, reconciler=None, *args, **kwargs):
+        if logger is None:
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = logger
 
-def service_logger():
-    """
-    Attach logger to the service end point.
-    """
-    def decorator(fn):
-        def wrapper(*args, **kwargs):
-            cls = args[0]
+        # Sampled request logging, used by the metrics decorator
+        if request_log is None:
+            self.request_log = metrics.RequestLog(logger=self.logger)
+        else:
+            self.request_log = request_log
 
-            start_time = time.perf_counter()
-            results = fn(*args, **kwargs)
-            end_time =  time.perf_counter()
+        # Optional in-memory replica for serving the read end points
+        self.replica = replica
 
-            cls.logger.info(f"{fn.__name__}, total time: {end_time-start_time}, request {args[1]}")
+        # Optional replica which only reconciles the change feed with the layer, if the read replica is disabled.
+        # It is notified of the edits as well, so they are not published again as reconciled changes
+        self.reconciler = reconciler
 
-            return results
+        # Maximum k of a GetNearest request
+        self.nearest_max_k = nearest_max_k
 
-        wrapper.__name__ = fn.__name__
-        return wrapper
-    
-    return decorator
+        # Default rows of every exported record batch and maximum bytes of every export chunk
+        self.export_batch_size = export_batch_size
+        self.export_chunk_size = export_chunk_size
 
-class BridgeMaster(bridge_master_pb2_grpc.BridgeMasterServicer):
-    def __init__(self, logger=None, *args, **kwargs):
-        if logger is None:
-            self.logger = logging.getLogger(__name__)
+        # Stored responses of the edit RPCs with idempotency key
+        if idempotency_cache is None:
+            self.idempotency_cache = IdempotencyCache()
         else:
-            self.logger = logger
+            self.idempotency_cache = idempotency_cache
+
+        # Change events of the edit RPCs for WatchChanges, every open stream holds a worker thread
+        if change_feed is None:
+            self.change_feed = ChangeFeed()
+        else:
+            self.change_feed = change_feed
+
+        self.max_watch_streams = max_watch_streams
+        self._watch_streams = 0
+        self._watch_lock = threading.Lock()
+
+        # Expected latency of every RPC, for rejecting the calls which could not finish before their deadline
+        self.latency_budget = latency_budget
+
+        # Per-method concurrency limits, None to admit every call
+        self.admission = admission
 
         super(BridgeMaster, self).__init__(*args, **kwargs)
     
-    @service_logger()
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
     def GetByID(self, request, context):
         """
         Bridge Master data query using bridge ID.
         """
         req_id = request.bridge_ids
-        response = bridge_api.bridge_id_query(req_id)
-        bridges = bridge_master_pb2.Bridges()
-        
-        for feature in response.features:
-            bridge = self.feature_to_pb_bridge(feature)
-            bridges.bridges.append(bridge)
 
-        return bridges
+        projection = self._projection(request, context)
+
+        if self._replica_ready():
+            with metrics.stage('replica'):
+                return projection.project(self.replica.get_by('bridge_id', req_id))
+
+        with metrics.stage('backend'):
+            response = bridge_api.bridge_id_query(req_id, columns=projection.columns, return_geometry=projection.geometry)
+
+        with metrics.stage('convert'):
+            return converter.to_bridges(response, fields=projection.attributes, geometry=projection.geometry,
+                                        columnar=projection.columnar)
     
-    @service_logger()
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
     def GetByName(self, request, context):
         """
         Bridge Master data query using bridge name.
         """
         req_name = request.name
-        response = bridge_api.bridge_name_query(req_name)
-        bridges = bridge_master_pb2.Bridges()
-            
-        for feature in response.features:
-            bridge = self.feature_to_pb_bridge(feature)
-            bridges.bridges.append(bridge)
 
-        return bridges
+        projection = self._projection(request, context)
+
+        if self._replica_ready():
+            with metrics.stage('replica'):
+                return projection.project(self.replica.get_by('bridge_name', req_name))
+
+        with metrics.stage('backend'):
+            response = bridge_api.bridge_name_query(req_name, columns=projection.columns, return_geometry=projection.geometry)
+
+        with metrics.stage('convert'):
+            return converter.to_bridges(response, fields=projection.attributes, geometry=projection.geometry,
+                                        columnar=projection.columnar)
     
-    @service_logger()
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
     def GetByBridgeNumber(self, request, context):
         """
         Bridge Master data query using bridge number
         """
         req_num = request.number
-        response = bridge_api.bridge_number_query(req_num)
-        bridges = bridge_master_pb2.Bridges()
 
-        for feature in response.features:
-            bridge = self.feature_to_pb_bridge(feature)
-            bridges.bridges.append(bridge)
+        projection = self._projection(request, context)
+
+        if self._replica_ready():
+            with metrics.stage('replica'):
+                return projection.project(self.replica.get_by('bridge_num', req_num))
+
+        with metrics.stage('backend'):
+            response = bridge_api.bridge_number_query(req_num, columns=projection.columns, return_geometry=projection.geometry)
 
-        return bridges
+        with metrics.stage('convert'):
+            return converter.to_bridges(response, fields=projection.attributes, geometry=projection.geometry,
+                                        columnar=projection.columnar)
     
-    @service_logger()
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
     def GetBySpatialFilter(self, request, context):
         """
         Bridge Master data query using spatial filter.
         """
         geojson = request.geojson
         crs = request.crs
-        response = bridge_api.bridge_spatial_query(geojson, crs)
-        bridges = bridge_master_pb2.Bridges()
 
-        for feature in response.features:
-            bridge = self.feature_to_pb_bridge(feature)
-            bridges.bridges.append(bridge)
+        self._check_spatial_filter(request, context)
+        projection = self._projection(request, context)
 
-        return bridges
+        # Portal is only used if the local spatial index is not available or stale
+        if self._replica_ready():
+            with metrics.stage('replica'):
+                return projection.project(self.replica.get_by_spatial_filter(geojson, crs))
 
-    @service_logger()
+        with metrics.stage('backend'):
+            response = bridge_api.bridge_spatial_query(geojson, crs, columns=projection.columns, return_geometry=projection.geometry)
+
+        with metrics.stage('convert'):
+            return converter.to_bridges(response, fields=projection.attributes, geometry=projection.geometry,
+                                        columnar=projection.columnar)
+
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    @idempotent
     def Insert(self, request, context):
         """
         Implementation for Bridge Master data isnert using ArcGIS API for Python through GRPC Service.
         """
-        bridge_dict = MessageToDict(request,
-                                    preserving_proto_field_name=True)
+        with metrics.stage('convert'):
+            bridge_dict = MessageToDict(request,
+                                        preserving_proto_field_name=True)
         
-        results = bridge_api.insert(bridge_dict['bridges'])
-        results_pb = list()
-       
-        for result in results['addResults']:
-            result_pb = bridge_master_pb2.Result()
-            result_pb.objectid = result['objectId']
-            result_pb.success = result['success']
-
-            if result.get('globalId') is not None:
-                result_pb.global_id = result.get('globalId')
+        with metrics.stage('backend'):
+            results = bridge_api.insert(bridge_dict['bridges'])
+        results_pb = self.edit_results_to_pb(results['addResults'])
 
-            results_pb.append(result_pb)
+        self.change_feed.publish_edits(bridge_master_pb2.INSERTED, request.bridges, results_pb)
+        self._request_replica_refresh(results_pb)
 
         return bridge_master_pb2.EditResults(add_results = results_pb)
     
-    @service_logger()
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    @idempotent
     def Update(self, request, context):
         """
         Implementation for Bridge Master data update using ArcGIS API for Python through GRPC Service.
@@ -129,133 +199,456 @@ class BridgeMaster(bridge_master_pb2_grpc.BridgeMasterServicer):
         # If requested bridges already has objectid, then it will be copied to here
         updated_bridges = bridge_master_pb2.Bridges()
 
-        # Validate if all requested Bridge object has ObjectID
-        # Iterate through all requested Bridge
-        for bridge in request.bridges:
-            self.fill_objectid(bridge, updated_bridges)
-        
-        bridge_dict = MessageToDict(updated_bridges,
-                                    preserving_proto_field_name=True)
-        
-        results = bridge_api.update(bridge_dict['bridges'])
+        # Resolve the missing ObjectID of all requested Bridge, paired with the error of the unresolved bridge
+        with metrics.stage('lookup'):
+            targets = self.fill_objectids(request.bridges, updated_bridges)
+
+        if len(updated_bridges.bridges) != 0:
+            with metrics.stage('convert'):
+                bridge_dict = MessageToDict(updated_bridges,
+                                            preserving_proto_field_name=True)
+
+            with metrics.stage('backend'):
+                results = bridge_api.update(bridge_dict['bridges'])['updateResults']
+        else:
+            results = list()
+
+        edit_results = iter(self.edit_results_to_pb(results))
+        edited_bridges = iter(updated_bridges.bridges)
+        bridges = list()
         results_pb = list()
-       
-        for result in results['updateResults']:
-            result_pb = bridge_master_pb2.Result()
-            result_pb.objectid = result['objectId']
-            result_pb.success = result['success']
 
-            if result.get('globalId') is not None:
-                result_pb.global_id = result.get('globalId')
+        for bridge_id, error in targets:
+            if error is None:
+                result_pb = next(edit_results)
+                bridges.append(next(edited_bridges))
+            else:
+                result_pb = bridge_master_pb2.Result(success=False, error=error)
+                bridges.append(None)
 
+            result_pb.bridge_id = bridge_id
             results_pb.append(result_pb)
 
+        self.change_feed.publish_edits(bridge_master_pb2.UPDATED, bridges, results_pb)
+        self._request_replica_refresh(results_pb)
+
         return bridge_master_pb2.EditResults(update_results = results_pb)
     
-    @service_logger()
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    @idempotent
     def Delete(self, request, context):
         """
         Implementation for Bridge Master data delete using ArcGIS API for Python through GRPC Service.
         Delete Bridge Master data based on requestd objectids.
         """
         oids = [oid for oid in request.objectids]
-        results = bridge_api.delete(oids)
-        results_pb = list()
-       
-        for result in results['deleteResults']:
-            result_pb = bridge_master_pb2.Result()
-            result_pb.objectid = result['objectId']
-            result_pb.success = result['success']
 
-            if result.get('globalId') is not None:
-                result_pb.global_id = result.get('globalId')
+        with metrics.stage('backend'):
+            results = bridge_api.delete(oids)
 
-            results_pb.append(result_pb)
+        results_pb = self.edit_results_to_pb(results['deleteResults'])
+
+        self.change_feed.publish_edits(bridge_master_pb2.DELETED, [None] * len(results_pb), results_pb)
+        self._request_replica_refresh(results_pb)
 
         return bridge_master_pb2.EditResults(delete_results = results_pb)
     
-    @service_logger()
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    @idempotent
     def Retire(self, request, context):
         """
         Implementation for Bridge Master data retire using ArcGIS API for Python through GRPC Service. 
-        Update the END_DATE column and set it to current time.
+        Update the END_DATE column and set it to current time. Only OBJECTID and END_DATE are sent in a single batched
+        update, the missing OBJECTID are resolved from the bridge ID using a single query. Every requested bridge has
+        a result for every of its active record, or a failed result if it has no active record.
         """
-        # For holding bridges that has been updated with objectid
-        # If requested bridges already has objectid, then it will be copied to here
-        updated_bridges = bridge_master_pb2.Bridges()
+        end_date = int(time.time() * 1000)  # Current time as epoch milliseconds
 
-        # Validate if all requested Bridge object has ObjectID
-        # Iterate through all requested Bridge
-        for bridge in request.bridges:
-            updated_bridge = bridge_master_pb2.Bridge()  # Create a new empty Bridge object
+        # Requested bridge ID paired with the OBJECTID to retire, None if it could not be resolved
+        with metrics.stage('lookup'):
+            targets = self.retire_targets(request.bridges)
 
-            # ONLY SEND UPDATE REQUEST USING BRIDGE_ID, OBJECT_ID and END_DATE
-            updated_bridge.attributes.bridge_id = bridge.attributes.bridge_id  # Fill in the bridge id
-            updated_bridge.attributes.objectid = bridge.attributes.objectid  # Fill in the object id
-            updated_bridge.attributes.end_date = time.strftime('%m/%d/%Y %H:%M:%S')  # Set the end date to current time
+        oids = [oid for _, oid, _ in targets if oid is not None]
 
-            self.fill_objectid(bridge, updated_bridges)  # Get the objectid for input bridge, if not available
-        
-        bridge_dict = MessageToDict(updated_bridges,
-                                    preserving_proto_field_name=True)
-        
-        results = bridge_api.update(bridge_dict['bridges'])
+        if len(oids) != 0:
+            with metrics.stage('backend'):
+                results = bridge_api.retire(oids, end_date)['updateResults']
+        else:
+            results = list()
+
+        edit_results = iter(self.edit_results_to_pb(results))
         results_pb = list()
-       
-        for result in results['updateResults']:
+
+        for bridge_id, oid, error in targets:
+            if oid is None:
+                result_pb = bridge_master_pb2.Result(success=False, error=error)
+            else:
+                result_pb = next(edit_results)
+
+            result_pb.bridge_id = bridge_id
+            results_pb.append(result_pb)
+
+        self.change_feed.publish_edits(bridge_master_pb2.RETIRED, [None] * len(results_pb), results_pb)
+        self._request_replica_refresh(results_pb)
+
+        return bridge_master_pb2.EditResults(update_results = results_pb)
+    
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    def StreamByID(self, request, context):
+        """
+        Paginated Bridge Master data query using bridge ID.
+        """
+        req_id = request.bridge_ids
+
+        yield from self._stream_query(request, context,
+                                      lambda: self.replica.get_by('bridge_id', req_id),
+                                      lambda page_size, after, **query_kwargs: bridge_api.paged_in_query('BRIDGE_ID', req_id, page_size=page_size, after=after, **query_kwargs))
+
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    def StreamByName(self, request, context):
+        """
+        Paginated Bridge Master data query using bridge name.
+        """
+        req_name = request.name
+
+        yield from self._stream_query(request, context,
+                                      lambda: self.replica.get_by('bridge_name', req_name),
+                                      lambda page_size, after, **query_kwargs: bridge_api.paged_in_query('BRIDGE_NAME', req_name, page_size=page_size, after=after, **query_kwargs))
+
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    def StreamByBridgeNumber(self, request, context):
+        """
+        Paginated Bridge Master data query using bridge number.
+        """
+        req_num = request.number
+
+        yield from self._stream_query(request, context,
+                                      lambda: self.replica.get_by('bridge_num', req_num),
+                                      lambda page_size, after, **query_kwargs: bridge_api.paged_in_query('BRIDGE_NUM', req_num, page_size=page_size, after=after, **query_kwargs))
+
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    def StreamBySpatialFilter(self, request, context):
+        """
+        Paginated Bridge Master data query using spatial filter.
+        """
+        geojson = request.geojson
+        crs = request.crs
+
+        self._check_spatial_filter(request, context)
+
+        yield from self._stream_query(request, context,
+                                      lambda: self.replica.get_by_spatial_filter(geojson, crs),
+                                      lambda page_size, after, **query_kwargs: bridge_api.paged_spatial_query(geojson, crs, page_size=page_size, after=after, **query_kwargs))
+
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    def GetNearest(self, request, context):
+        """
+        Nearest bridges query for every requested point, served from the spatial index of the replica.
+        """
+        k = request.k or 1
+
+        if (k < 1) or (k > self.nearest_max_k):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"k should be between 1 and {self.nearest_max_k}, got {k}.")
+
+        if request.max_distance < 0:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"max_distance should not be negative, got {request.max_distance}.")
+
+        projection = self._projection(request, context)
+
+        # There is no nearest query on the layer, the replica is required
+        if self.replica is None:
+            context.abort(grpc.StatusCode.FAILED_PRECONDITION, "GetNearest requires the in-memory bridge replica.")
+
+        if not self.replica.is_ready():
+            context.abort(grpc.StatusCode.UNAVAILABLE, "Bridge replica is not loaded or stale.")
+
+        with metrics.stage('replica'):
+            nearest = self.replica.get_nearest(request.points, k, request.max_distance)
+
+        with metrics.stage('convert'):
+            response = bridge_master_pb2.NearestResults()
+
+            for bridges, distances in nearest:
+                result = response.results.add()
+
+                for bridge, distance in zip(projection.project(bridges).bridges, distances):
+                    result.neighbors.add(bridge=bridge, distance=distance)
+
+        return response
+
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
+    def Export(self, request, context):
+        """
+        Export the active bridges as Arrow IPC stream or GeoParquet file. The records are fetched from the replica
+        or the layer page by page, and every batch_size records are encoded as a single record batch or row group.
+        """
+        if request.batch_size < 0:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"batch_size should not be negative, got {request.batch_size}.")
+
+        export_format = export.FORMATS.get(request.format)
+
+        if export_format is None:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Unknown export format {request.format}.")
+
+        batch_size = request.batch_size or self.export_batch_size
+        projection = self._projection(request, context)
+
+        if self._replica_ready():
+            spatial_reference = self.replica.spatial_reference
+
+            with metrics.stage('replica'):
+                records = self.replica.get_all()
+
+            pages = iter([records[start:start + batch_size] for start in range(0, len(records), batch_size)])
+            to_batch = export.bridges_to_batch
+            fetch_stage = 'replica'
+        else:
+            with metrics.stage('backend'):
+                spatial_reference = bridge_api.layer_spatial_reference()
+
+            pages = (features for features, _ in bridge_api.paged_active_records(columns=projection.columns, page_size=batch_size,
+                                                                                 return_geometry=projection.geometry))
+            to_batch = export.features_to_batch
+            fetch_stage = 'backend'
+
+        schema = export.export_schema(projection.attributes, projection.geometry, spatial_reference)
+        writer = export.ExportWriter(export_format, schema, chunk_size=self.export_chunk_size)
+        records = list()
+
+        while True:
+            with metrics.stage(fetch_stage):
+                page = next(pages, None)
+
+            if page is not None:
+                records.extend(page)
+
+            # Encode once the batch is full, or the remaining records after the last page
+            if (len(records) >= batch_size) or ((page is None) and (len(records) != 0)):
+                with metrics.stage('convert'):
+                    chunks = writer.write(to_batch(records[:batch_size], schema))
+
+                records = records[batch_size:]
+
+                for chunk in chunks:
+                    yield bridge_master_pb2.ExportChunk(data=chunk)
+
+            if (page is None) and (len(records) == 0):
+                break
+
+        with metrics.stage('convert'):
+            chunks = writer.close()
+
+        for chunk in chunks:
+            yield bridge_master_pb2.ExportChunk(data=chunk)
+
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    def WatchChanges(self, request, context):
+        """
+        Stream the change events of the bridges, starting after the requested sequence. The stream is open until
+        the client cancels it.
+        """
+        with self._watch_lock:
+            if self._watch_streams >= self.max_watch_streams:
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, f"Too many WatchChanges streams, the limit is {self.max_watch_streams}.")
+
+            self._watch_streams += 1
+
+        try:
+            yield from self.change_feed.subscribe(request.since, request.feed_id, context.is_active)
+        except FeedGap as e:
+            context.abort(grpc.StatusCode.OUT_OF_RANGE, str(e))
+        finally:
+            with self._watch_lock:
+                self._watch_streams -= 1
+
+    def _stream_query(self, request, context, replica_query, paged_query):
+        """
+        Yield pages of Bridges message from the replica, or from the layer page by page. Every page except the
+        last one has the cursor for resuming the stream after the page.
+        """
+        try:
+            after = decode_cursor(request.cursor)
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+        page_size = bridge_api.normalize_page_size(request.page_size)
+        projection = self._projection(request, context)
+
+        if self._replica_ready():
+            with metrics.stage('replica'):
+                bridges = replica_query().bridges
+
+            pages = paginate(bridges, page_size, after)
+            build = lambda page: projection.project(bridge_master_pb2.Bridges(bridges=page))
+            fetch_stage = 'replica'
+        else:
+            pages = paged_query(page_size, after, columns=projection.columns, return_geometry=projection.geometry)
+            build = lambda page: converter.features_to_bridges(page, fields=projection.attributes, geometry=projection.geometry,
+                                                               columnar=projection.columnar)
+            fetch_stage = 'backend'
+
+        while True:
+            with metrics.stage(fetch_stage):
+                page = next(pages, None)
+
+            if page is None:
+                return
+
+            items, has_more = page
+
+            with metrics.stage('convert'):
+                response = build(items)
+
+            if has_more:
+                last_oid = response.columns.objectid[-1] if projection.columnar else response.bridges[-1].attributes.objectid
+                response.next_cursor = encode_cursor(last_oid)
+
+            yield response
+
+    @staticmethod
+    def _projection(request, context)->Projection:
+        """
+        Create the projection of the request field mask and columnar flag. Abort the RPC if the field mask is invalid.
+        """
+        columnar = ('columnar' in request.DESCRIPTOR.fields_by_name) and request.columnar
+
+        try:
+            return Projection(request.field_mask, columnar=columnar)
+        except ValueError as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, str(e))
+
+    @staticmethod
+    def _check_spatial_filter(request, context):
+        """
+        Abort the RPC if the spatial filter is not a GeoJSON Polygon or MultiPolygon, or its CRS is unknown.
+        """
+        try:
+            parse_polygon(request.geojson)
+            to_crs(request.crs)
+        except (ValueError, CRSError) as e:
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Invalid spatial filter: {e}")
+
+    def _replica_ready(self)->bool:
+        """
+        Return True if the read end points could be served from the in-memory replica.
+        """
+        return (self.replica is not None) and self.replica.is_ready()
+    
+    def _request_replica_refresh(self, results: list):
+        """
+        Notify the in-memory replica and the reconciler of the records edited successfully.
+        """
+        oids = [result.objectid for result in results if result.success]
+
+        for replica in (self.replica, self.reconciler):
+            if replica is not None:
+                replica.request_refresh(oids)
+
+    @staticmethod
+    def edit_results_to_pb(results: list)->list:
+        """
+        Convert edit_features results into list of protocol buffer Result object.
+        """
+        results_pb = list()
+
+        for result in results:
             result_pb = bridge_master_pb2.Result()
-            result_pb.objectid = result['objectId']
             result_pb.success = result['success']
 
+            if result.get('objectId') is not None:
+                result_pb.objectid = result['objectId']
+
             if result.get('globalId') is not None:
                 result_pb.global_id = result.get('globalId')
+            
+            if result.get('error') is not None:
+                result_pb.error = str(result['error'].get('description'))
+
+            if result.get('retryable'):
+                result_pb.retryable = True
 
             results_pb.append(result_pb)
 
-        return bridge_master_pb2.EditResults(update_results = results_pb)
-    
+        return results_pb
+
     @staticmethod
     def feature_to_pb_bridge(feature):
-        attr = feature.attributes
-        geom = feature.geometry
-        attr = {k.lower(): v for k, v in attr.items()}
-
-        bridge = bridge_master_pb2.Bridge()
-        bridge_attr = bridge.attributes
-        bridge_geom = bridge.geometry
+        """
+        Convert a single ArcGIS Feature into protocol buffer Bridge object.
+        """
+        return converter.feature_to_bridge(feature)
+    
+    def retire_targets(self, bridges: list)->list:
+        """
+        Resolve the OBJECTID of the bridges to retire. Return list of (bridge ID, OBJECTID, error) in the request order,
+        a bridge ID with multiple active records has an item for every OBJECTID. The OBJECTID is None with the error
+        description for a bridge which could not be resolved.
+        """
+        return [(bridge.attributes.bridge_id, oid, error) for bridge, oid, error in self.resolve_objectids(bridges)]
 
-        if geom is not None:
-            ParseDict(geom, bridge_geom)
+    def fill_objectids(self, bridges: list, target_bridges: bridge_master_pb2.Bridges)->list:
+        """
+        Fill OBJECTID field of protocol buffer Bridge objects. Bridges which already have OBJECTID are copied as it is.
+        The missing OBJECTID are resolved from the bridge ID using a single batched query, a bridge ID with multiple
+        active records will be appended once for every OBJECTID. Return list of (bridge ID, error) in the request
+        order, the error is None for every appended bridge and the error description for a bridge which could not be
+        resolved.
+        """
+        targets = list()
 
-        for field in bridge_attr.DESCRIPTOR.fields:
-            field_name = field.name
-            val = attr.get(field_name)
+        for bridge, oid, error in self.resolve_objectids(bridges):
+            if oid is not None:
+                updated_bridge = target_bridges.bridges.add()
+                updated_bridge.CopyFrom(bridge)
+                updated_bridge.attributes.objectid = oid
 
-            if val is None:
-                continue
+            targets.append((bridge.attributes.bridge_id, error))
 
-            field_class = type(bridge_attr.__getattribute__(field_name))
-            bridge_attr.__setattr__(field_name, field_class(val))
+        return targets
 
-        return bridge
-    
-    def fill_objectid(self, bridge: bridge_master_pb2.Bridge, target_bridges: bridge_master_pb2.Bridges)->bridge_master_pb2.Bridges:
+    def resolve_objectids(self, bridges: list)->list:
         """
-        Fill OBJECTID field of a protocol buffer Bridge object. If OBJECTID is already available then do nothing.
+        Resolve the OBJECTID of the requested bridges from their bridge ID using a single batched query. Return list
+        of (Bridge, OBJECTID, error) in the request order, a bridge ID with multiple active records has an item for
+        every OBJECTID. The OBJECTID is None with the error description for a bridge which could not be resolved.
         """
-        if (bridge.attributes.objectid == 0) and (bridge.attributes.bridge_id is None):
-                raise(ValueError, "Bridges contain bridge without objectid and bridgeid. Could not proceed to update.")
-        
-        if (bridge.attributes.objectid == 0 ) and (bridge.attributes.bridge_id is not None):
-            # Get all the existing bridges with the same bridge_id
-            for feature in bridge_api.bridge_id_query(bridge_id=[bridge.attributes.bridge_id], columns=['BRIDGE_ID']):
-                existing_bridge = self.feature_to_pb_bridge(feature)
-                oid = existing_bridge.attributes.objectid  # Get the objectid
-                bridge.attributes.objectid = oid  # Change the objectid of the input bridge
-                
-                # Append the updated requested bridge to the updated bridges
-                target_bridges.bridges.append(copy.deepcopy(bridge))
+        missing_ids = [bridge.attributes.bridge_id for bridge in bridges 
+                       if (bridge.attributes.objectid == 0) and (bridge.attributes.bridge_id != '')]
+
+        if len(missing_ids) != 0:
+            oid_map = bridge_api.bridge_objectid_query(missing_ids)
         else:
-            target_bridges.bridges.append(bridge)
-        
-        return target_bridges 
+            oid_map = dict()
+
+        targets = list()
+
+        for bridge in bridges:
+            bridge_id = bridge.attributes.bridge_id
+
+            if bridge.attributes.objectid != 0:
+                targets.append((bridge, bridge.attributes.objectid, None))
+            elif bridge_id == '':
+                targets.append((bridge, None, "Bridge without objectid and bridge ID."))
+            elif len(oid_map.get(bridge_id, ())) == 0:
+                targets.append((bridge, None, f"No active bridge with bridge ID {bridge_id}."))
+            else:
+                targets.extend((bridge, oid, None) for oid in oid_map[bridge_id])
+
+        return targets
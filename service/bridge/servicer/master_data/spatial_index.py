@@ -0,0 +1,129 @@
+"""
+Local spatial index over the National Bridge point geometries.
+"""
+from .api.geometry import parse_polygon
+from common.geometry import to_crs, to_lonlat, reproject
+from shapely import STRtree, points, contains_xy, prepare
+from shapely.geometry import Point, box
+import numpy as np
+
+
+EARTH_RADIUS = 6371008.8  # Mean earth radius in meters
+
+
+class BridgeSpatialIndex(object):
+    """
+    STRtree over the bridge points. Containment queries are done with a bounding box prefilter
+    through the tree followed by a vectorized exact test over all candidates. Nearest queries are done
+    on a second tree over the WGS84 coordinates with a growing search radius.
+    """
+    def __init__(self, oids: np.ndarray, xs: np.ndarray, ys: np.ndarray, spatial_reference=None):
+        self.oids = oids
+        self.xs = xs
+        self.ys = ys
+        self.crs = to_crs(spatial_reference)
+        self.tree = STRtree(points(xs, ys))
+        self.lons, self.lats = to_lonlat(xs, ys, self.crs)
+
+        if (self.lons is xs) and (self.lats is ys):
+            self.geo_tree = self.tree
+        else:
+            self.geo_tree = STRtree(points(self.lons, self.lats))
+
+    @classmethod
+    def from_bridges(cls, bridges: dict, spatial_reference=None):
+        """
+        Build the index from OBJECTID to Bridge mapping. Bridges without geometry are not indexed.
+        """
+        located = [(oid, bridge.geometry.x, bridge.geometry.y) for oid, bridge in bridges.items() if bridge.HasField('geometry')]
+
+        if len(located) == 0:
+            return cls(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), spatial_reference)
+
+        oids, xs, ys = zip(*located)
+
+        return cls(np.array(oids, dtype=np.int64), np.array(xs), np.array(ys), spatial_reference)
+
+    def __len__(self):
+        return len(self.oids)
+
+    def contains(self, geojson: str, crs: str)->np.ndarray:
+        """
+        Return OBJECTID of bridges which is contained by the input GeoJSON Polygon or MultiPolygon.
+        """
+        polygon = reproject(parse_polygon(geojson), to_crs(crs), self.crs)
+        prepare(polygon)
+        candidates = self.tree.query(polygon)  # Bounding box prefilter
+
+        if len(candidates) == 0:
+            return self.oids[candidates]
+
+        mask = contains_xy(polygon, self.xs[candidates], self.ys[candidates])
+
+        return np.sort(self.oids[candidates[mask]])
+
+    def nearest(self, x: float, y: float, crs: str, k: int = 1, max_distance: float = 0)->tuple[np.ndarray, np.ndarray]:
+        """
+        Return OBJECTID and great-circle distance in meters of the k bridges nearest to the point, ordered by distance.
+        The point is in the index CRS if crs is empty. Bridges further than max_distance are excluded, 0 for unlimited.
+        """
+        if (len(self.oids) == 0) or (k <= 0):
+            return self.oids[:0], np.empty(0)
+
+        lons, lats = to_lonlat([x], [y], to_crs(crs) or self.crs)
+        lon, lat = float(lons[0]), float(lats[0])
+        k = min(k, len(self.oids))
+        limit = max_distance if max_distance > 0 else np.pi * EARTH_RADIUS
+
+        # The nearest bridge in degrees gives a radius with at least one bridge, scaled for k bridges
+        nearest = self.geo_tree.query_nearest(Point(lon, lat))
+        radius = _haversine(lon, lat, self.lons[nearest], self.lats[nearest]).max() * np.sqrt(k)
+        radius = min(max(radius, 1.0), limit)
+
+        # Grow the radius until it has k bridges. Every bridge within the radius is inside the search box,
+        # so the k nearest bridges within the radius are the k nearest bridges overall.
+        while True:
+            candidates = self.geo_tree.query(_search_box(lon, lat, radius))
+            distances = _haversine(lon, lat, self.lons[candidates], self.lats[candidates])
+            within = distances <= radius
+
+            if (within.sum() >= k) or (radius >= limit):
+                break
+
+            radius = min(radius * 2, limit)
+
+        candidates = candidates[within]
+        distances = distances[within]
+        order = np.lexsort((self.oids[candidates], distances))[:k]  # Ties are ordered by OBJECTID
+
+        return self.oids[candidates[order]], distances[order]
+
+
+def _haversine(lon: float, lat: float, lons: np.ndarray, lats: np.ndarray)->np.ndarray:
+    """
+    Great-circle distance in meters from the point to every coordinate.
+    """
+    lon, lat = np.radians(lon), np.radians(lat)
+    lons, lats = np.radians(lons), np.radians(lats)
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+def _search_box(lon: float, lat: float, radius: float):
+    """
+    Longitude and latitude box covering every point within the great-circle distance from the point. The box
+    spans every longitude if the circle reaches a pole or the antimeridian.
+    """
+    angle = radius / EARTH_RADIUS * (1 + 1e-9)
+    ymin = lat - np.degrees(angle)
+    ymax = lat + np.degrees(angle)
+
+    if (ymin <= -90) or (ymax >= 90):
+        return box(-180, max(ymin, -90), 180, min(ymax, 90))
+
+    dlon = np.degrees(np.arcsin(min(np.sin(angle) / np.cos(np.radians(lat)), 1.0)))
+
+    if (lon - dlon < -180) or (lon + dlon > 180):
+        return box(-180, ymin, 180, ymax)
+
+    return box(lon - dlon, ymin, lon + dlon, ymax)
@@ -0,0 +1,562 @@
+"""
+Load-test and latency benchmark for BridgeMaster GRPC service.
+
+The server is started in a child process against a temporary SQLite National Bridge layer seeded with synthetic
+bridges, so the benchmark never touches the portal. Every RPC is driven with a configurable concurrency and request
+mix, then the throughput, p50/p95/p99 latency of every RPC and the server CPU time are reported and saved as JSON.
+
+Example:
+    python tests/bench_bridge_master.py --records 20000 --concurrency 16 --duration 30
+    python tests/bench_bridge_master.py --mode aio --mix GetByID=5,GetBySpatialFilter=1 --env BRIDGE_REPLICA=true
+    python tests/bench_bridge_master.py --mix GetByName:columnar=1,StreamBySpatialFilter:masked=1,Export=0.1
+
+The read RPCs are driven as the columnar or field masked variant with ':columnar' or ':masked' suffix. The RPCs
+with zero default weight are only driven when they are selected in --mix.
+"""
+from __future__ import print_function
+import os, sys
+
+here = os.path.dirname(__file__)
+service_dir = os.path.abspath(os.path.join(here, '..'))
+sys.path.append(service_dir)
+sys.path.append(os.path.join(service_dir, '..'))  # The common package of the services
+
+import bridge_master_pb2, bridge_master_pb2_grpc
+from common.backend import SQLiteBackend
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.field_mask_pb2 import FieldMask
+import grpc
+
+from multiprocessing import get_context
+from collections import defaultdict, deque
+import numpy as np
+import subprocess
+import shutil
+import threading
+import tempfile
+import argparse
+import resource
+import logging
+import random
+import socket
+import json
+import time
+
+# Default request mix, relative weight of every RPC
+DEFAULT_MIX = {
+    'GetByID': 30,
+    'GetByName': 15,
+    'GetByBridgeNumber': 15,
+    'GetBySpatialFilter': 20,
+    'Insert': 8,
+    'Update': 6,
+    'Retire': 3,
+    'Delete': 3,
+    'StreamByID': 0,
+    'StreamByName': 0,
+    'StreamByBridgeNumber': 0,
+    'StreamBySpatialFilter': 0,
+    'GetNearest': 0,
+    'Export': 0,
+    'WatchChanges': 0
+}
+
+# Variants of the read RPCs selected as 'RPC:variant', with the request field set by the variant
+VARIANTS = {'columnar': 'columnar', 'masked': 'field_mask'}
+MASK_PATHS = ['attributes.bridge_id', 'attributes.bridge_name', 'geometry']  # Field mask of the 'masked' variant
+WATCH_TIMEOUT = 10  # Seconds to wait for the change event of WatchChanges
+
+_METHODS = bridge_master_pb2.DESCRIPTOR.services_by_name['BridgeMaster'].methods_by_name
+
+# Extent of the synthetic bridges (Indonesia), in WGS84
+EXTENT = (95.0, -11.0, 141.0, 6.0)
+NAME_CARDINALITY = 500  # Number of distinct bridge name in the synthetic layer
+
+_FIELD_TYPES = {
+    FieldDescriptor.CPPTYPE_STRING: 'esriFieldTypeString',
+    FieldDescriptor.CPPTYPE_INT32: 'esriFieldTypeInteger',
+    FieldDescriptor.CPPTYPE_DOUBLE: 'esriFieldTypeDouble'
+}
+_DATE_FIELDS = ('start_date', 'end_date', 'last_inv_date')
+
+
+def seed_database(path: str, records: int, seed: int = 0):
+    """
+    Create SQLite National Bridge layer with synthetic bridges. The layer fields follow the Attributes message.
+    """
+    rnd = random.Random(seed)
+    fields = [{'name': 'OBJECTID', 'type': 'esriFieldTypeOID', 'alias': 'OBJECTID'}]
+
+    for field in bridge_master_pb2.Attributes.DESCRIPTOR.fields:
+        if field.name == 'objectid':
+            continue
+
+        if field.name in _DATE_FIELDS:
+            field_type = 'esriFieldTypeDate'
+        else:
+            field_type = _FIELD_TYPES[field.cpp_type]
+
+        fields.append({'name': field.name.upper(), 'type': field_type, 'alias': field.name.upper()})
+
+    features = list()
+
+    for i in range(1, records + 1):
+        x = rnd.uniform(EXTENT[0], EXTENT[2])
+        y = rnd.uniform(EXTENT[1], EXTENT[3])
+        attributes = {
+            'OBJECTID': i,
+            'BRIDGE_ID': str(1000000 + i),
+            'BRIDGE_NAME': 'BRIDGE {0}'.format(i % NAME_CARDINALITY),
+            'BRIDGE_NUM': 'NUM-{0}'.format(i),
+            'CITY_REGENCY': 'REGENCY {0}'.format(i % 100),
+            'BRIDGE_LENGTH': round(rnd.uniform(5, 500), 2),
+            'BRIDGE_WIDTH': round(rnd.uniform(3, 20), 2),
+            'START_DATE': 946684800000,
+            'END_DATE': None,
+            'LONGITUDE': x,
+            'LATITUDE': y,
+            'BRIDGE_STATUS': 'AKTIF',
+            'CONS_YEAR': rnd.randint(1970, 2020),
+            'BRIDGE_TYPE': 'TYPE {0}'.format(i % 5)
+        }
+        features.append({'attributes': attributes, 'geometry': {'x': x, 'y': y}})
+
+    feature_set = {
+        'objectIdFieldName': 'OBJECTID',
+        'geometryType': 'esriGeometryPoint',
+        'spatialReference': {'wkid': 4326, 'latestWkid': 4326},
+        'fields': fields,
+        'features': features
+    }
+
+    backend = SQLiteBackend(path, 'NATIONAL_BRIDGE', index_columns=['BRIDGE_ID', 'BRIDGE_NAME', 'BRIDGE_NUM'])
+    backend.import_features(feature_set)
+
+def server_process(env: dict, mode: str, log_level: str, conn):
+    """
+    Child process entry point. Start the server, then answer 'reset' and 'report' command for the CPU time.
+    """
+    os.environ.update(env)
+    os.chdir(service_dir)
+    sys.path.insert(0, service_dir)
+    logging.basicConfig(level=log_level)
+
+    import asyncio
+    import server
+
+    if mode == 'aio':
+        target = lambda: asyncio.run(server.serve_aio())
+    else:
+        target = server.serve
+
+    threading.Thread(target=target, name='bench-server', daemon=True).start()
+
+    cpu_start = _cpu_time()
+
+    while True:
+        command = conn.recv()
+
+        if command == 'reset':
+            cpu_start = _cpu_time()
+            conn.send(None)
+        elif command == 'report':
+            conn.send(_cpu_time() - cpu_start)
+        else:
+            break
+
+def _cpu_time()->float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class Workload(object):
+    """
+    Request factory for every RPC. Edited bridges are the ones inserted by the benchmark itself.
+    """
+    def __init__(self, records: int, batch: int):
+        self.records = records
+        self.batch = batch
+        self.inserted = deque()  # (objectid, bridge_id) of inserted bridges
+        self.watch_position = ('', 0)  # (feed_id, sequence) of the last change event seen
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def bridge_ids(self, rnd: random.Random)->list:
+        return [str(1000000 + rnd.randint(1, self.records)) for _ in range(self.batch)]
+
+    def call(self, name: str, stub, rnd: random.Random)->tuple:
+        """
+        Call the RPC with a new request. Return the RPC name which was actually called and the number of response
+        messages, the edit RPC falls back to Insert if there is no inserted bridge left.
+        """
+        rpc, _, variant = name.partition(':')
+
+        if rpc in ('Insert', 'Update', 'Retire', 'Delete'):
+            return self.edit(rpc, stub, rnd), 1
+
+        if rpc == 'WatchChanges':
+            return rpc, self.watch(stub, rnd)
+
+        request = self.read_request(rpc, rnd)
+
+        if variant == 'columnar':
+            request.columnar = True
+        elif variant == 'masked':
+            request.field_mask.CopyFrom(FieldMask(paths=MASK_PATHS))
+
+        response = getattr(stub, rpc)(request)
+
+        if _METHODS[rpc].server_streaming:
+            return name, sum(1 for _ in response)
+
+        return name, 1
+
+    def read_request(self, rpc: str, rnd: random.Random):
+        """
+        Create the request message of the read RPC.
+        """
+        if rpc in ('GetByID', 'StreamByID'):
+            return bridge_master_pb2.BridgeIdRequests(bridge_ids=self.bridge_ids(rnd))
+        elif rpc in ('GetByName', 'StreamByName'):
+            names = ['BRIDGE {0}'.format(rnd.randrange(NAME_CARDINALITY)) for _ in range(self.batch)]
+            return bridge_master_pb2.NameRequests(name=names)
+        elif rpc in ('GetByBridgeNumber', 'StreamByBridgeNumber'):
+            numbers = ['NUM-{0}'.format(rnd.randint(1, self.records)) for _ in range(self.batch)]
+            return bridge_master_pb2.NumberRequests(number=numbers)
+        elif rpc in ('GetBySpatialFilter', 'StreamBySpatialFilter'):
+            return bridge_master_pb2.SpatialFilter(geojson=self.polygon(rnd), crs='')
+        elif rpc == 'GetNearest':
+            points = [bridge_master_pb2.Point(x=rnd.uniform(EXTENT[0], EXTENT[2]), y=rnd.uniform(EXTENT[1], EXTENT[3]))
+                      for _ in range(self.batch)]
+            return bridge_master_pb2.NearestRequests(points=points, k=5)
+        elif rpc == 'Export':
+            return bridge_master_pb2.ExportRequest(format=bridge_master_pb2.ARROW_IPC)
+
+        raise ValueError(f"Unknown RPC {rpc}")
+
+    def edit(self, rpc: str, stub, rnd: random.Random)->str:
+        if rpc == 'Insert':
+            self.insert(stub, rnd)
+            return rpc
+
+        popped = self.pop()
+
+        if popped is None:
+            self.insert(stub, rnd)
+            return 'Insert'
+
+        objectid, bridge_id = popped
+
+        if rpc == 'Update':
+            bridge = bridge_master_pb2.Bridge()
+            bridge.attributes.objectid = objectid
+            bridge.attributes.bridge_id = bridge_id
+            bridge.attributes.bridge_name = 'BENCH UPDATED'
+            stub.Update(bridge_master_pb2.Bridges(bridges=[bridge]))
+            self.inserted.append(popped)
+        elif rpc == 'Retire':
+            bridge = bridge_master_pb2.Bridge()
+            bridge.attributes.bridge_id = bridge_id
+            stub.Retire(bridge_master_pb2.Bridges(bridges=[bridge]))
+        else:
+            stub.Delete(bridge_master_pb2.ObjectIdRequests(objectids=[objectid]))
+
+        return rpc
+
+    def watch(self, stub, rnd: random.Random)->int:
+        """
+        Insert a bridge and wait for its change event. The stream is resumed after the last event seen by any
+        client, so the event is replayed even if the stream starts after the insert. Until the first event is
+        seen the stream starts with the new events only, and the event could be missed until WATCH_TIMEOUT.
+        Return the number of events received.
+        """
+        feed_id, since = self.watch_position
+        bridge_id = self.insert(stub, rnd)
+        responses = stub.WatchChanges(bridge_master_pb2.WatchRequest(since=since, feed_id=feed_id), timeout=WATCH_TIMEOUT)
+        events = 0
+
+        try:
+            for event in responses:
+                events += 1
+
+                with self._lock:
+                    if event.sequence > self.watch_position[1]:
+                        self.watch_position = (event.feed_id, event.sequence)
+
+                if event.bridge_id == bridge_id:
+                    return events
+        except grpc.RpcError as e:
+            # The last event seen is no longer in the feed history, start with the new events again
+            if e.code() == grpc.StatusCode.OUT_OF_RANGE:
+                self.watch_position = ('', 0)
+
+            raise
+        finally:
+            responses.cancel()
+
+        return events
+
+    def insert(self, stub, rnd: random.Random)->str:
+        with self._lock:
+            self._counter += 1
+            bridge_id = 'BENCH-{0}-{1}'.format(os.getpid(), self._counter)
+
+        bridge = bridge_master_pb2.Bridge()
+        bridge.attributes.bridge_id = bridge_id
+        bridge.attributes.bridge_name = 'BENCH'
+        bridge.geometry.x = rnd.uniform(EXTENT[0], EXTENT[2])
+        bridge.geometry.y = rnd.uniform(EXTENT[1], EXTENT[3])
+
+        response = stub.Insert(bridge_master_pb2.Bridges(bridges=[bridge]))
+
+        for result in response.add_results:
+            if result.success:
+                self.inserted.append((result.objectid, bridge_id))
+
+        return bridge_id
+
+    def pop(self):
+        try:
+            return self.inserted.popleft()
+        except IndexError:
+            return None
+
+    @staticmethod
+    def polygon(rnd: random.Random, size: float = 2.0)->str:
+        x = rnd.uniform(EXTENT[0], EXTENT[2] - size)
+        y = rnd.uniform(EXTENT[1], EXTENT[3] - size)
+        ring = [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]]
+
+        return json.dumps({'type': 'Polygon', 'coordinates': [ring]})
+
+
+def drive(address: str, workload: Workload, mix: dict, concurrency: int, duration: float, seed: int = 0)->tuple:
+    """
+    Call the RPC from concurrent client threads for the given duration. Return the latency (seconds), error count
+    and response message count of every RPC, and the elapsed time.
+    """
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    messages = defaultdict(int)
+    lock = threading.Lock()
+    rpcs = list(mix.keys())
+    weights = [mix[rpc] for rpc in rpcs]
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rnd = random.Random(seed + index)
+        local_latencies = defaultdict(list)
+        local_errors = defaultdict(int)
+        local_messages = defaultdict(int)
+
+        with grpc.insecure_channel(address) as channel:
+            stub = bridge_master_pb2_grpc.BridgeMasterStub(channel)
+
+            while time.perf_counter() < deadline:
+                rpc = rnd.choices(rpcs, weights)[0]
+                start = time.perf_counter()
+
+                try:
+                    called, count = workload.call(rpc, stub, rnd)
+                except grpc.RpcError as e:
+                    local_errors[rpc] += 1
+                    logging.debug(f"{rpc} failed: {e.code()}")
+                    continue
+
+                local_latencies[called].append(time.perf_counter() - start)
+                local_messages[called] += count
+
+        with lock:
+            for rpc, values in local_latencies.items():
+                latencies[rpc].extend(values)
+
+            for rpc, count in local_errors.items():
+                errors[rpc] += count
+
+            for rpc, count in local_messages.items():
+                messages[rpc] += count
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i, )) for i in range(concurrency)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    return latencies, errors, messages, time.perf_counter() - start
+
+def summarize(latencies: dict, errors: dict, messages: dict, elapsed: float)->dict:
+    """
+    Compute the throughput and latency percentiles (milliseconds) of every RPC. The messages are the response
+    messages received, e.g. the pages of the Stream RPCs or the chunks of Export.
+    """
+    summary = dict()
+
+    for rpc in sorted(set(latencies) | set(errors)):
+        values = np.array(latencies.get(rpc, []), dtype=float) * 1000
+        summary[rpc] = {
+            'count': len(values),
+            'errors': errors.get(rpc, 0),
+            'messages': messages.get(rpc, 0),
+            'throughput': len(values) / elapsed,
+            'mean': float(values.mean()) if len(values) else None,
+            'p50': float(np.percentile(values, 50)) if len(values) else None,
+            'p95': float(np.percentile(values, 95)) if len(values) else None,
+            'p99': float(np.percentile(values, 99)) if len(values) else None,
+            'max': float(values.max()) if len(values) else None
+        }
+
+    return summary
+
+def print_report(summary: dict, elapsed: float, cpu_time: float):
+    header = "{0:<32}{1:>8}{2:>8}{3:>10}{4:>10}{5:>10}{6:>10}".format('RPC', 'count', 'errors', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms')
+    print(header)
+    print('-' * len(header))
+
+    fmt = lambda value: '-' if value is None else '{0:.2f}'.format(value)
+
+    for rpc, stats in summary.items():
+        print("{0:<32}{1:>8}{2:>8}{3:>10.1f}{4:>10}{5:>10}{6:>10}".format(
+            rpc, stats['count'], stats['errors'], stats['throughput'], fmt(stats['p50']), fmt(stats['p95']), fmt(stats['p99'])))
+
+    total = sum(stats['count'] for stats in summary.values())
+    print('-' * len(header))
+    print(f"Total {total} requests in {elapsed:.1f}s, {total / elapsed:.1f} req/s, server CPU time {cpu_time:.2f}s "
+          f"({cpu_time / max(total, 1) * 1000:.3f} ms/request)")
+
+def git_revision()->str | None:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=service_dir,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def parse_mix(mix: str)->dict:
+    """
+    Parse request mix from 'RPC=weight,RPC:variant=weight' string.
+    """
+    result = dict()
+
+    for item in mix.split(','):
+        name, weight = item.split('=')
+        rpc, _, variant = name.partition(':')
+
+        if rpc not in DEFAULT_MIX:
+            raise ValueError(f"Unknown RPC {rpc}")
+
+        if variant and (variant not in VARIANTS):
+            raise ValueError(f"Unknown variant {variant}, should be one of {', '.join(VARIANTS)}")
+
+        if variant and (VARIANTS[variant] not in _METHODS[rpc].input_type.fields_by_name):
+            raise ValueError(f"{rpc} has no {variant} variant")
+
+        result[name] = float(weight)
+
+    return result
+
+def free_port()->int:
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+def run(args):
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    port = args.port or free_port()
+    workdir = tempfile.mkdtemp(prefix='bridge-bench-')
+    db_path = os.path.join(workdir, 'national_bridge.sqlite')
+
+    print(f"Seeding {args.records} bridges into {db_path}")
+    seed_database(db_path, args.records, seed=args.seed)
+
+    env = {
+        'BRIDGE_BACKEND': 'sqlite',
+        'BRIDGE_SQLITE_PATH': db_path,
+        'BRIDGE_MASTER_GRPC_PORT': str(port),
+        'BRIDGE_SERVER_MODE': args.mode
+    }
+
+    for item in args.env:
+        key, value = item.split('=', 1)
+        env[key] = value
+
+    ctx = get_context('spawn')  # Fresh interpreter, so the environment is read by the server modules
+    conn, child_conn = ctx.Pipe()
+    process = ctx.Process(target=server_process, args=(env, args.mode, args.log_level, child_conn), daemon=True)
+    process.start()
+
+    address = f"localhost:{port}"
+
+    try:
+        with grpc.insecure_channel(address) as channel:
+            grpc.channel_ready_future(channel).result(timeout=60)
+
+        workload = Workload(args.records, args.batch)
+
+        if args.warmup > 0:
+            print(f"Warming up for {args.warmup}s")
+            drive(address, workload, mix, args.concurrency, args.warmup, seed=args.seed + 1000)
+
+        conn.send('reset')
+        conn.recv()
+
+        print(f"Running {args.mode} server for {args.duration}s with {args.concurrency} clients")
+        latencies, errors, messages, elapsed = drive(address, workload, mix, args.concurrency, args.duration, seed=args.seed)
+
+        conn.send('report')
+        cpu_time = conn.recv()
+    finally:
+        conn.send('stop')
+        process.terminate()
+        process.join()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    summary = summarize(latencies, errors, messages, elapsed)
+    print_report(summary, elapsed, cpu_time)
+
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'config': {
+            'mode': args.mode,
+            'records': args.records,
+            'batch': args.batch,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'mix': mix,
+            'env': {key: value for key, value in env.items() if key not in ('BRIDGE_SQLITE_PATH', 'BRIDGE_MASTER_GRPC_PORT')}
+        },
+        'elapsed': elapsed,
+        'server_cpu_time': cpu_time,
+        'rpcs': summary
+    }
+
+    os.makedirs(args.output, exist_ok=True)
+    output_path = os.path.join(args.output, 'bench_{0}_{1}.json'.format(time.strftime('%Y%m%d_%H%M%S'), result['revision'] or 'unknown'))
+
+    with open(output_path, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print(f"Result saved to {output_path}")
+
+    return result
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='BridgeMaster load-test and latency benchmark.')
+    parser.add_argument('--records', type=int, default=10000, help='Number of synthetic bridges')
+    parser.add_argument('--batch', type=int, default=5, help='Number of values in every read request')
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent clients')
+    parser.add_argument('--duration', type=float, default=20, help='Measured duration in seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='Warm up duration in seconds')
+    parser.add_argument('--mix', help="Request mix, e.g. 'GetByID=3,Insert=1'. Default drives every RPC")
+    parser.add_argument('--mode', choices=['thread', 'aio'], default='thread', help='Server mode')
+    parser.add_argument('--env', action='append', default=[], help='Extra server environment variable KEY=VALUE')
+    parser.add_argument('--port', type=int, help='Server port, a free port is used if not set')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--log-level', default='WARNING', help='Server log level')
+    parser.add_argument('--output', default=os.path.join(here, 'bench_results'), help='Result directory')
+
+    logging.basicConfig()
+    run(parser.parse_args())
@@ -0,0 +1,76 @@
+"""
+Check that the Export from the replica and from the layer produce equal tables, including the null attributes.
+
+The check runs against a temporary SQLite National Bridge layer with null attributes, so it never touches the portal.
+"""
+from __future__ import print_function
+import os, sys
+import tempfile
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, '..'))
+sys.path.append(os.path.join(here, '..', '..'))  # The common package of the services
+
+SQLITE_PATH = os.path.join(tempfile.mkdtemp(prefix='bridge-export-'), 'national_bridge.sqlite')
+os.environ['BRIDGE_BACKEND'] = 'sqlite'
+os.environ['BRIDGE_SQLITE_PATH'] = SQLITE_PATH
+
+from common.backend import SQLiteBackend
+from servicer.master_data.api import nat_bridge_api as bridge_api
+from servicer.master_data.replica import BridgeReplica
+from servicer.master_data import export
+import pyarrow as pa
+
+FIELDS = [('OBJECTID', 'esriFieldTypeOID'), ('BRIDGE_ID', 'esriFieldTypeString'), ('BRIDGE_NAME', 'esriFieldTypeString'),
+          ('BRIDGE_NUM', 'esriFieldTypeString'), ('START_DATE', 'esriFieldTypeDate'), ('END_DATE', 'esriFieldTypeDate'),
+          ('BRIDGE_LENGTH', 'esriFieldTypeDouble'), ('CONS_YEAR', 'esriFieldTypeInteger')]
+
+
+def seed_layer(path: str, count: int = 100):
+    """
+    Seed the layer with bridges where every third record has null attributes, and every fifth has zero values
+    which should not be exported as null.
+    """
+    features = list()
+
+    for oid in range(1, count + 1):
+        attributes = {'OBJECTID': oid, 'BRIDGE_ID': str(oid), 'BRIDGE_NAME': f'N{oid}', 'BRIDGE_NUM': f'X{oid}',
+                      'START_DATE': 0, 'END_DATE': None, 'BRIDGE_LENGTH': 10.5, 'CONS_YEAR': 1990}
+        geometry = {'x': 100 + oid / count, 'y': -5 + oid / count}
+
+        if oid % 3 == 0:
+            attributes.update(BRIDGE_NAME=None, BRIDGE_LENGTH=None, CONS_YEAR=None)
+            geometry = None
+        elif oid % 5 == 0:
+            attributes.update(BRIDGE_NAME='', BRIDGE_LENGTH=0.0, CONS_YEAR=0)
+
+        features.append({'attributes': attributes, 'geometry': geometry})
+
+    feature_set = {'objectIdFieldName': 'OBJECTID', 'geometryType': 'esriGeometryPoint', 'spatialReference': {'wkid': 4326},
+                   'fields': [{'name': name, 'type': field_type} for name, field_type in FIELDS], 'features': features}
+    SQLiteBackend(path, 'NATIONAL_BRIDGE', index_columns=['BRIDGE_ID', 'BRIDGE_NAME', 'BRIDGE_NUM']).import_features(feature_set)
+
+def run():
+    print("Try to compare the replica and the layer export")
+    seed_layer(SQLITE_PATH)
+
+    replica = BridgeReplica()
+    replica.refresh()
+
+    schema = export.export_schema(None, True, bridge_api.layer_spatial_reference())
+    replica_table = pa.Table.from_batches([export.bridges_to_batch(replica.get_all(), schema)])
+    features = [feature for page, _ in bridge_api.paged_active_records(page_size=1000) for feature in page]
+    layer_table = pa.Table.from_batches([export.features_to_batch(features, schema)])
+
+    if not replica_table.equals(layer_table, check_metadata=True):
+        for name in schema.names:
+            if not replica_table[name].equals(layer_table[name]):
+                print(f"Column {name} differs, replica: {replica_table[name][:6]}, layer: {layer_table[name][:6]}")
+
+        raise AssertionError("The replica and the layer export are not equal.")
+
+    print(f"Replica and layer export are equal: {replica_table.num_rows} bridges, "
+          f"{replica_table['bridge_name'].null_count} null bridge_name")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,44 @@
+from __future__ import print_function
+import os, sys
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, '..'))
+
+import bridge_master_pb2, bridge_master_pb2_grpc
+from google.protobuf.field_mask_pb2 import FieldMask
+from pandas import DataFrame, concat
+import numpy as np
+import logging
+import grpc
+
+
+def columns_to_dataframe(columns: bridge_master_pb2.BridgeColumns)->DataFrame:
+    """
+    Load the non-empty columns of BridgeColumns message into DataFrame.
+    """
+    data = dict()
+
+    for field, values in columns.ListFields():
+        if field.label == field.LABEL_REPEATED:
+            data[field.name] = np.array(values)
+
+    return DataFrame(data)
+
+def run():
+    print("Try to get bridge data as columns")
+
+    with grpc.insecure_channel("localhost:50051") as channel:
+        stub = bridge_master_pb2_grpc.BridgeMasterStub(channel)
+        req_name = bridge_master_pb2.NameRequests(name=['TOLONG_DIHAPUS'], columnar=True,
+                                                  field_mask=FieldMask(paths=['attributes.bridge_id', 'attributes.bridge_length', 'geometry']))
+
+        response = stub.GetByName(req_name)
+        print(columns_to_dataframe(response.columns))
+
+        # Every page of the stream is a BridgeColumns message
+        pages = [columns_to_dataframe(page.columns) for page in stub.StreamByName(req_name)]
+        print(f"Stream pages: {len(pages)}, bridges: {len(concat(pages)) if len(pages) != 0 else 0}")
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    run()
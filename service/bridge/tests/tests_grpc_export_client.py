@@ -0,0 +1,37 @@
+from __future__ import print_function
+import os, sys
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, '..'))
+
+import bridge_master_pb2, bridge_master_pb2_grpc
+import pyarrow as pa
+import pyarrow.parquet as pq
+import logging
+import grpc
+
+
+def run():
+    print("Try to export the bridge inventory")
+
+    with grpc.insecure_channel("localhost:50051") as channel:
+        stub = bridge_master_pb2_grpc.BridgeMasterStub(channel)
+
+        # Arrow IPC stream, read from the concatenated chunks
+        req_arrow = bridge_master_pb2.ExportRequest(format=bridge_master_pb2.ARROW_IPC, batch_size=5000)
+        data = b''.join(chunk.data for chunk in stub.Export(req_arrow))
+        table = pa.ipc.open_stream(data).read_all()
+        print(f"Arrow IPC export: {table.num_rows} bridges, {len(data)} bytes")
+
+        # GeoParquet file, the chunks are written as they arrive
+        req_parquet = bridge_master_pb2.ExportRequest(format=bridge_master_pb2.GEOPARQUET)
+
+        with open('national_bridge.parquet', 'wb') as f:
+            for chunk in stub.Export(req_parquet):
+                f.write(chunk.data)
+
+        print(f"GeoParquet export: {pq.ParquetFile('national_bridge.parquet').metadata.num_rows} bridges")
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    run()
@@ -0,0 +1,32 @@
+from __future__ import print_function
+import os, sys
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, '..'))
+
+import bridge_master_pb2, bridge_master_pb2_grpc
+from google.protobuf.field_mask_pb2 import FieldMask
+import logging
+import grpc
+
+
+def run():
+    print("Try to find the nearest bridges of several points")
+
+    with grpc.insecure_channel("localhost:50051") as channel:
+        stub = bridge_master_pb2_grpc.BridgeMasterStub(channel)
+        points = [bridge_master_pb2.Point(x=106.8, y=-6.2), bridge_master_pb2.Point(x=110.4, y=-7.0)]
+        req_nearest = bridge_master_pb2.NearestRequests(points=points, k=5, max_distance=10000,
+                                                        field_mask=FieldMask(paths=['attributes.bridge_id', 'attributes.bridge_name']))
+
+        response = stub.GetNearest(req_nearest)
+
+        for point, result in zip(points, response.results):
+            print(f"Point: ({point.x}, {point.y})")
+
+            for neighbor in result.neighbors:
+                print(f"    {neighbor.bridge.attributes.bridge_id} {neighbor.bridge.attributes.bridge_name}: {neighbor.distance:.0f} m")
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    run()
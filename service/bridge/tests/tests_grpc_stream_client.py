@@ -0,0 +1,42 @@
+from __future__ import print_function
+import os, sys
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, '..'))
+
+import bridge_master_pb2, bridge_master_pb2_grpc
+import logging
+import json
+import grpc
+
+
+def run():
+    print("Try to stream bridge data page by page")
+
+    with grpc.insecure_channel("localhost:50051") as channel:
+        stub = bridge_master_pb2_grpc.BridgeMasterStub(channel)
+        polygon = {'type': 'Polygon', 'coordinates': [[[106.5, -6.5], [107.0, -6.5], [107.0, -6.0], [106.5, -6.0], [106.5, -6.5]]]}
+        req_spatial = bridge_master_pb2.SpatialFilter(geojson=json.dumps(polygon), crs='', page_size=100)
+
+        cursor = None
+
+        for page in stub.StreamBySpatialFilter(req_spatial):
+            print(f"Page with {len(page.bridges)} bridges, next cursor: {page.next_cursor}")
+
+            if cursor is None:
+                cursor = page.next_cursor
+
+        # Resume the stream after the first page
+        if cursor:
+            req_spatial.cursor = cursor
+            resumed = sum(len(page.bridges) for page in stub.StreamBySpatialFilter(req_spatial))
+            print(f"Resumed stream returns {resumed} bridges")
+
+        req_name = bridge_master_pb2.NameRequests(name=['TOLONG_DIHAPUS'], page_size=10)
+
+        for page in stub.StreamByName(req_name):
+            print(f"Request: {req_name}, Response: {page.bridges}")
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    run()
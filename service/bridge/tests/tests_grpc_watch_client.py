@@ -0,0 +1,35 @@
+from __future__ import print_function
+import os, sys
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, '..'))
+
+import bridge_master_pb2, bridge_master_pb2_grpc
+import logging
+import grpc
+
+
+def run():
+    print("Try to watch the bridge changes, stop with Ctrl+C")
+
+    with grpc.insecure_channel("localhost:50051") as channel:
+        stub = bridge_master_pb2_grpc.BridgeMasterStub(channel)
+        feed_id, since = '', 0
+
+        while True:
+            try:
+                for event in stub.WatchChanges(bridge_master_pb2.WatchRequest(since=since, feed_id=feed_id)):
+                    print(f"{event.sequence} {bridge_master_pb2.ChangeType.Name(event.type)} "
+                          f"({bridge_master_pb2.ChangeSource.Name(event.source)}): {event.objectid} {event.bridge_id}")
+                    feed_id, since = event.feed_id, event.sequence
+            except grpc.RpcError as e:
+                # The events since the last sequence are lost, the local records should be reloaded
+                if e.code() == grpc.StatusCode.OUT_OF_RANGE:
+                    print(f"Resync required: {e.details()}")
+                    feed_id, since = '', 0
+                else:
+                    raise
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    run()
@@ -0,0 +1,94 @@
+"""
+Check that an Insert which failed because the layer was down is executed again when it is retried with the same
+idempotency key, instead of returning the stored failure.
+
+The check runs an in-process server against a temporary SQLite National Bridge layer, so it never touches the portal.
+"""
+from __future__ import print_function
+import os, sys
+import tempfile
+from concurrent import futures
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, '..'))
+sys.path.append(os.path.join(here, '..', '..'))  # The common package of the services
+
+SQLITE_PATH = os.path.join(tempfile.mkdtemp(prefix='bridge-idempotency-'), 'national_bridge.sqlite')
+os.environ['BRIDGE_BACKEND'] = 'sqlite'
+os.environ['BRIDGE_SQLITE_PATH'] = SQLITE_PATH
+
+from common.backend import SQLiteBackend
+from servicer.master_data.api import nat_bridge_api as bridge_api
+from servicer.master_data.servicer import BridgeMaster
+from servicer.master_data.idempotency import METADATA_KEY
+import bridge_master_pb2, bridge_master_pb2_grpc
+import grpc
+
+FIELDS = [('OBJECTID', 'esriFieldTypeOID'), ('BRIDGE_ID', 'esriFieldTypeString'), ('BRIDGE_NAME', 'esriFieldTypeString'),
+          ('BRIDGE_NUM', 'esriFieldTypeString'), ('START_DATE', 'esriFieldTypeDate'), ('END_DATE', 'esriFieldTypeDate')]
+
+
+def seed_layer(path: str):
+    """
+    Seed an empty layer with the National Bridge fields.
+    """
+    feature_set = {'objectIdFieldName': 'OBJECTID', 'geometryType': 'esriGeometryPoint', 'spatialReference': {'wkid': 4326},
+                   'fields': [{'name': name, 'type': field_type} for name, field_type in FIELDS], 'features': []}
+    SQLiteBackend(path, 'NATIONAL_BRIDGE', index_columns=['BRIDGE_ID', 'BRIDGE_NAME', 'BRIDGE_NUM']).import_features(feature_set)
+
+def portal_down(*args, **kwargs):
+    raise ConnectionError("portal down")
+
+def run():
+    print("Try to retry an Insert after the layer outage")
+    seed_layer(SQLITE_PATH)
+    bridge_api.configure_call_executor(4)
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    bridge_master_pb2_grpc.add_BridgeMasterServicer_to_server(BridgeMaster(), server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+
+    request = bridge_master_pb2.Bridges(bridges=[bridge_master_pb2.Bridge(
+        attributes=bridge_master_pb2.Attributes(bridge_id='RETRY_ID', bridge_name='RETRY', bridge_num='R1'),
+        geometry=bridge_master_pb2.Point(x=110.5, y=-7.5))])
+    metadata = [(METADATA_KEY, 'retry-after-outage')]
+
+    try:
+        with grpc.insecure_channel(f'localhost:{port}') as channel:
+            stub = bridge_master_pb2_grpc.BridgeMasterStub(channel)
+            edit_features = bridge_api.backend.edit_features
+            bridge_api.backend.edit_features = portal_down
+
+            try:
+                failed = stub.Insert(request, metadata=metadata)
+            finally:
+                bridge_api.backend.edit_features = edit_features
+
+            print(f"Insert during the outage: {failed.add_results}")
+
+            if failed.add_results[0].success or not failed.add_results[0].retryable:
+                raise AssertionError("The Insert during the outage should fail as retryable.")
+
+            retried = stub.Insert(request, metadata=metadata)
+            print(f"Insert retry: {retried.add_results}")
+
+            if not retried.add_results[0].success:
+                raise AssertionError("The retry returned the stored failure instead of inserting the bridge.")
+
+            replayed = stub.Insert(request, metadata=metadata)
+
+            if replayed != retried:
+                raise AssertionError("The successful response should be stored for the next retry.")
+
+            bridges = stub.GetByID(bridge_master_pb2.BridgeIdRequests(bridge_ids=['RETRY_ID']))
+
+            if len(bridges.bridges) != 1:
+                raise AssertionError(f"Expected one inserted bridge, got {len(bridges.bridges)}.")
+    finally:
+        server.stop(None)
+
+    print("The retry after the outage inserted the bridge once")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,126 @@
+"""
+Check that invalid query arguments are rejected with INVALID_ARGUMENT, both when the query is served from the replica
+and from the layer.
+
+The check runs in-process servers against a temporary SQLite National Bridge layer, so it never touches the portal.
+"""
+from __future__ import print_function
+import os, sys
+import tempfile
+from concurrent import futures
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, '..'))
+sys.path.append(os.path.join(here, '..', '..'))  # The common package of the services
+
+SQLITE_PATH = os.path.join(tempfile.mkdtemp(prefix='bridge-invalid-'), 'national_bridge.sqlite')
+os.environ['BRIDGE_BACKEND'] = 'sqlite'
+os.environ['BRIDGE_SQLITE_PATH'] = SQLITE_PATH
+
+from common.backend import SQLiteBackend
+from servicer.master_data.api import nat_bridge_api as bridge_api
+from servicer.master_data.replica import BridgeReplica
+from servicer.master_data.servicer import BridgeMaster
+import bridge_master_pb2, bridge_master_pb2_grpc
+import grpc
+
+FIELDS = [('OBJECTID', 'esriFieldTypeOID'), ('BRIDGE_ID', 'esriFieldTypeString'), ('BRIDGE_NAME', 'esriFieldTypeString'),
+          ('BRIDGE_NUM', 'esriFieldTypeString'), ('START_DATE', 'esriFieldTypeDate'), ('END_DATE', 'esriFieldTypeDate')]
+
+INVALID_SPATIAL_FILTERS = [
+    ('not json', ''),
+    ('{"type": "Point", "coordinates": [110.5, -7.5]}', ''),
+    ('{"type": "Polygon"}', ''),
+    ('null', ''),
+    ('{"type": "Polygon", "coordinates": [[[110, -8], [111, -8], [111, -7], [110, -8]]]}', 'not a crs'),
+]
+NEAREST_MAX_K = 5
+
+
+def seed_layer(path: str, count: int = 10):
+    """
+    Seed the layer with bridges around (110.5, -7.5).
+    """
+    features = [{'attributes': {'OBJECTID': oid, 'BRIDGE_ID': str(oid), 'BRIDGE_NAME': f'N{oid}', 'BRIDGE_NUM': f'X{oid}',
+                                'START_DATE': 0, 'END_DATE': None},
+                 'geometry': {'x': 110 + oid / count, 'y': -8 + oid / count}} for oid in range(1, count + 1)]
+    feature_set = {'objectIdFieldName': 'OBJECTID', 'geometryType': 'esriGeometryPoint', 'spatialReference': {'wkid': 4326},
+                   'fields': [{'name': name, 'type': field_type} for name, field_type in FIELDS], 'features': features}
+    SQLiteBackend(path, 'NATIONAL_BRIDGE', index_columns=['BRIDGE_ID', 'BRIDGE_NAME', 'BRIDGE_NUM']).import_features(feature_set)
+
+def expect_invalid_argument(name: str, call):
+    try:
+        response = call()
+
+        # Stream RPCs fail on the first message
+        if not isinstance(response, bridge_master_pb2.Bridges):
+            list(response)
+    except grpc.RpcError as e:
+        if e.code() != grpc.StatusCode.INVALID_ARGUMENT:
+            raise AssertionError(f"{name} should fail with INVALID_ARGUMENT, got {e.code()}: {e.details()}")
+
+        return e.details()
+
+    raise AssertionError(f"{name} should fail with INVALID_ARGUMENT.")
+
+def check_spatial_filter(stub, path: str):
+    for geojson, crs in INVALID_SPATIAL_FILTERS:
+        request = bridge_master_pb2.SpatialFilter(geojson=geojson, crs=crs)
+        details = expect_invalid_argument(f"GetBySpatialFilter from the {path}", lambda: stub.GetBySpatialFilter(request))
+        expect_invalid_argument(f"StreamBySpatialFilter from the {path}", lambda: stub.StreamBySpatialFilter(request))
+        print(f"{path}: {geojson!r} {crs!r} rejected: {details}")
+
+    polygon = '{"type": "Polygon", "coordinates": [[[110, -8], [111, -8], [111, -7], [110, -7], [110, -8]]]}'
+    bridges = stub.GetBySpatialFilter(bridge_master_pb2.SpatialFilter(geojson=polygon))
+
+    if len(bridges.bridges) == 0:
+        raise AssertionError(f"The valid spatial filter from the {path} should return the bridges.")
+
+def check_nearest(stub):
+    point = bridge_master_pb2.Point(x=110.5, y=-7.5)
+
+    for k in (-1, NEAREST_MAX_K + 1):
+        details = expect_invalid_argument(f"GetNearest k={k}", lambda: stub.GetNearest(bridge_master_pb2.NearestRequests(points=[point], k=k)))
+        print(f"GetNearest k={k} rejected: {details}")
+
+    # k 0 is a single bridge
+    for k, expected in ((0, 1), (1, 1), (NEAREST_MAX_K, NEAREST_MAX_K)):
+        neighbors = stub.GetNearest(bridge_master_pb2.NearestRequests(points=[point], k=k)).results[0].neighbors
+
+        if len(neighbors) != expected:
+            raise AssertionError(f"GetNearest k={k} should return {expected} bridges, got {len(neighbors)}.")
+
+def serve(servicer):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    bridge_master_pb2_grpc.add_BridgeMasterServicer_to_server(servicer, server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+
+    return server, port
+
+def run():
+    print("Try to query with invalid arguments")
+    seed_layer(SQLITE_PATH)
+    bridge_api.configure_call_executor(4)
+
+    replica = BridgeReplica()
+    replica.refresh()
+
+    for path, servicer in (('replica', BridgeMaster(replica=replica, nearest_max_k=NEAREST_MAX_K)), ('layer', BridgeMaster())):
+        server, port = serve(servicer)
+
+        try:
+            with grpc.insecure_channel(f'localhost:{port}') as channel:
+                stub = bridge_master_pb2_grpc.BridgeMasterStub(channel)
+                check_spatial_filter(stub, path)
+
+                # There is no nearest query on the layer
+                if path == 'replica':
+                    check_nearest(stub)
+        finally:
+            server.stop(None)
+
+    print("Invalid arguments are rejected from the replica and the layer")
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,90 @@
+"""
+Check that the replica reconciles the edits made outside of the servicer, and does not report the servicer edits
+again after refreshing the edited records.
+
+The check runs an in-process server against a temporary SQLite National Bridge layer, so it never touches the portal.
+"""
+from __future__ import print_function
+import os, sys
+import tempfile
+import time
+from concurrent import futures
+
+here = os.path.dirname(__file__)
+sys.path.append(os.path.join(here, '..'))
+sys.path.append(os.path.join(here, '..', '..'))  # The common package of the services
+
+SQLITE_PATH = os.path.join(tempfile.mkdtemp(prefix='bridge-reconcile-'), 'national_bridge.sqlite')
+os.environ['BRIDGE_BACKEND'] = 'sqlite'
+os.environ['BRIDGE_SQLITE_PATH'] = SQLITE_PATH
+
+from common.backend import SQLiteBackend
+from servicer.master_data.api import nat_bridge_api as bridge_api
+from servicer.master_data.replica import BridgeReplica
+from servicer.master_data.servicer import BridgeMaster
+import bridge_master_pb2, bridge_master_pb2_grpc
+import grpc
+
+FIELDS = [('OBJECTID', 'esriFieldTypeOID'), ('BRIDGE_ID', 'esriFieldTypeString'), ('BRIDGE_NAME', 'esriFieldTypeString'),
+          ('BRIDGE_NUM', 'esriFieldTypeString'), ('START_DATE', 'esriFieldTypeDate'), ('END_DATE', 'esriFieldTypeDate')]
+
+
+def seed_layer(path: str, count: int = 10):
+    features = [{'attributes': {'OBJECTID': oid, 'BRIDGE_ID': str(oid), 'BRIDGE_NAME': f'N{oid}', 'BRIDGE_NUM': f'X{oid}',
+                                'START_DATE': 0, 'END_DATE': None},
+                 'geometry': {'x': 110 + oid / count, 'y': -8 + oid / count}} for oid in range(1, count + 1)]
+    feature_set = {'objectIdFieldName': 'OBJECTID', 'geometryType': 'esriGeometryPoint', 'spatialReference': {'wkid': 4326},
+                   'fields': [{'name': name, 'type': field_type} for name, field_type in FIELDS], 'features': features}
+    SQLiteBackend(path, 'NATIONAL_BRIDGE', index_columns=['BRIDGE_ID', 'BRIDGE_NAME', 'BRIDGE_NUM']).import_features(feature_set)
+
+def wait_for(condition, timeout: float = 10):
+    stop = time.monotonic() + timeout
+
+    while not condition():
+        if time.monotonic() > stop:
+            raise AssertionError("Timed out waiting for the replica refresh.")
+
+        time.sleep(0.05)
+
+def run():
+    print("Try to reconcile the servicer and the external edits")
+    seed_layer(SQLITE_PATH)
+    bridge_api.configure_call_executor(4)
+
+    reconciled = list()
+    replica = BridgeReplica(refresh_interval=3600, refresh_delay=0.05)
+    replica.add_listener(lambda inserted, updated, removed: reconciled.append((inserted, updated, removed))).start()
+    wait_for(replica.is_ready)
+
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    bridge_master_pb2_grpc.add_BridgeMasterServicer_to_server(BridgeMaster(replica=replica), server)
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+
+    try:
+        with grpc.insecure_channel(f'localhost:{port}') as channel:
+            stub = bridge_master_pb2_grpc.BridgeMasterStub(channel)
+            request = bridge_master_pb2.Bridges(bridges=[bridge_master_pb2.Bridge(
+                attributes=bridge_master_pb2.Attributes(bridge_id='SERVICER_ID', bridge_name='SERVICER', bridge_num='S1'),
+                geometry=bridge_master_pb2.Point(x=110.5, y=-7.5))])
+            oid = stub.Insert(request).add_results[0].objectid
+
+            wait_for(lambda: len(replica.get_by('bridge_id', ['SERVICER_ID']).bridges) == 1)
+            replica.refresh()
+
+            if len(reconciled) != 0:
+                raise AssertionError(f"The servicer edit of OBJECTID {oid} should not be reconciled, got {reconciled}.")
+
+            bridge_api.backend.edit_features(updates=[{'attributes': {'OBJECTID': 1, 'BRIDGE_NAME': 'EXTERNAL'}}])
+            replica.refresh()
+
+            if (len(reconciled) != 1) or ([bridge.attributes.objectid for bridge in reconciled[0][1]] != [1]):
+                raise AssertionError(f"The external edit of OBJECTID 1 should be reconciled once, got {reconciled}.")
+    finally:
+        server.stop(None)
+        replica.stop()
+
+    print("Only the external edit is reconciled")
+
+if __name__ == '__main__':
+    run()
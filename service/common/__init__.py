@@ -0,0 +1,3 @@
+"""
+Modules shared by the bridge and road network GRPC services.
+"""
@@ -0,0 +1,184 @@
+"""
+Admission control of the RPC with per-method concurrency limits and bounded wait queues.
+"""
+from . import deadline
+from . import metrics
+import bisect
+import inspect
+import itertools
+import threading
+import time
+import grpc
+
+
+class Rejected(Exception):
+    """
+    The RPC is over the concurrency limits and could not be queued.
+    """
+
+
+class MethodLimit(object):
+    """
+    Concurrency limit of a single RPC method, with at most max_queue calls waiting for a slot.
+    """
+    def __init__(self, max_concurrent: int, max_queue: int = 0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+
+
+def parse_limits(text: str)->dict:
+    """
+    Parse comma separated 'Method=max_concurrent:max_queue' limits, e.g. 'Export=1:0,GetBySpatialFilter=4:8'.
+    """
+    limits = dict()
+
+    for item in text.split(','):
+        if len(item.strip()) == 0:
+            continue
+
+        method, _, value = item.partition('=')
+        max_concurrent, _, max_queue = value.partition(':')
+        limits[method.strip()] = MethodLimit(int(max_concurrent), int(max_queue or 0))
+
+    return limits
+
+
+class AdmissionControl(object):
+    """
+    Bound the number of RPC running at the same time to capacity, and the limited methods to their own
+    max_concurrent. A call over the limits waits in a bounded queue, with at most max_queue calls of its method
+    and max_waiting calls in total. It is rejected right away if the queue is full, or after max_wait seconds in
+    the queue. Free slots go to the waiting priority methods first, e.g. the cheap reads, then to the other calls
+    in arrival order. A waiting call holds a worker thread, so capacity plus max_waiting should not exceed the workers.
+    """
+    def __init__(self, capacity: int, max_waiting: int = 0, limits: dict | None = None, priority_methods=(),
+                 max_wait: float = 5):
+        self.capacity = capacity
+        self.max_waiting = max_waiting
+        self.limits = limits or dict()
+        self.priority_methods = set(priority_methods)
+        self.max_wait = max_wait
+        self._condition = threading.Condition()
+        self._running = dict()  # Method -> running calls
+        self._total = 0  # Running calls of every method
+        self._waiting = list()  # Sorted (priority, arrival, method) of the waiting calls
+        self._arrival = itertools.count()
+
+    def acquire(self, method: str):
+        """
+        Wait for a slot of the method. Raise Rejected if the call could not be queued or waited too long, or the
+        deadline exceptions if the RPC is past its deadline or cancelled while waiting.
+        """
+        ticket = (0 if method in self.priority_methods else 1, next(self._arrival), method)
+        limit = self.limits.get(method)
+
+        with self._condition:
+            if self._admissible(ticket):
+                self._start(method)
+                return
+
+            if len(self._waiting) >= self.max_waiting:
+                raise Rejected(f"{method} rejected, the server is at its capacity of {self.capacity} calls.")
+
+            if (limit is not None) and (self._queued(method) >= limit.max_queue):
+                raise Rejected(f"{method} rejected, it is at its limit of {limit.max_concurrent} concurrent calls.")
+
+            bisect.insort(self._waiting, ticket)
+            expires = time.monotonic() + self.max_wait
+
+            try:
+                while not self._admissible(ticket):
+                    remaining = expires - time.monotonic()
+
+                    if remaining <= 0:
+                        raise Rejected(f"{method} rejected after waiting {self.max_wait}s for a free slot.")
+
+                    deadline.check()
+                    self._condition.wait(min(remaining, deadline.POLL_INTERVAL))
+            finally:
+                self._waiting.remove(ticket)
+                self._condition.notify_all()
+
+            self._start(method)
+
+    def release(self, method: str):
+        with self._condition:
+            self._running[method] -= 1
+            self._total -= 1
+            self._condition.notify_all()
+
+    def _start(self, method: str):
+        self._running[method] = self._running.get(method, 0) + 1
+        self._total += 1
+
+    def _queued(self, method: str)->int:
+        return sum(1 for ticket in self._waiting if ticket[2] == method)
+
+    def _admissible(self, ticket: tuple)->bool:
+        """
+        Return True if the call could start now. The waiting calls ahead of it which could start take the free
+        slots first.
+        """
+        total = self._total
+        running = dict(self._running)
+
+        for waiting in self._waiting:
+            if waiting >= ticket:
+                break
+
+            if self._has_room(waiting[2], total, running):
+                total += 1
+                running[waiting[2]] = running.get(waiting[2], 0) + 1
+
+        return self._has_room(ticket[2], total, running)
+
+    def _has_room(self, method: str, total: int, running: dict)->bool:
+        limit = self.limits.get(method)
+
+        if total >= self.capacity:
+            return False
+
+        return (limit is None) or (running.get(method, 0) < limit.max_concurrent)
+
+
+def admitted(fn):
+    """
+    Decorator for the servicer method. The call is admitted through the servicer admission control, and aborted
+    with RESOURCE_EXHAUSTED if it is rejected. Server streaming methods hold their slot until the stream ends.
+    """
+    method = fn.__name__
+
+    if inspect.isgeneratorfunction(fn):
+        def wrapper(self, request, context):
+            if self.admission is None:
+                yield from fn(self, request, context)
+                return
+
+            _acquire(self.admission, method, context)
+
+            try:
+                yield from fn(self, request, context)
+            finally:
+                self.admission.release(method)
+    else:
+        def wrapper(self, request, context):
+            if self.admission is None:
+                return fn(self, request, context)
+
+            _acquire(self.admission, method, context)
+
+            try:
+                return fn(self, request, context)
+            finally:
+                self.admission.release(method)
+
+    wrapper.__name__ = method
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+def _acquire(admission: AdmissionControl, method: str, context):
+    with metrics.stage('admission'):
+        try:
+            admission.acquire(method)
+        except Rejected as e:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
@@ -0,0 +1,94 @@
+"""
+Adapter for serving a synchronous servicer on grpc.aio server.
+"""
+import asyncio
+
+_DONE = object()  # Sentinel for exhausted response iterator
+
+
+class _Aborted(Exception):
+    """
+    Abort requested by the synchronous servicer, raised back to the coroutine.
+    """
+    def __init__(self, code, details):
+        super(_Aborted, self).__init__(details)
+        self.code = code
+        self.details = details
+
+
+class _SyncContext(object):
+    """
+    grpc.aio servicer context for the synchronous servicer. abort of grpc.aio is a coroutine, so it is replaced
+    with one that raises like the synchronous context and the abort is awaited by the coroutine. is_active of the
+    synchronous context is also provided, the RPC is inactive once the coroutine has finished or is cancelled.
+    """
+    def __init__(self, context):
+        self._context = context
+        self.active = True
+
+    def abort(self, code, details=''):
+        self._context.set_code(code)
+        self._context.set_details(details)
+
+        raise _Aborted(code, details)
+
+    def is_active(self)->bool:
+        return self.active and not self._context.done()
+
+    def __getattr__(self, name):
+        return getattr(self._context, name)
+
+
+class AsyncServicer(object):
+    """
+    Expose every RPC of a synchronous servicer as a coroutine. The servicer method runs in a separately sized
+    executor, so the number of in-flight request is no longer tied to the number of worker threads.
+    """
+    def __init__(self, servicer, service_descriptor, executor):
+        self.servicer = servicer
+        self.executor = executor
+
+        for method in service_descriptor.methods:
+            fn = getattr(servicer, method.name)
+
+            if method.server_streaming:
+                handler = self._stream_handler(fn)
+            else:
+                handler = self._unary_handler(fn)
+
+            setattr(self, method.name, handler)
+
+    def _unary_handler(self, fn):
+        async def handler(request, context):
+            loop = asyncio.get_running_loop()
+
+            try:
+                return await loop.run_in_executor(self.executor, fn, request, _SyncContext(context))
+            except _Aborted as e:
+                await context.abort(e.code, e.details)
+
+        handler.__name__ = fn.__name__
+        return handler
+
+    def _stream_handler(self, fn):
+        async def handler(request, context):
+            loop = asyncio.get_running_loop()
+            sync_context = _SyncContext(context)
+
+            try:
+                responses = await loop.run_in_executor(self.executor, lambda: iter(fn(request, sync_context)))
+
+                while True:
+                    response = await loop.run_in_executor(self.executor, next, responses, _DONE)
+
+                    if response is _DONE:
+                        return
+
+                    yield response
+            except _Aborted as e:
+                await context.abort(e.code, e.details)
+            finally:
+                sync_context.active = False
+
+        handler.__name__ = fn.__name__
+        return handler
@@ -0,0 +1,524 @@
+"""
+Feature layer backends. The portal backend queries the ArcGIS portal feature layer, the SQLite backend serves
+a local copy of the layer for running the service offline.
+"""
+from shapely.geometry import Point, MultiLineString, Polygon, MultiPolygon
+from shapely import contains, intersects, prepare
+from .geometry import to_crs, reproject
+import threading
+import sqlite3
+import os
+import json
+import time
+import re
+
+# Query options which does not change the query results of the SQLite backend
+_IGNORED_OPTIONS = ('out_sr', 'return_m', 'return_z', 'return_all_records')
+
+_SQLITE_TYPES = {
+    'esriFieldTypeOID': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+    'esriFieldTypeSmallInteger': 'INTEGER',
+    'esriFieldTypeInteger': 'INTEGER',
+    'esriFieldTypeBigInteger': 'INTEGER',
+    'esriFieldTypeDouble': 'REAL',
+    'esriFieldTypeSingle': 'REAL',
+    'esriFieldTypeDate': 'INTEGER',  # Epoch milliseconds, the same as the portal query results
+}
+
+INTERRUPT_CHECK_INSTRUCTIONS = 10000  # SQLite virtual machine instructions between the interrupt checks
+
+EDIT_DATE_FIELD = {'name': 'last_edited_date', 'type': 'esriFieldTypeDate', 'alias': 'last_edited_date'}
+
+
+class FeatureLayerBackend(object):
+    """
+    Interface of the feature layer backend. Query results are returned as FeatureSet or ESRI JSON dictionary
+    and edit results with the same structure as FeatureLayer.edit_features.
+    """
+    @property
+    def properties(self)->dict:
+        raise NotImplementedError()
+
+    def is_ready(self)->bool:
+        return True
+
+    def connect_async(self):
+        pass
+
+    def query(self, where: str = '1=1', out_fields='*', geometry_filter=None, return_geometry=True, **kwargs):
+        """
+        Attribute and spatial query. Spatial query uses the geometry filter created by arcgis.geometry.filters.
+        """
+        raise NotImplementedError()
+
+    def edit_features(self, adds=None, updates=None, deletes=None, rollback_on_failure=True)->dict:
+        """
+        Apply the edits. If rollback_on_failure is False, every record succeeds or fails on its own.
+        """
+        raise NotImplementedError()
+
+
+class PortalBackend(FeatureLayerBackend):
+    """
+    Feature layer on the ArcGIS portal accessed through the portal session.
+    """
+    def __init__(self, session):
+        self.session = session
+
+    @property
+    def properties(self):
+        return self.session.layer().properties
+
+    def is_ready(self)->bool:
+        return self.session.is_ready()
+
+    def connect_async(self):
+        self.session.connect_async()
+
+    def query(self, where: str = '1=1', out_fields='*', geometry_filter=None, return_geometry=True, **kwargs):
+        return self.session.call('query', where=where, out_fields=out_fields, geometry_filter=geometry_filter,
+                                 return_geometry=return_geometry, **kwargs)
+
+    def edit_features(self, adds=None, updates=None, deletes=None, rollback_on_failure=True)->dict:
+        return self.session.call('edit_features', adds=adds, updates=updates, deletes=deletes,
+                                 rollback_on_failure=rollback_on_failure)
+
+
+class SQLiteBackend(FeatureLayerBackend):
+    """
+    Local copy of a feature layer in a SQLite database. Attributes are stored as columns with indexes on the
+    requested columns, the geometry is stored as ESRI JSON with its bounding box in an R*Tree index.
+    Dates are stored as epoch milliseconds and the edit date is tracked in the last_edited_date column.
+    If interrupt is given, a running query is interrupted once interrupt() returns True, e.g. the RPC is past its deadline.
+    """
+    def __init__(self, path: str, table: str, index_columns: list | None = None, interrupt=None):
+        self.path = path
+        self.table = table
+        self.rtree = f"rtree_{table}_geometry"
+        self.index_columns = index_columns or list()
+        self.interrupt = interrupt
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._metadata = None
+
+        self._connection().execute("CREATE TABLE IF NOT EXISTS layer_metadata (table_name TEXT PRIMARY KEY, metadata TEXT)")
+        self._connection().commit()
+
+    @property
+    def properties(self)->dict:
+        metadata = self._layer_metadata()
+        properties = {'editFieldsInfo': {'editDateField': EDIT_DATE_FIELD['name']}}
+
+        if metadata is not None:
+            properties.update(metadata)
+
+        return properties
+
+    def query(self, where: str = '1=1', out_fields='*', geometry_filter=None, return_geometry=True,
+              order_by_fields: str | None = None, result_offset: int | None = None, result_record_count: int | None = None,
+              **kwargs)->dict:
+        unsupported = [key for key in kwargs if key not in _IGNORED_OPTIONS]
+
+        if len(unsupported) != 0:
+            raise NotImplementedError(f"Query options {unsupported} is not supported by SQLite backend.")
+
+        metadata = self._layer_metadata()
+
+        if metadata is None:
+            return {'features': [], 'fields': []}
+
+        oid_col = metadata['objectIdFieldName']
+        sql = f'SELECT * FROM "{self.table}" WHERE ({_translate_where(where)})'
+        params = list()
+
+        if geometry_filter is not None:
+            filter_geometry = _geometry_dict(geometry_filter['geometry'])
+            filter_shape = esri_to_shape(filter_geometry)
+            in_sr = geometry_filter.get('inSR') or filter_geometry.get('spatialReference')
+            filter_shape = reproject(filter_shape, to_crs(in_sr), to_crs(metadata.get('spatialReference')))
+            xmin, ymin, xmax, ymax = filter_shape.bounds
+            sql += f' AND "{oid_col}" IN (SELECT id FROM "{self.rtree}" WHERE minx <= ? AND maxx >= ? AND miny <= ? AND maxy >= ?)'
+            params.extend([xmax, xmin, ymax, ymin])
+
+        if order_by_fields is not None:
+            sql += f' ORDER BY {order_by_fields}'
+        else:
+            sql += f' ORDER BY "{oid_col}"'
+
+        # Paging is done after the exact spatial test for spatial query
+        if (geometry_filter is None) and (result_record_count is not None):
+            sql += ' LIMIT ? OFFSET ?'
+            params.extend([result_record_count, result_offset or 0])
+
+        conn = self._connection()
+
+        if self.interrupt is not None:
+            conn.set_progress_handler(self.interrupt, INTERRUPT_CHECK_INSTRUCTIONS)
+
+        try:
+            cursor = conn.execute(sql, params)
+            columns = [desc[0] for desc in cursor.description]
+            rows = cursor.fetchall()
+        finally:
+            if self.interrupt is not None:
+                conn.set_progress_handler(None, 0)
+
+        if geometry_filter is not None:
+            rows = self._spatial_filter(rows, columns.index('SHAPE'), filter_shape, geometry_filter.get('spatialRel'))
+            rows = rows[(result_offset or 0):]
+
+            if result_record_count is not None:
+                rows = rows[:result_record_count]
+
+        fields = metadata['fields']
+
+        if out_fields != '*':
+            if isinstance(out_fields, str):
+                out_fields = out_fields.split(',')
+
+            requested = {col.strip().lower() for col in out_fields} | {oid_col.lower()}
+            fields = [field for field in fields if field['name'].lower() in requested]
+
+        field_index = [(field['name'], columns.index(field['name'])) for field in fields]
+        shape_index = columns.index('SHAPE')
+        features = list()
+
+        for row in rows:
+            feature = {'attributes': {name: row[i] for name, i in field_index}}
+
+            if return_geometry and (row[shape_index] is not None):
+                feature['geometry'] = json.loads(row[shape_index])
+
+            features.append(feature)
+
+        return {
+            'objectIdFieldName': oid_col,
+            'geometryType': metadata.get('geometryType'),
+            'spatialReference': metadata.get('spatialReference'),
+            'fields': fields,
+            'features': features
+        }
+
+    def edit_features(self, adds=None, updates=None, deletes=None, rollback_on_failure=True)->dict:
+        # Records are always applied one by one, a failed record does not roll back the others
+        metadata = self._layer_metadata()
+
+        if metadata is None:
+            raise ValueError(f"Table {self.table} does not exist in {self.path}.")
+
+        results = {'addResults': list(), 'updateResults': list(), 'deleteResults': list()}
+
+        if isinstance(deletes, str):
+            deletes = [oid for oid in deletes.split(',') if len(oid.strip()) != 0]
+
+        with self._write_lock:
+            conn = self._connection()
+
+            # The records share one transaction, every record is applied in its own savepoint
+            if not conn.in_transaction:
+                conn.execute('BEGIN')
+
+            try:
+                for feature in adds or list():
+                    results['addResults'].append(self._edit(conn, self._insert, feature, None))
+
+                for feature in updates or list():
+                    oid = self._attributes(feature['attributes']).get(metadata['objectIdFieldName'])
+                    results['updateResults'].append(self._edit(conn, self._update, feature, oid))
+
+                for oid in deletes or list():
+                    results['deleteResults'].append(self._edit(conn, self._delete, int(oid), int(oid)))
+            except BaseException:
+                conn.rollback()
+                raise
+
+            conn.commit()
+
+        return results
+
+    def copy_from(self, source, **query)->int:
+        """
+        Copy every feature of the source backend, e.g. the portal layer, into the layer table. Return the number
+        of features copied.
+        """
+        feature_set = source.query(where='1=1', out_fields='*', **query)
+        self.import_features(feature_set.to_dict())
+
+        return len(feature_set.features)
+
+    def import_features(self, feature_set: dict):
+        """
+        Create the layer table from ESRI JSON FeatureSet (if not exists) and insert its features, keeping the OBJECTID.
+        """
+        with self._write_lock:
+            conn = self._connection()
+
+            if self._layer_metadata() is None:
+                self._create_table(conn, feature_set)
+
+            for feature in feature_set['features']:
+                self._insert(conn, feature, keep_oid=True)
+
+            conn.commit()
+
+    def _create_table(self, conn, feature_set: dict):
+        fields = [field for field in feature_set['fields'] if field['name'].upper() != 'SHAPE']
+
+        if not any(field['name'].lower() == EDIT_DATE_FIELD['name'] for field in fields):
+            fields.append(EDIT_DATE_FIELD)
+
+        oid_col = feature_set.get('objectIdFieldName') or next(field['name'] for field in fields if field['type'] == 'esriFieldTypeOID')
+        columns = list()
+
+        for field in fields:
+            if field['name'] == oid_col:
+                columns.append(f'"{field["name"]}" INTEGER PRIMARY KEY AUTOINCREMENT')
+            else:
+                columns.append(f'"{field["name"]}" {_SQLITE_TYPES.get(field["type"], "TEXT")}')
+
+        columns.append('"SHAPE" TEXT')
+        conn.execute(f'CREATE TABLE "{self.table}" ({", ".join(columns)})')
+        conn.execute(f'CREATE VIRTUAL TABLE "{self.rtree}" USING rtree(id, minx, maxx, miny, maxy)')
+
+        for col in self.index_columns:
+            conn.execute(f'CREATE INDEX "idx_{self.table}_{col}" ON "{self.table}" ("{col}")')
+
+        metadata = {
+            'objectIdFieldName': oid_col,
+            'geometryType': feature_set.get('geometryType'),
+            'spatialReference': feature_set.get('spatialReference'),
+            'fields': fields
+        }
+        conn.execute("INSERT INTO layer_metadata VALUES (?, ?)", [self.table, json.dumps(metadata)])
+        self._metadata = metadata
+
+    def _edit(self, conn, fn, record, oid)->dict:
+        """
+        Apply a single record in a savepoint. A failed record is rolled back, including the statements executed
+        before the failure, without rolling back the other records.
+        """
+        conn.execute('SAVEPOINT edit_record')
+
+        try:
+            oid = fn(conn, record)
+        except (sqlite3.Error, ValueError, KeyError, TypeError) as e:
+            conn.execute('ROLLBACK TO edit_record')
+            conn.execute('RELEASE edit_record')
+            return {'objectId': oid, 'success': False, 'error': {'code': -1, 'description': str(e)}}
+
+        conn.execute('RELEASE edit_record')
+        return {'objectId': oid, 'success': True}
+
+    def _insert(self, conn, feature: dict, keep_oid=False)->int:
+        metadata = self._layer_metadata()
+        attributes = self._attributes(feature.get('attributes', dict()))
+        attributes[EDIT_DATE_FIELD['name']] = int(time.time() * 1000)
+
+        if not keep_oid:
+            attributes.pop(metadata['objectIdFieldName'], None)
+
+        geometry = feature.get('geometry')
+        attributes['SHAPE'] = None if geometry is None else json.dumps(geometry)
+        columns = ', '.join(f'"{col}"' for col in attributes)
+        cursor = conn.execute(f'INSERT INTO "{self.table}" ({columns}) VALUES ({", ".join("?" * len(attributes))})', list(attributes.values()))
+        oid = cursor.lastrowid
+
+        self._index_geometry(conn, oid, geometry)
+
+        return oid
+
+    def _update(self, conn, feature: dict)->int:
+        oid_col = self._layer_metadata()['objectIdFieldName']
+        attributes = self._attributes(feature.get('attributes', dict()))
+        oid = attributes.pop(oid_col)
+        attributes[EDIT_DATE_FIELD['name']] = int(time.time() * 1000)
+
+        if feature.get('geometry') is not None:
+            attributes['SHAPE'] = json.dumps(feature['geometry'])
+
+        assignments = ', '.join(f'"{col}" = ?' for col in attributes)
+        cursor = conn.execute(f'UPDATE "{self.table}" SET {assignments} WHERE "{oid_col}" = ?', list(attributes.values()) + [oid])
+
+        if cursor.rowcount == 0:
+            raise ValueError(f"Feature with {oid_col} {oid} does not exist.")
+
+        if feature.get('geometry') is not None:
+            self._index_geometry(conn, oid, feature['geometry'])
+
+        return oid
+
+    def _delete(self, conn, oid: int)->int:
+        oid_col = self._layer_metadata()['objectIdFieldName']
+        cursor = conn.execute(f'DELETE FROM "{self.table}" WHERE "{oid_col}" = ?', [oid])
+
+        if cursor.rowcount == 0:
+            raise ValueError(f"Feature with {oid_col} {oid} does not exist.")
+
+        conn.execute(f'DELETE FROM "{self.rtree}" WHERE id = ?', [oid])
+
+        return oid
+
+    def _index_geometry(self, conn, oid: int, geometry: dict | None):
+        conn.execute(f'DELETE FROM "{self.rtree}" WHERE id = ?', [oid])
+
+        if geometry is None:
+            return
+
+        xmin, ymin, xmax, ymax = esri_bounds(geometry)
+        conn.execute(f'INSERT INTO "{self.rtree}" VALUES (?, ?, ?, ?, ?)', [oid, xmin, xmax, ymin, ymax])
+
+    def _attributes(self, attributes: dict)->dict:
+        """
+        Map the attribute names (case insensitive) into the table columns and convert date values into epoch milliseconds.
+        Attributes which are not a table column are ignored.
+        """
+        fields = {field['name'].lower(): field for field in self._layer_metadata()['fields']}
+        mapped = dict()
+
+        for key, val in attributes.items():
+            field = fields.get(key.lower())
+
+            if field is None:
+                continue
+
+            if (field['type'] == 'esriFieldTypeDate') and (val is not None):
+                val = _to_epoch_ms(val)
+
+            mapped[field['name']] = val
+
+        return mapped
+
+    def _spatial_filter(self, rows: list, shape_index: int, filter_shape, spatial_rel: str | None)->list:
+        """
+        Exact spatial test of the R*Tree candidates against the filter geometry.
+        """
+        if (len(rows) == 0) or (spatial_rel == 'esriSpatialRelEnvelopeIntersects'):
+            return rows
+
+        geometries = [esri_to_shape(json.loads(row[shape_index])) for row in rows]
+        prepare(filter_shape)
+
+        if spatial_rel == 'esriSpatialRelContains':
+            mask = contains(filter_shape, geometries)
+        elif spatial_rel in (None, 'esriSpatialRelIntersects'):
+            mask = intersects(filter_shape, geometries)
+        else:
+            raise NotImplementedError(f"Spatial relationship {spatial_rel} is not supported by SQLite backend.")
+
+        return [row for row, matched in zip(rows, mask.tolist()) if matched]
+
+    def _layer_metadata(self)->dict | None:
+        if self._metadata is None:
+            row = self._connection().execute("SELECT metadata FROM layer_metadata WHERE table_name = ?", [self.table]).fetchone()
+
+            if row is not None:
+                self._metadata = json.loads(row[0])
+
+        return self._metadata
+
+    def _connection(self)->sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+
+        # A connection inherited through fork is not used, the forked worker opens its own
+        if (conn is None) or (self._local.pid != os.getpid()):
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+
+        return conn
+
+
+def esri_to_shape(geometry: dict):
+    """
+    Convert ESRI JSON point, polyline, polygon or envelope into Shapely geometry.
+    """
+    if 'x' in geometry:
+        return Point(geometry['x'], geometry['y'])
+
+    if 'xmin' in geometry:
+        return Polygon([(geometry['xmin'], geometry['ymin']), (geometry['xmax'], geometry['ymin']),
+                        (geometry['xmax'], geometry['ymax']), (geometry['xmin'], geometry['ymax'])])
+
+    if 'paths' in geometry:
+        return MultiLineString([[vertex[:2] for vertex in path] for path in geometry['paths']])
+
+    return _rings_to_shape(geometry['rings'])
+
+def esri_bounds(geometry: dict)->tuple:
+    """
+    Bounding box of ESRI JSON geometry as (xmin, ymin, xmax, ymax).
+    """
+    if 'x' in geometry:
+        return geometry['x'], geometry['y'], geometry['x'], geometry['y']
+
+    if 'xmin' in geometry:
+        return geometry['xmin'], geometry['ymin'], geometry['xmax'], geometry['ymax']
+
+    parts = geometry.get('paths') or geometry.get('rings')
+    xs = [vertex[0] for part in parts for vertex in part]
+    ys = [vertex[1] for part in parts for vertex in part]
+
+    return min(xs), min(ys), max(xs), max(ys)
+
+def _rings_to_shape(rings: list):
+    """
+    Assemble polygon rings into Shapely geometry. A ring nested in an odd number of rings is a hole,
+    so the result does not depend on the ring orientation.
+    """
+    polygons = sorted((Polygon([vertex[:2] for vertex in ring]) for ring in rings), key=lambda polygon: polygon.area, reverse=True)
+    processed = list()
+    shells = list()  # [shell, [holes]]
+
+    for polygon in polygons:
+        point = Point(polygon.exterior.coords[0])
+        depth = sum(1 for other in processed if other.contains(point))
+        processed.append(polygon)
+
+        if depth % 2 == 0:
+            shells.append([polygon, list()])
+            continue
+
+        # Smallest shell which contains the hole
+        parent = next((shell for shell in reversed(shells) if shell[0].contains(point)), None)
+
+        if parent is not None:
+            parent[1].append(polygon.exterior.coords)
+
+    parts = [Polygon(shell.exterior.coords, holes) for shell, holes in shells]
+
+    if len(parts) == 1:
+        return parts[0]
+
+    return MultiPolygon(parts)
+
+def _geometry_dict(geometry)->dict:
+    if isinstance(geometry, dict):
+        return geometry
+
+    return json.loads(geometry.JSON)
+
+def _translate_where(where: str)->str:
+    """
+    Translate the portal SQL where clause into SQLite. Dates are stored as epoch milliseconds, the current time is
+    taken from julianday which keeps the milliseconds.
+    """
+    return re.sub(r'\bCURRENT_TIMESTAMP\b', "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)", where,
+                  flags=re.IGNORECASE)
+
+def _to_epoch_ms(value)->int:
+    if isinstance(value, (int, float)):
+        return int(value)
+
+    value = str(value)
+
+    if value.lstrip('-').isdigit():
+        return int(value)
+
+    for date_format in ('%m/%d/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return int(time.mktime(time.strptime(value, date_format)) * 1000)
+        except ValueError:
+            continue
+
+    raise ValueError(f"Invalid date value {value}.")
@@ -0,0 +1,324 @@
+"""
+Deadline and cancellation of the RPC, propagated to the backend calls.
+"""
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from contextvars import ContextVar, copy_context
+import inspect
+import threading
+import time
+import grpc
+
+POLL_INTERVAL = 0.1  # Maximum seconds between the cancellation checks while waiting
+
+_current = ContextVar('deadline', default=None)  # Deadline of the RPC handled by this thread
+_DONE = object()  # Sentinel for exhausted response iterator
+
+
+class DeadlineExceeded(Exception):
+    """
+    The RPC deadline has passed before the call finished.
+    """
+
+
+class Cancelled(Exception):
+    """
+    The RPC has been cancelled, e.g. the client has given up.
+    """
+
+
+class Deadline(object):
+    """
+    Deadline and cancellation state of a single RPC. A detached deadline is carried by the executor threads
+    working for the RPC, their calls are not moved to another thread as the RPC thread does not wait for them
+    once the deadline has passed.
+    """
+    def __init__(self, expires: float | None = None, is_active=None, detached: bool = False):
+        self.expires = expires  # Monotonic expiry time, None if the RPC has no deadline
+        self.is_active = is_active  # Callable returning False once the RPC is cancelled
+        self.detached = detached
+
+    @classmethod
+    def from_context(cls, context):
+        remaining = context.time_remaining()
+        expires = None if remaining is None else time.monotonic() + remaining
+
+        return cls(expires, getattr(context, 'is_active', None))
+
+    def detach(self):
+        return Deadline(self.expires, self.is_active, detached=True)
+
+    def remaining(self)->float | None:
+        """
+        Return the remaining seconds, None if the RPC has no deadline.
+        """
+        if self.expires is None:
+            return None
+
+        return self.expires - time.monotonic()
+
+    def check(self):
+        """
+        Raise Cancelled or DeadlineExceeded if the RPC should no longer be worked on.
+        """
+        if (self.is_active is not None) and (not self.is_active()):
+            raise Cancelled("The RPC has been cancelled.")
+
+        if (self.expires is not None) and (time.monotonic() >= self.expires):
+            raise DeadlineExceeded("The RPC deadline has passed.")
+
+    def expired(self)->bool:
+        try:
+            self.check()
+        except (DeadlineExceeded, Cancelled):
+            return True
+
+        return False
+
+    def _timeout(self)->float:
+        remaining = self.remaining()
+
+        if remaining is None:
+            return POLL_INTERVAL
+
+        return min(max(remaining, 0), POLL_INTERVAL)
+
+
+class LatencyBudget(object):
+    """
+    Expected latency of every RPC method, as exponentially weighted moving average of its successful calls.
+    A call whose remaining deadline is below ratio times the expected latency is rejected before it is started,
+    as it would most likely be past its deadline anyway. While the calls are rejected, a single call is let
+    through every probe_interval seconds so the expected latency recovers once the backend is fast again.
+    """
+    def __init__(self, ratio: float = 0.5, alpha: float = 0.1, min_samples: int = 10, probe_interval: float = 1.0):
+        self.ratio = ratio
+        self.alpha = alpha
+        self.min_samples = min_samples  # Calls observed before any call is rejected
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._latency = dict()  # Method -> [expected seconds, samples, monotonic time of the last admitted call]
+
+    def expected(self, method: str)->float | None:
+        """
+        Return the expected latency of the method in seconds, None if not enough calls are observed yet.
+        """
+        latency = self._latency.get(method)
+
+        if (latency is None) or (latency[1] < self.min_samples):
+            return None
+
+        return latency[0]
+
+    def admits(self, method: str, remaining: float | None)->bool:
+        """
+        Return False if the call should be rejected for its remaining deadline.
+        """
+        expected = self.expected(method)
+
+        if (remaining is None) or (expected is None) or (remaining >= expected * self.ratio):
+            return True
+
+        now = time.monotonic()
+
+        with self._lock:
+            latency = self._latency[method]
+
+            if now - latency[2] < self.probe_interval:
+                return False
+
+            latency[2] = now
+
+        return True
+
+    def observe(self, method: str, seconds: float):
+        with self._lock:
+            latency = self._latency.get(method)
+
+            if latency is None:
+                self._latency[method] = [seconds, 1, time.monotonic()]
+            else:
+                latency[0] += self.alpha * (seconds - latency[0])
+                latency[1] += 1
+                latency[2] = time.monotonic()
+
+
+def current()->Deadline | None:
+    """
+    Return the deadline of the RPC handled by this thread, None outside of an RPC.
+    """
+    return _current.get()
+
+def check():
+    """
+    Raise Cancelled or DeadlineExceeded if the current RPC should no longer be worked on.
+    """
+    bound = _current.get()
+
+    if bound is not None:
+        bound.check()
+
+def expired()->bool:
+    """
+    Return True if the current RPC is past its deadline or cancelled, e.g. to interrupt a running query.
+    """
+    bound = _current.get()
+
+    return (bound is not None) and bound.expired()
+
+def wait(future):
+    """
+    Return the result of the future, waiting no longer than the current RPC deadline. The future is cancelled
+    if the RPC is past its deadline or cancelled, a running future is left to finish on its own.
+    """
+    bound = _current.get()
+
+    if bound is None:
+        return future.result()
+
+    while True:
+        try:
+            bound.check()
+        except (DeadlineExceeded, Cancelled):
+            future.cancel()
+            raise
+
+        try:
+            return future.result(bound._timeout())
+        except FutureTimeoutError:
+            if future.done():
+                raise
+
+def wait_event(event: threading.Event):
+    """
+    Wait for the event no longer than the current RPC deadline.
+    """
+    bound = _current.get()
+
+    if bound is None:
+        event.wait()
+        return
+
+    while not event.wait(bound._timeout()):
+        bound.check()
+
+def submit(executor, fn, *args, **kwargs):
+    """
+    Submit fn(*args, **kwargs) to the executor with the current RPC deadline.
+    """
+    bound = _current.get()
+    context = copy_context()
+
+    if bound is not None:
+        context.run(_current.set, bound.detach())
+
+    return executor.submit(context.run, fn, *args, **kwargs)
+
+def map(executor, fn, items)->list:
+    """
+    Concurrent fn(item) for every item, like executor.map. The calls which are not started yet are cancelled
+    when the RPC is past its deadline or cancelled.
+    """
+    futures = [submit(executor, fn, item) for item in items]
+
+    try:
+        return [wait(future) for future in futures]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+
+        raise
+
+def call(executor, fn, *args, **kwargs):
+    """
+    Backend call bounded by the current RPC deadline. The call is run in the executor while the RPC thread waits
+    until the deadline, so the RPC thread is released for the live requests even if the backend does not respond.
+    The RPC without deadline, or without executor, makes the call inline. A failure after the deadline, e.g. the
+    interrupted query, is raised as DeadlineExceeded.
+    """
+    bound = _current.get()
+
+    if bound is None:
+        return fn(*args, **kwargs)
+
+    bound.check()
+
+    try:
+        if bound.detached or (bound.expires is None) or (executor is None):
+            return fn(*args, **kwargs)
+
+        return wait(submit(executor, fn, *args, **kwargs))
+    except (DeadlineExceeded, Cancelled):
+        raise
+    except Exception:
+        bound.check()
+        raise
+
+def propagate(fn):
+    """
+    Decorator for the servicer method. Bind the RPC deadline for the backend calls, and abort with DEADLINE_EXCEEDED
+    or CANCELLED once the RPC should no longer be worked on. A unary call is rejected before it is started if its
+    remaining deadline is too short for the servicer latency_budget. Server streaming methods check the deadline
+    before every response.
+    """
+    method = fn.__name__
+
+    if inspect.isgeneratorfunction(fn):
+        def wrapper(self, request, context):
+            bound = Deadline.from_context(context)
+            responses = fn(self, request, context)
+
+            while True:
+                # Every step could be run by a different thread in aio mode
+                token = _current.set(bound)
+
+                try:
+                    bound.check()
+                    response = next(responses, _DONE)
+                except (DeadlineExceeded, Cancelled) as e:
+                    _abort(context, e)
+                finally:
+                    _current.reset(token)
+
+                if response is _DONE:
+                    return
+
+                yield response
+    else:
+        def wrapper(self, request, context):
+            bound = Deadline.from_context(context)
+            budget = self.latency_budget
+
+            try:
+                bound.check()
+            except (DeadlineExceeded, Cancelled) as e:
+                _abort(context, e)
+
+            if (budget is not None) and (not budget.admits(method, bound.remaining())):
+                context.abort(grpc.StatusCode.DEADLINE_EXCEEDED,
+                              f"Remaining deadline {bound.remaining():.3f}s is too short, "
+                              f"{method} is expected to take {budget.expected(method):.3f}s.")
+
+            token = _current.set(bound)
+            start_time = time.perf_counter()
+
+            try:
+                response = fn(self, request, context)
+            except (DeadlineExceeded, Cancelled) as e:
+                _abort(context, e)
+            finally:
+                _current.reset(token)
+
+            if budget is not None:
+                budget.observe(method, time.perf_counter() - start_time)
+
+            return response
+
+    wrapper.__name__ = method
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+def _abort(context, error: Exception):
+    if isinstance(error, Cancelled):
+        context.abort(grpc.StatusCode.CANCELLED, str(error))
+
+    context.abort(grpc.StatusCode.DEADLINE_EXCEEDED, str(error))
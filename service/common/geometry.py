@@ -0,0 +1,61 @@
+"""
+Coordinate reference system helpers shared by the layer backends and the spatial queries.
+"""
+from shapely.ops import transform
+from pyproj import CRS, Transformer
+from functools import lru_cache
+import numpy as np
+
+
+WGS84 = CRS.from_epsg(4326)
+
+def to_crs(spatial_reference)->CRS | None:
+    """
+    Create pyproj CRS from WKID, WKT string or ArcGIS spatial reference dictionary. Return None for empty spatial reference.
+    """
+    if spatial_reference is None:
+        return None
+
+    if isinstance(spatial_reference, (int, str)):
+        if spatial_reference == '':
+            return None
+
+        return CRS.from_user_input(spatial_reference)
+
+    if spatial_reference.get('wkt'):
+        return CRS.from_wkt(spatial_reference['wkt'])
+
+    wkid = spatial_reference.get('latestWkid') or spatial_reference.get('wkid')
+
+    if wkid is None:
+        return None
+
+    return CRS.from_epsg(wkid)
+
+def reproject(geom, from_crs: CRS | None, to_crs: CRS | None):
+    """
+    Reproject Shapely geometry between CRS. The geometry is returned as it is if either CRS is unknown or both are equal.
+    """
+    if (from_crs is None) or (to_crs is None) or from_crs.equals(to_crs, ignore_axis_order=True):
+        return geom
+
+    return transform(_transformer(from_crs, to_crs).transform, geom)
+
+def to_lonlat(xs, ys, crs: CRS | None)->tuple[np.ndarray, np.ndarray]:
+    """
+    Reproject coordinate arrays into WGS84 longitude and latitude. The coordinates are returned as they are if the CRS
+    is unknown.
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+
+    if (crs is None) or crs.equals(WGS84, ignore_axis_order=True):
+        return xs, ys
+
+    lons, lats = _transformer(crs, WGS84).transform(xs, ys)
+
+    return np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+
+@lru_cache(maxsize=32)
+def _transformer(from_crs: CRS, to_crs: CRS)->Transformer:
+    return Transformer.from_crs(from_crs, to_crs, always_xy=True)
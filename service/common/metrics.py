@@ -0,0 +1,224 @@
+"""
+Per-RPC Prometheus metrics and sampled request logging for the GRPC servicer.
+"""
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from contextlib import contextmanager
+from contextvars import ContextVar
+import inspect
+import logging
+import random
+import threading
+import time
+
+# Latency buckets in seconds, up to the slow portal edits and exports
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+RPC_LATENCY = Histogram('grpc_server_handling_seconds', 'RPC handling latency.',
+                        ['grpc_service', 'grpc_method'], buckets=LATENCY_BUCKETS)
+RPC_IN_FLIGHT = Gauge('grpc_server_in_flight', 'Number of RPC currently being handled.',
+                      ['grpc_service', 'grpc_method'])
+RPC_HANDLED = Counter('grpc_server_handled_total', 'Number of RPC completed, by status code.',
+                      ['grpc_service', 'grpc_method', 'grpc_code'])
+STAGE_LATENCY = Histogram('grpc_server_stage_seconds', 'Time spent in a stage of the RPC handling, e.g. backend or convert.',
+                          ['grpc_service', 'grpc_method', 'stage'], buckets=LATENCY_BUCKETS)
+BACKEND_READY = Gauge('grpc_server_backend_ready', 'Feature layer backend readiness, 1 if connected to the layer.',
+                      ['grpc_service'])
+
+# Status codes of the calls failed by the client request, logged as warning instead of error
+CLIENT_CODES = ('CANCELLED', 'INVALID_ARGUMENT', 'DEADLINE_EXCEEDED', 'NOT_FOUND', 'ALREADY_EXISTS', 'PERMISSION_DENIED',
+                'RESOURCE_EXHAUSTED', 'FAILED_PRECONDITION', 'OUT_OF_RANGE', 'UNAUTHENTICATED')
+# Status codes of the calls shed under load, e.g. rejected by the admission control or for their remaining deadline
+SHED_CODES = ('RESOURCE_EXHAUSTED', 'DEADLINE_EXCEEDED')
+
+_current_rpc = ContextVar('current_rpc', default=None)  # (service, method) of the RPC handled by this thread
+_DONE = object()  # Sentinel for exhausted response iterator
+
+
+class RequestLog(object):
+    """
+    Sampled and size-bounded request logging. The request repr is only built for the sampled requests and it is
+    truncated to max_chars. Failed requests are always logged with their status code, as warning if the client
+    request failed and as error otherwise. The calls shed under load are logged at most once every shed_interval
+    seconds for every method and status code, with the number of calls which were not logged.
+    """
+    def __init__(self, sample_rate: float = 0.01, max_chars: int = 500, shed_interval: float = 10, logger=None):
+        if logger is None:
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = logger
+
+        self.sample_rate = sample_rate
+        self.max_chars = max_chars
+        self.shed_interval = shed_interval
+        self._shed_lock = threading.Lock()
+        self._shed = dict()  # (method, code) -> [monotonic time of the last log, calls not logged since]
+
+    def log(self, method: str, request, elapsed: float, error: Exception | None = None, code: str = 'UNKNOWN',
+            details: str | None = None):
+        if error is not None:
+            suffix = ''
+
+            if code in SHED_CODES:
+                suppressed = self._take_shed(method, code)
+
+                if suppressed is None:
+                    return
+
+                if suppressed != 0:
+                    suffix = f" ({suppressed} similar calls not logged)"
+
+            level = logging.WARNING if code in CLIENT_CODES else logging.ERROR
+            self.logger.log(level, f"{method} failed with {code} after {elapsed:.4f}s: {details or repr(error)}{suffix}, "
+                                   f"request {self.format(request)}")
+        elif (self.sample_rate > 0) and (random.random() < self.sample_rate):
+            self.logger.info(f"{method}, total time: {elapsed:.4f}, request {self.format(request)}")
+
+    def format(self, request)->str:
+        text = str(request).replace('\n', ' ')
+
+        if len(text) > self.max_chars:
+            return text[:self.max_chars] + f"... ({len(text)} chars)"
+
+        return text
+
+    def _take_shed(self, method: str, code: str)->int | None:
+        """
+        Return the number of shed calls which were not logged since the last log, or None if this call should not
+        be logged either.
+        """
+        key = (method, code)
+        now = time.monotonic()
+
+        with self._shed_lock:
+            shed = self._shed.setdefault(key, [None, 0])
+
+            if (shed[0] is not None) and (now - shed[0] < self.shed_interval):
+                shed[1] += 1
+                return None
+
+            suppressed = shed[1]
+            shed[0] = now
+            shed[1] = 0
+
+        return suppressed
+
+
+def instrument(service: str):
+    """
+    Decorator for the servicer method. Record latency, in-flight and status code metrics of the RPC and log the
+    request through the servicer request_log. Server streaming methods are measured until the last response is sent.
+    """
+    def decorator(fn):
+        method = fn.__name__
+
+        if inspect.isgeneratorfunction(fn):
+            def wrapper(self, request, context):
+                with _rpc(service, method, request, context, self.request_log):
+                    responses = fn(self, request, context)
+
+                    while True:
+                        # Every step could be run by a different thread in aio mode
+                        with _current(service, method):
+                            response = next(responses, _DONE)
+
+                        if response is _DONE:
+                            return
+
+                        yield response
+        else:
+            def wrapper(self, request, context):
+                with _rpc(service, method, request, context, self.request_log), _current(service, method):
+                    return fn(self, request, context)
+
+        wrapper.__name__ = method
+        wrapper.__doc__ = fn.__doc__
+        return wrapper
+
+    return decorator
+
+@contextmanager
+def stage(name: str):
+    """
+    Measure a stage of the current RPC, e.g. 'backend' for the layer query or 'convert' for the protobuf conversion.
+    """
+    rpc = _current_rpc.get()
+
+    if rpc is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(rpc[0], rpc[1], name).observe(time.perf_counter() - start_time)
+
+def track_backend(service: str, backend):
+    """
+    Report the readiness of the feature layer backend, e.g. the portal session, on every scrape.
+    """
+    BACKEND_READY.labels(service).set_function(lambda: 1 if backend.is_ready() else 0)
+
+def start_metrics_server(port: int, addr: str = '0.0.0.0'):
+    """
+    Serve the metrics in Prometheus text format on http://addr:port/metrics.
+    """
+    start_http_server(port, addr=addr)
+
+@contextmanager
+def _rpc(service: str, method: str, request, context, request_log: RequestLog):
+    in_flight = RPC_IN_FLIGHT.labels(service, method)
+    in_flight.inc()
+    start_time = time.perf_counter()
+    error = None
+
+    try:
+        yield
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        elapsed = time.perf_counter() - start_time
+        in_flight.dec()
+
+        code = _status_code(context, error)
+        RPC_LATENCY.labels(service, method).observe(elapsed)
+        RPC_HANDLED.labels(service, method, code).inc()
+        request_log.log(method, request, elapsed, error, code=code, details=_status_details(context))
+
+@contextmanager
+def _current(service: str, method: str):
+    token = _current_rpc.set((service, method))
+
+    try:
+        yield
+    finally:
+        _current_rpc.reset(token)
+
+def _status_code(context, error: Exception | None)->str:
+    code = None
+
+    try:
+        code = context.code()
+    except Exception:
+        pass
+
+    if code is not None:
+        return code.name if hasattr(code, 'name') else str(code)
+
+    return 'OK' if error is None else 'UNKNOWN'
+
+def _status_details(context)->str | None:
+    """
+    Return the status details set by the servicer, e.g. the abort message. None if no details has been set.
+    """
+    try:
+        details = context.details()
+    except Exception:
+        return None
+
+    if isinstance(details, bytes):
+        return details.decode('utf-8', errors='replace')
+
+    return details
@@ -0,0 +1,138 @@
+"""
+Lazy and reconnecting ArcGIS portal session.
+"""
+from arcgis.gis import GIS
+from arcgis.features import FeatureLayer
+import logging
+import threading
+import time
+
+# Error messages returned by the portal for an invalid or expired token
+TOKEN_ERRORS = ('invalid token', 'token required', 'token expired', 'error code: 498', 'error code: 499')
+
+
+class PortalSession(object):
+    """
+    Connect to the portal on first use and resolve the feature layer from the portal content search.
+    The resolved layer URL is cached, so re-authentication after the token expired does not search the portal again.
+    """
+    DISCONNECTED = 'DISCONNECTED'
+    CONNECTING = 'CONNECTING'
+    READY = 'READY'
+    FAILED = 'FAILED'
+
+    def __init__(self, url: str, username: str, password: str, service_query: str, layer_index: int = 0,
+                 retry_interval: float = 5, logger=None, **gis_kwargs):
+        if logger is None:
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = logger
+
+        self.url = url
+        self.username = username
+        self.password = password
+        self.service_query = service_query
+        self.layer_index = layer_index
+        self.retry_interval = retry_interval  # Minimum interval between failed connection attempts
+        self.gis_kwargs = gis_kwargs
+
+        self.state = self.DISCONNECTED
+        self.layer_url = None
+        self.last_error = None
+        self._gis = None
+        self._layer = None
+        self._generation = 0  # Incremented for every new connection
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    def is_ready(self)->bool:
+        """
+        Return True if the session is connected to the portal.
+        """
+        return self.state == self.READY
+
+    def layer(self)->FeatureLayer:
+        """
+        Return the feature layer, connect to the portal if not connected yet.
+        """
+        layer = self._layer
+
+        if layer is not None:
+            return layer
+
+        return self.connect()
+
+    def connect(self, generation: int | None = None)->FeatureLayer:
+        """
+        Connect to the portal. If generation is given, only reconnect if no other thread already did.
+        """
+        with self._lock:
+            if (self._layer is not None) and ((generation is None) or (generation != self._generation)):
+                return self._layer
+
+            if (self._failed_at is not None) and (time.monotonic() - self._failed_at < self.retry_interval):
+                raise ConnectionError(f"Portal connection is not available: {self.last_error}")
+
+            self.state = self.CONNECTING
+            self._layer = None
+
+            try:
+                self._gis = GIS(self.url, self.username, self.password, **self.gis_kwargs)
+
+                if self.layer_url is None:
+                    search_result = self._gis.content.search(query=self.service_query, max_items=5)
+                    self.layer_url = search_result[0].layers[self.layer_index].url
+
+                self._layer = FeatureLayer(self.layer_url, gis=self._gis)
+            except Exception as e:
+                self.state = self.FAILED
+                self.last_error = e
+                self._failed_at = time.monotonic()
+                self.logger.exception("Failed to connect to the portal.")
+                raise
+
+            self._generation += 1
+            self._failed_at = None
+            self.last_error = None
+            self.state = self.READY
+
+            return self._layer
+
+    def connect_async(self):
+        """
+        Connect to the portal in a background thread.
+        """
+        def _connect():
+            try:
+                self.layer()
+            except Exception:
+                pass
+
+        threading.Thread(target=_connect, name='portal-connect', daemon=True).start()
+
+    def call(self, method: str, *args, **kwargs):
+        """
+        Call the feature layer method. Re-authenticate and retry once if the token is expired.
+        """
+        layer = self.layer()
+        generation = self._generation
+
+        try:
+            return getattr(layer, method)(*args, **kwargs)
+        except Exception as e:
+            if not is_token_error(e):
+                raise
+
+            self.logger.info("Portal token expired, re-authenticating.")
+            layer = self.connect(generation=generation)
+
+            return getattr(layer, method)(*args, **kwargs)
+
+
+def is_token_error(error: Exception)->bool:
+    """
+    Return True if the error is caused by an invalid or expired token.
+    """
+    message = str(error).lower()
+
+    return any(token_error in message for token_error in TOKEN_ERRORS)
@@ -0,0 +1,70 @@
+"""
+Single-flight coalescing of identical concurrent calls.
+"""
+import threading
+
+
+class _Call(object):
+    """
+    In-flight call shared by every caller with the same key.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Coalesce concurrent calls with the same key into a single call. Callers arriving while the call is still
+    in-flight wait for it and receive the same result, or the same exception. If wait is given, callers wait
+    through wait(event) instead, e.g. to stop waiting at their own deadline. A failure of the retry_on exception
+    types is specific to the leading caller, so the waiting callers retry instead of receiving it.
+    """
+    def __init__(self, wait=None, retry_on: tuple = ()):
+        self.wait = wait
+        self.retry_on = retry_on
+        self._lock = threading.Lock()
+        self._calls = dict()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Execute fn(*args, **kwargs) unless a call with the same key is already in-flight.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+
+                if leader:
+                    call = _Call()
+                    self._calls[key] = call
+
+            if leader:
+                break
+
+            if self.wait is None:
+                call.done.wait()
+            else:
+                self.wait(call.done)
+
+            if isinstance(call.error, self.retry_on):
+                continue
+
+            if call.error is not None:
+                raise call.error
+
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
+
+        return call.result
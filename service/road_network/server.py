@@ -1,30 +1,108 @@
 """
 GRPC Server for LRS feature service.
 """
-import lrs_pb2_grpc
-from servicer.servicer import RoadNetwork
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # The common package of the services
+
+import lrs_pb2, lrs_pb2_grpc
+from servicer.servicer import RoadNetwork, SERVICE_NAME
+from servicer.lrs_api import backend, configure_call_executor
+from common.aio import AsyncServicer
+from common import metrics
+from common.deadline import LatencyBudget
+from common.admission import AdmissionControl, parse_limits
 
 import grpc
 
 from concurrent import futures
+import asyncio
 import logging
+import multiprocessing
+import signal
 
-import os
 from dotenv import load_dotenv
 
 load_dotenv('.env')
 PORT = os.getenv('LRS_GRPC_PORT')
-MAX_WORKERS = 20
+# Worker processes sharing the port through SO_REUSEPORT, every process runs its own server with MAX_WORKERS threads
+PROCESSES = int(os.getenv('LRS_PROCESSES', 1))
+MAX_WORKERS = int(os.getenv('LRS_MAX_WORKERS', 20))  # Worker threads of the thread pool server
+
+# Server mode, 'thread' for the thread pool server or 'aio' for the asyncio server
+SERVER_MODE = os.getenv('LRS_SERVER_MODE', 'thread')
+BACKEND_WORKERS = int(os.getenv('LRS_BACKEND_WORKERS', 32))  # Executor size for the backend calls in aio mode
+# The layer queries of the RPC with deadline run in an executor sized to the workers, MAX_WORKERS in thread mode and
+# BACKEND_WORKERS in aio mode, so every running RPC has a thread for its query. The executor has the call headroom
+# on top for the queries left running past their deadline until the portal timeout.
+# The RPC without deadline make their queries inline on the worker thread
+# In-flight RPC limit, the RPC over the limit are rejected with RESOURCE_EXHAUSTED instead of queued.
+# Defaults to MAX_WORKERS in thread mode and unlimited in aio mode
+MAX_CONCURRENT_RPCS = os.getenv('LRS_MAX_CONCURRENT_RPCS')
+
+# Admission control, the workers are shared by every RPC so the expensive methods are limited and the cheap reads
+# are admitted first. A waiting call holds a worker, so the running calls are limited to the workers minus the waiting
+ADMISSION_ENABLED = os.getenv('LRS_ADMISSION', 'true').lower() == 'true'
+ADMISSION_MAX_WAITING = os.getenv('LRS_ADMISSION_MAX_WAITING')  # Calls waiting for a slot, a quarter of the workers if not set
+ADMISSION_MAX_WAIT = float(os.getenv('LRS_ADMISSION_MAX_WAIT', 5))  # Seconds in the queue before a call is rejected
+METHOD_LIMITS = os.getenv('LRS_METHOD_LIMITS', 'DownloadAsSHP=2:2')  # 'Method=max_concurrent:max_queue'
+PRIORITY_METHODS = os.getenv('LRS_PRIORITY_METHODS', 'GetByRouteId').split(',')  # Admitted first
+
+# Calls with a remaining deadline below the ratio of the expected latency are rejected early, 0 disables it
+DEADLINE_REJECT_RATIO = float(os.getenv('LRS_DEADLINE_REJECT_RATIO', 0.5))
+
+# Prometheus metrics end point, disabled if the port is not set. Worker process i serves on the port + i
+METRICS_PORT = os.getenv('LRS_METRICS_PORT')
+METRICS_ADDR = os.getenv('LRS_METRICS_ADDR', '0.0.0.0')
+
+# Request logging, only a sample of the successful requests is logged and the request is truncated
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv('LRS_REQUEST_LOG_SAMPLE_RATE', 0.01))
+REQUEST_LOG_MAX_CHARS = int(os.getenv('LRS_REQUEST_LOG_MAX_CHARS', 500))
+
+SERVER_OPTIONS = [
+    ('grpc.max_send_message_length', 8188254),
+    ('grpc.max_receive_message_length', 8188254),
+    ('grpc.so_reuseport', 1),
+]
 
 logger = logging.getLogger(__name__)
 
-def serve():
+def create_admission(workers: int)->AdmissionControl | None:
+    """
+    Admission control sized for the worker threads running the servicer.
+    """
+    if not ADMISSION_ENABLED:
+        return None
+
+    if ADMISSION_MAX_WAITING is None:
+        max_waiting = workers // 4
+    else:
+        max_waiting = int(ADMISSION_MAX_WAITING)
+
+    return AdmissionControl(max(workers - max_waiting, 1), max_waiting=max_waiting, limits=parse_limits(METHOD_LIMITS),
+                            priority_methods=PRIORITY_METHODS, max_wait=ADMISSION_MAX_WAIT)
+
+def create_servicer(workers: int, worker_index: int = 0)->RoadNetwork:
+    backend.connect_async()  # Warm up the portal session without blocking the server startup
+    configure_call_executor(workers)
+
+    if METRICS_PORT is not None:
+        metrics_port = int(METRICS_PORT) + worker_index
+        metrics.track_backend(SERVICE_NAME, backend)
+        metrics.start_metrics_server(metrics_port, addr=METRICS_ADDR)
+        logger.info(f"Metrics available on {METRICS_ADDR}:{metrics_port}/metrics")
+
+    request_log = metrics.RequestLog(sample_rate=REQUEST_LOG_SAMPLE_RATE, max_chars=REQUEST_LOG_MAX_CHARS, logger=logger)
+
+    latency_budget = LatencyBudget(ratio=DEADLINE_REJECT_RATIO) if DEADLINE_REJECT_RATIO > 0 else None
+
+    return RoadNetwork(logger=logger, request_log=request_log, latency_budget=latency_budget,
+                       admission=create_admission(workers))
+
+def serve(worker_index: int = 0):
     port = PORT
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=MAX_WORKERS), options=[
-                        ('grpc.max_send_message_length', 8188254),
-                        ('grpc.max_receive_message_length', 8188254),
-                        ])
-    lrs_pb2_grpc.add_RoadNetworkServicer_to_server(RoadNetwork(logger=logger), server)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=MAX_WORKERS), options=SERVER_OPTIONS,
+                         maximum_concurrent_rpcs=int(MAX_CONCURRENT_RPCS or MAX_WORKERS))
+    lrs_pb2_grpc.add_RoadNetworkServicer_to_server(create_servicer(MAX_WORKERS, worker_index), server)
 
     server.add_insecure_port("[::]:" + port)
     server.start()
@@ -32,6 +110,58 @@ def serve():
     logger.info("LRS GRPC Feature Service started, listening on " + port)
     server.wait_for_termination()
 
+async def serve_aio(worker_index: int = 0):
+    port = PORT
+
+    if MAX_CONCURRENT_RPCS is None:
+        server = grpc.aio.server(options=SERVER_OPTIONS)
+    else:
+        server = grpc.aio.server(options=SERVER_OPTIONS, maximum_concurrent_rpcs=int(MAX_CONCURRENT_RPCS))
+
+    servicer = AsyncServicer(create_servicer(BACKEND_WORKERS, worker_index),
+                             lrs_pb2.DESCRIPTOR.services_by_name["RoadNetwork"],
+                             futures.ThreadPoolExecutor(max_workers=BACKEND_WORKERS, thread_name_prefix='lrs-backend'))
+    lrs_pb2_grpc.add_RoadNetworkServicer_to_server(servicer, server)
+
+    server.add_insecure_port("[::]:" + port)
+    await server.start()
+
+    logger.info("LRS GRPC Feature Service (aio) started, listening on " + port)
+    await server.wait_for_termination()
+
+def run(worker_index: int = 0):
+    if SERVER_MODE == 'aio':
+        asyncio.run(serve_aio(worker_index))
+    else:
+        serve(worker_index)
+
+def serve_processes(processes: int):
+    """
+    Fork the worker processes, which serve the same port through SO_REUSEPORT so the CPU-bound work is spread
+    over the cores. Nothing is connected before the fork, every worker sets up its own portal session and
+    caches in create_servicer.
+    """
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=run, args=(index,), name=f'lrs-worker-{index}') for index in range(processes)]
+
+    for worker in workers:
+        worker.start()
+
+    def stop(signum, frame):
+        for worker in workers:
+            worker.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    logger.info(f"Started {processes} worker processes")
+
+    for worker in workers:
+        worker.join()
+        logger.info(f"{worker.name} exited with code {worker.exitcode}")
+
 if __name__ == "__main__":
-    logging.basicConfig(level=0)
-    serve()
+    if PROCESSES > 1:
+        logging.basicConfig(level=0, format='%(processName)s:%(levelname)s:%(name)s:%(message)s')
+        serve_processes(PROCESSES)
+    else:
+        logging.basicConfig(level=0)
+        run()
@@ -1,6 +1,12 @@
-from arcgis.gis import GIS
 from arcgis.features import FeatureSet
 from pandas import concat
+from common.singleflight import SingleFlight
+from common.session import PortalSession
+from common.backend import PortalBackend, SQLiteBackend
+from common import deadline
+from concurrent.futures import ThreadPoolExecutor
+import json
+import math
 import os
 from dotenv import load_dotenv
 
@@ -9,21 +15,57 @@ load_dotenv('.env')
 PORTAL_URL=os.getenv('PORTAL_URL')
 PORTAL_USERNAME=os.getenv('PORTAL_USERNAME')
 PORTAL_PWD=os.getenv('PORTAL_PWD')
+BACKEND=os.getenv('LRS_BACKEND', 'portal')  # 'portal' or 'sqlite'
+SQLITE_PATH=os.getenv('LRS_SQLITE_PATH', 'lrs.sqlite')  # Local LRS layer for 'sqlite' backend
+# Seconds before a portal request is given up. A query left running past its RPC deadline holds a call executor thread
+# until it finishes, so this is the longest an abandoned query keeps its thread
+PORTAL_TIMEOUT=float(os.getenv('LRS_PORTAL_TIMEOUT', 60))
+CALL_HEADROOM=float(os.getenv('LRS_CALL_HEADROOM', 1))  # Extra call executor threads per RPC for the queries left running past their deadline
 
 FEATURE_SERVICE_NAME='BinaMargaLRS'
 
-# Login
-portal = GIS(PORTAL_URL, PORTAL_USERNAME, PORTAL_PWD, verify_cert=False)
+FEATURE_TABLE_NAME='LRS'  # Table name for 'sqlite' backend
 
-# Search feature layer
-service_query = 'title: "{}" AND type: "Map Service"'.format(FEATURE_SERVICE_NAME)
-search_result = portal.content.search(query=service_query, max_items=5)
-lrs_lyr = search_result[0].layers[0]
+def create_backend():
+    """
+    Create the LRS layer backend selected by LRS_BACKEND environment variable.
+    """
+    if BACKEND == 'sqlite':
+        return SQLiteBackend(SQLITE_PATH, FEATURE_TABLE_NAME, index_columns=['LINKID'], interrupt=deadline.expired)
+    
+    # Portal session, login and map service layer search is done on the first query
+    service_query = 'title: "{}" AND type: "Map Service"'.format(FEATURE_SERVICE_NAME)
+
+    return PortalBackend(PortalSession(PORTAL_URL, PORTAL_USERNAME, PORTAL_PWD, service_query, verify_cert=False,
+                                       timeout=PORTAL_TIMEOUT))
+
+backend = create_backend()
+
+# Executor for the layer queries of the RPC with deadline, the RPC thread only waits for them until its deadline.
+# Sized by the server with configure_call_executor, the queries are made inline until then
+call_executor = None
+
+def configure_call_executor(max_workers: int):
+    """
+    Size the executor of the deadline bounded layer queries. An RPC waits for a single query at a time, so the server
+    passes the number of RPC it runs at the same time. The RPC past its deadline leaves its query running for up to
+    PORTAL_TIMEOUT, the executor has CALL_HEADROOM extra threads per RPC so the abandoned queries do not hold every
+    thread from the live RPC.
+    """
+    global call_executor
+    call_executor = ThreadPoolExecutor(max_workers=max_workers + math.ceil(max_workers * CALL_HEADROOM),
+                                       thread_name_prefix='lrs-call')
+
+# Identical concurrent queries share a single layer query, every caller waits until its own deadline
+query_flight = SingleFlight(wait=deadline.wait_event, retry_on=(deadline.DeadlineExceeded, deadline.Cancelled))
 
 def routes_query(routes: list, columns: None | list = None, routeid_col='LINKID'):
     """
-    Query Road Network LRS for route data.
+    Query Road Network LRS for route data. Routes are queried in chunks, which stop once the RPC is past its
+    deadline or cancelled.
     """
+    routes = sorted(set(routes))  # Normalized so identical requests share the same query
+
     def _execute_query(route_list):
         str_list = str(route_list).strip('[]')
         query = f"{routeid_col} IN ({str_list})"
@@ -38,6 +80,8 @@ def routes_query(routes: list, columns: None | list = None, routeid_col='LINKID'
         chunk = [0, 20]  # Initial part chunk
 
         while chunk[0] < len(routes):
+            deadline.check()
+
             # Execute query
             if chunk[1] > len(routes):
                 chunk_result = _execute_query(routes[chunk[0]:len(routes)])
@@ -61,15 +105,23 @@ def get_geom(routes: list):
 
 def _raw_query_with_active_date(query: str, columns: None | list = None, start_date_col='FROMDATE', end_date_col='TODATE'):
     """
-    Execute raw query on National Bridge layer with added active date query
+    Execute raw query on National Bridge layer with added active date query.
+    Identical concurrent queries are coalesced into a single layer query.
     """
     active_query = "({0} is NULL or {0} < CURRENT_TIMESTAMP) AND ({1} is NULL or {1} > CURRENT_TIMESTAMP)".format(start_date_col, end_date_col)
 
     query = query + " AND " + active_query
 
     if columns is None:
-        query_results = lrs_lyr.query(where=query, out_fields="*", out_sr=4326, return_m=True)
+        out_fields = "*"
     else:
-        query_results = lrs_lyr.query(where=query, out_fields=columns, out_sr=4326, return_m=True)
+        out_fields = columns
+
+    key = json.dumps([query, out_fields])
+    query_results = query_flight.do(key, deadline.call, call_executor, backend.query, where=query, out_fields=out_fields,
+                                    out_sr=4326, return_m=True)
 
-    return query_results
\ No newline at end of file
+    if type(query_results) == dict:
+        return FeatureSet.from_dict(query_results)
+    else:
+        return query_results
\ No newline at end of file
@@ -3,44 +3,44 @@ import logging
 import zipfile
 from .ms_graph_api.client import upload_file
 from .lrs_api import *
+from common import metrics
+from common import deadline
+from common.admission import admitted
 
 from geopandas import read_file, GeoDataFrame
 from pandas import concat, DataFrame
 from shapely import get_point, ops
 import copy
-import time
 
 OUTPUT_SHP_FOLDER=os.getenv('OUTPUT_SHP_FOLDER')
 
-def service_logger():
-    """
-    Attach logger to the service end point.
-    """
-    def decorator(fn):
-        def wrapper(*args, **kwargs):
-            cls = args[0]
-            start_time = time.perf_counter()
-            results = fn(*args, **kwargs)
-            cls.logger.info(f"{fn.__name__}, request {args[1]}, total time: {time.perf_counter()-start_time}")
-
-            return results
-
-        wrapper.__name__ = fn.__name__
-        return wrapper
-    
-    return decorator
-
+# Full name of the service for the metrics label
+SERVICE_NAME = lrs_pb2.DESCRIPTOR.services_by_name['RoadNetwork'].full_name
 
 class RoadNetwork(lrs_pb2_grpc.RoadNetworkServicer):
-    def __init__(self, logger=None, *args, **kwargs):
+    def __init__(self, logger=None, request_log=None, latency_budget=None, admission=None, *args, **kwargs):
         if logger is None:
             self.logger = logging.getLogger(__name__)
         else:
             self.logger = logger
 
+        # Sampled request logging, used by the metrics decorator
+        if request_log is None:
+            self.request_log = metrics.RequestLog(logger=self.logger)
+        else:
+            self.request_log = request_log
+
+        # Expected latency of every RPC, for rejecting the calls which could not finish before their deadline
+        self.latency_budget = latency_budget
+
+        # Per-method concurrency limits, None to admit every call
+        self.admission = admission
+
         super(RoadNetwork, self).__init__(*args, **kwargs)
     
-    @service_logger()
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
     def DownloadAsSHP(self, request, context):
         """
         Download requested routes as ESRI Shapefile and return a file path/download link.
@@ -70,7 +70,8 @@ class RoadNetwork(lrs_pb2_grpc.RoadNetworkServicer):
         lrs_shp_outdir = OUTPUT_SHP_FOLDER + '/' + output_file_name
         point_shp_outdir = OUTPUT_SHP_FOLDER + '/' + point_shp_prefix + output_file_name
         zip_outdir = OUTPUT_SHP_FOLDER + '/' + output_zip
-        features = routes_query(routes=routes, columns=['LINKID', 'LINK_NAME'])  # Get route features from API
+        with metrics.stage('backend'):
+            features = routes_query(routes=routes, columns=['LINKID', 'LINK_NAME'])  # Get route features from API
         
         # Load into GeoPandas DataFrame
         line_gdf = read_file(features.to_geojson, crs=4326)
@@ -109,14 +110,19 @@ class RoadNetwork(lrs_pb2_grpc.RoadNetworkServicer):
                 zipf.write(file_path, 'awal_akhir_' + output_name + _shp_comp)
 
         # Upload to PUPR SharePoint
-        download_url = upload_file(file_path=zip_outdir, file_name=output_zip)
+        with metrics.stage('upload'):
+            download_url = upload_file(file_path=zip_outdir, file_name=output_zip)
 
         # Return SharePoint download URL
         return lrs_pb2.FilePath(path=download_url)
     
-    @service_logger()
+    @metrics.instrument(SERVICE_NAME)
+    @deadline.propagate
+    @admitted
     def GetByRouteId(self, request, context):
         routes = request.routes  # Route list
-        features = routes_query(routes=routes)  # Get route features from API
+        with metrics.stage('backend'):
+            features = routes_query(routes=routes)  # Get route features from API
 
-        return lrs_pb2.Routes(geojson=features.to_geojson)
+        with metrics.stage('convert'):
+            return lrs_pb2.Routes(geojson=features.to_geojson)
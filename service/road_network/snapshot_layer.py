@@ -0,0 +1,26 @@
+"""
+Copy the LRS layer from the portal into a local SQLite database, for running the service with LRS_BACKEND=sqlite.
+Usage: python snapshot_layer.py [output path]
+"""
+import os, sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # The common package of the services
+
+from servicer.lrs_api import (PORTAL_URL, PORTAL_USERNAME, PORTAL_PWD, FEATURE_SERVICE_NAME, FEATURE_TABLE_NAME, SQLITE_PATH)
+from common.session import PortalSession
+from common.backend import PortalBackend, SQLiteBackend
+
+
+def run(path: str):
+    service_query = 'title: "{}" AND type: "Map Service"'.format(FEATURE_SERVICE_NAME)
+    portal = PortalBackend(PortalSession(PORTAL_URL, PORTAL_USERNAME, PORTAL_PWD, service_query, verify_cert=False))
+    local = SQLiteBackend(path, FEATURE_TABLE_NAME, index_columns=['LINKID'])
+
+    count = local.copy_from(portal, out_sr=4326, return_m=True)
+
+    print(f"Copied {count} features into {path}")
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        run(sys.argv[1])
+    else:
+        run(SQLITE_PATH)